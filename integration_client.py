@@ -4,17 +4,106 @@ This can be used in your main service to call the pricing service.
 """
 
 import requests
+import urllib3
 import os
-from typing import Dict, List, Optional
+import copy
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
 from decimal import Decimal
 
+try:
+    import aiohttp  # only needed by AsyncPricingServiceClient
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Size-bounded, thread-safe LRU store for PricingServiceClient responses
+    
+    Entries are ``(value, fresh_until, stale_until)`` with ``time.time()``
+    deadlines. Any object with the same ``get``/``set``/``invalidate`` methods,
+    e.g. one backed by a shared cache server, can be given to the client instead.
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key: str, entry: Tuple[Any, float, float]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, prefix: str) -> None:
+        """Drop every entry whose key starts with ``prefix``"""
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
 
 class PricingServiceClient:
     """Client for communicating with the pricing service"""
     
-    def __init__(self, base_url: Optional[str] = None):
+    # Number of (ETag, body) pairs kept for conditional GETs
+    max_validators = 512
+    
+    # Per resource (first path segment): seconds a cached GET is fresh, then
+    # seconds more it may be served stale while a background thread refreshes
+    # it. Resources not listed are never cached.
+    cache_ttls: Dict[str, Tuple[float, float]] = {
+        'plans': (60, 300),
+        'settings': (300, 900),
+    }
+    
+    # Per written resource: the resources whose responses embed its data (plan
+    # detail lists subscriptions, settings show the trial plan's name, ...). A
+    # write drops their cached responses too.
+    cache_dependents: Dict[str, Tuple[str, ...]] = {
+        'plans': ('settings', 'subscriptions', 'invoices', 'audit-logs'),
+        'customers': ('plans', 'subscriptions', 'invoices', 'audit-logs'),
+        'subscriptions': ('plans', 'customers', 'invoices', 'audit-logs'),
+        'invoices': ('customers', 'subscriptions', 'audit-logs'),
+        'settings': ('audit-logs',),
+        'usage-events': ('plans', 'customers', 'subscriptions'),
+    }
+    
+    def __init__(self, base_url: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 cache_ttls: Optional[Dict[str, Tuple[float, float]]] = None, compress: bool = True):
         self.base_url = base_url or os.getenv('PRICING_SERVICE_URL', 'https://pricing-service.up.railway.app')
         self.session = requests.Session()
+        self._validators: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._validators_lock = threading.Lock()
+        
+        # Pass cache_ttls={} to turn response caching off
+        self.cache = cache if cache is not None else ResponseCache()
+        if cache_ttls is not None:
+            self.cache_ttls = cache_ttls
+        self._cache_lock = threading.Lock()
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._refreshing: set = set()
+        
+        # Offer every encoding urllib3 can decode here (gzip, deflate, plus br or
+        # zstd when brotli or zstandard is installed); responses are decoded on read
+        self.session.headers['Accept-Encoding'] = (
+            urllib3.util.make_headers(accept_encoding=True)['accept-encoding'] if compress else 'identity'
+        )
         
         # Add authentication headers if needed
         auth_token = os.getenv('PRICING_SERVICE_TOKEN')
@@ -24,22 +113,144 @@ class PricingServiceClient:
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict:
         """Make HTTP request to pricing service"""
         url = f"{self.base_url}/api/{endpoint}"
-        response = self.session.request(method, url, **kwargs)
+        if method == 'GET' and not kwargs:
+            return self._cached(endpoint, lambda: self._get_json(url))
+        if method == 'GET' and not kwargs.keys() - {'params'}:
+            return self._get_json(url, kwargs.get('params'))
+        try:
+            response = self.session.request(method, url, **kwargs)
+        finally:
+            # Even a failed write may have changed something
+            self._invalidate(endpoint)
         response.raise_for_status()
         return response.json()
     
+    def _get_json(self, url: str, params: Optional[Dict] = None) -> Any:
+        """GET ``url``, revalidating a previously seen response with If-None-Match"""
+        key = requests.Request('GET', url, params=params).prepare().url
+        with self._validators_lock:
+            cached = self._validators.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = self.session.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            with self._validators_lock:
+                if key in self._validators:
+                    self._validators.move_to_end(key)
+            return copy.deepcopy(cached[1])
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get('ETag')
+        if etag:
+            with self._validators_lock:
+                self._validators[key] = (etag, copy.deepcopy(data))
+                self._validators.move_to_end(key)
+                while len(self._validators) > self.max_validators:
+                    self._validators.popitem(last=False)
+        return data
+    
+    def _cached(self, endpoint: str, fetch: Callable[[], Any]) -> Any:
+        """Serve a GET of ``endpoint`` from the response cache when its resource has TTLs"""
+        resource = endpoint.split('/', 1)[0]
+        if resource not in self.cache_ttls:
+            return fetch()
+        entry = self.cache.get(endpoint)
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            now = time.time()
+            if now < stale_until:
+                if now >= fresh_until:
+                    self._refresh_in_background(endpoint, fetch)
+                return copy.deepcopy(value)
+        return self._fetch_into_cache(endpoint, fetch)
+    
+    def _fetch_into_cache(self, endpoint: str, fetch: Callable[[], Any]) -> Any:
+        resource = endpoint.split('/', 1)[0]
+        generation = self._generations[resource]
+        data = fetch()
+        fresh, stale = self.cache_ttls[resource]
+        with self._cache_lock:
+            # A write through this client while fetching makes the response stale already
+            if self._generations[resource] == generation:
+                now = time.time()
+                self.cache.set(endpoint, (copy.deepcopy(data), now + fresh, now + fresh + stale))
+        return data
+    
+    def _refresh_in_background(self, endpoint: str, fetch: Callable[[], Any]) -> None:
+        with self._cache_lock:
+            if endpoint in self._refreshing:
+                return
+            self._refreshing.add(endpoint)
+        threading.Thread(target=self._refresh, args=(endpoint, fetch), daemon=True).start()
+    
+    def _refresh(self, endpoint: str, fetch: Callable[[], Any]) -> None:
+        try:
+            self._fetch_into_cache(endpoint, fetch)
+        except Exception:
+            # The stale copy keeps being served until it expires
+            logger.warning('Refreshing cached %s failed', endpoint, exc_info=True)
+        finally:
+            with self._cache_lock:
+                self._refreshing.discard(endpoint)
+    
+    def _invalidate(self, endpoint: str) -> None:
+        """Forget cached responses of the resource a write to ``endpoint`` touched, and of those embedding it"""
+        resource = endpoint.split('/', 1)[0]
+        with self._cache_lock:
+            for affected in (resource, *self.cache_dependents.get(resource, ())):
+                if affected in self.cache_ttls:
+                    self._generations[affected] += 1
+                    self.cache.invalidate(f'{affected}/')
+    
+    def _iter_pages(self, endpoint: str, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily fetch a paginated collection one page at a time"""
+        url = f"{self.base_url}/api/{endpoint}"
+        params = {'page_size': page_size} if page_size else None
+        while url:
+            page = self._get_json(url, params)
+            yield page['results']
+            # The next link already carries the cursor and page size
+            url, params = page['next'], None
+    
+    def _get_all(self, endpoint: str) -> List[Dict]:
+        """Fetch every page of a paginated collection"""
+        return self._cached(endpoint, lambda: [item for page in self._iter_pages(endpoint) for item in page])
+    
+    def _bulk_post(self, endpoint: str, rows: List[Dict], chunk_size: int) -> Dict:
+        """POST ``rows`` to a bulk endpoint in chunks and merge the per-row results"""
+        summary = {'created': 0, 'updated': 0, 'errors': 0, 'results': []}
+        for start in range(0, len(rows), chunk_size):
+            response = self._make_request('POST', endpoint, json=rows[start:start + chunk_size])
+            for key in ('created', 'updated', 'errors'):
+                summary[key] += response[key]
+            for result in response['results']:
+                # Report indexes relative to the caller's list, not the chunk
+                summary['results'].append({**result, 'index': result['index'] + start})
+        return summary
+    
     # Pricing Plans
     def get_plans(self) -> List[Dict]:
         """Get all pricing plans"""
-        return self._make_request('GET', 'plans/')
+        return self._get_all('plans/')
+    
+    def iter_plans_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of pricing plans"""
+        return self._iter_pages('plans/', page_size)
     
     def get_active_plans(self) -> List[Dict]:
         """Get active pricing plans"""
-        return self._make_request('GET', 'plans/active/')
+        return self._get_all('plans/active/')
+    
+    def iter_active_plans_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of active pricing plans"""
+        return self._iter_pages('plans/active/', page_size)
     
     def get_featured_plans(self) -> List[Dict]:
         """Get featured pricing plans"""
-        return self._make_request('GET', 'plans/featured/')
+        return self._get_all('plans/featured/')
+    
+    def iter_featured_plans_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of featured pricing plans"""
+        return self._iter_pages('plans/featured/', page_size)
     
     def get_plan(self, plan_id: str) -> Dict:
         """Get specific pricing plan"""
@@ -49,6 +260,10 @@ class PricingServiceClient:
         """Create new pricing plan"""
         return self._make_request('POST', 'plans/', json=data)
     
+    def bulk_create_plans(self, rows: List[Dict], chunk_size: int = 5000) -> Dict:
+        """Create or update (by name) many pricing plans"""
+        return self._bulk_post('plans/bulk/', rows, chunk_size)
+    
     def update_plan(self, plan_id: str, data: Dict) -> Dict:
         """Update pricing plan"""
         return self._make_request('PUT', f'plans/{plan_id}/', json=data)
@@ -60,11 +275,19 @@ class PricingServiceClient:
     # Customers
     def get_customers(self) -> List[Dict]:
         """Get all customers"""
-        return self._make_request('GET', 'customers/')
+        return self._get_all('customers/')
+    
+    def iter_customers_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of customers"""
+        return self._iter_pages('customers/', page_size)
     
     def get_active_customers(self) -> List[Dict]:
         """Get active customers"""
-        return self._make_request('GET', 'customers/active/')
+        return self._get_all('customers/active/')
+    
+    def iter_active_customers_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of active customers"""
+        return self._iter_pages('customers/active/', page_size)
     
     def get_customer(self, customer_id: str) -> Dict:
         """Get specific customer"""
@@ -74,6 +297,10 @@ class PricingServiceClient:
         """Create new customer"""
         return self._make_request('POST', 'customers/', json=data)
     
+    def bulk_create_customers(self, rows: List[Dict], chunk_size: int = 5000) -> Dict:
+        """Create or update (by email) many customers"""
+        return self._bulk_post('customers/bulk/', rows, chunk_size)
+    
     def update_customer(self, customer_id: str, data: Dict) -> Dict:
         """Update customer"""
         return self._make_request('PUT', f'customers/{customer_id}/', json=data)
@@ -85,11 +312,19 @@ class PricingServiceClient:
     # Subscriptions
     def get_subscriptions(self) -> List[Dict]:
         """Get all subscriptions"""
-        return self._make_request('GET', 'subscriptions/')
+        return self._get_all('subscriptions/')
+    
+    def iter_subscriptions_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of subscriptions"""
+        return self._iter_pages('subscriptions/', page_size)
     
     def get_active_subscriptions(self) -> List[Dict]:
         """Get active subscriptions"""
-        return self._make_request('GET', 'subscriptions/active/')
+        return self._get_all('subscriptions/active/')
+    
+    def iter_active_subscriptions_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of active subscriptions"""
+        return self._iter_pages('subscriptions/active/', page_size)
     
     def get_subscription(self, subscription_id: str) -> Dict:
         """Get specific subscription"""
@@ -99,6 +334,10 @@ class PricingServiceClient:
         """Create new subscription"""
         return self._make_request('POST', 'subscriptions/', json=data)
     
+    def bulk_create_subscriptions(self, rows: List[Dict], chunk_size: int = 5000) -> Dict:
+        """Create many subscriptions"""
+        return self._bulk_post('subscriptions/bulk/', rows, chunk_size)
+    
     def update_subscription(self, subscription_id: str, data: Dict) -> Dict:
         """Update subscription"""
         return self._make_request('PUT', f'subscriptions/{subscription_id}/', json=data)
@@ -110,11 +349,19 @@ class PricingServiceClient:
     # Invoices
     def get_invoices(self) -> List[Dict]:
         """Get all invoices"""
-        return self._make_request('GET', 'invoices/')
+        return self._get_all('invoices/')
+    
+    def iter_invoices_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of invoices"""
+        return self._iter_pages('invoices/', page_size)
     
     def get_pending_invoices(self) -> List[Dict]:
         """Get pending invoices"""
-        return self._make_request('GET', 'invoices/pending/')
+        return self._get_all('invoices/pending/')
+    
+    def iter_pending_invoices_pages(self, page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Lazily iterate over pages of pending invoices"""
+        return self._iter_pages('invoices/pending/', page_size)
     
     def get_invoice(self, invoice_id: str) -> Dict:
         """Get specific invoice"""
@@ -128,6 +375,21 @@ class PricingServiceClient:
         """Mark invoice as paid"""
         return self._make_request('PUT', f'invoices/{invoice_id}/', json={'status': 'paid'})
     
+    # Usage
+    def record_usage(self, events: List[Dict], durability: Optional[str] = None) -> Dict:
+        """Send a batch of usage events (``subscription``, ``metric``, ``delta``)"""
+        endpoint = 'usage-events/' + (f'?durability={durability}' if durability else '')
+        return self._make_request('POST', endpoint, json=events)
+    
+    # Quotes
+    def quote_batch(self, rows: List[Dict], chunk_size: int = 20000) -> List[Dict]:
+        """Price many plan/cycle/discount/custom price/seat combinations"""
+        results = []
+        for start in range(0, len(rows), chunk_size):
+            response = self._make_request('POST', 'quotes/batch/', json=rows[start:start + chunk_size])
+            results.extend({**result, 'index': result['index'] + start} for result in response['results'])
+        return results
+    
     # Dashboard
     def get_dashboard_data(self) -> Dict:
         """Get pricing dashboard data"""
@@ -143,6 +405,349 @@ class PricingServiceClient:
         return self._make_request('PUT', 'settings/', json=data)
 
 
+class AsyncPricingServiceClient:
+    """asyncio client for the pricing service, with the same methods as PricingServiceClient
+    
+    All calls share one pooled ``aiohttp.ClientSession`` and at most
+    ``max_concurrency`` requests are in flight at once, however many tasks use
+    the client. ``timeout`` is the default per-request timeout in seconds; every
+    method also takes its own ``timeout``. Use it as an async context manager,
+    or call ``aclose()`` when done::
+    
+        async with AsyncPricingServiceClient() as client:
+            customers = await client.get_many_customers(customer_ids)
+    """
+    
+    # Number of (ETag, body) pairs kept for conditional GETs
+    max_validators = 512
+    
+    def __init__(self, base_url: Optional[str] = None, max_concurrency: int = 20,
+                 max_connections: Optional[int] = None, timeout: float = 10.0, compress: bool = True):
+        if aiohttp is None:
+            raise ImportError('AsyncPricingServiceClient requires aiohttp (pip install aiohttp)')
+        self.base_url = base_url or os.getenv('PRICING_SERVICE_URL', 'https://pricing-service.up.railway.app')
+        self.max_connections = max_connections or max_concurrency
+        self.timeout = timeout
+        self.session: Optional['aiohttp.ClientSession'] = None
+        self._validators: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+    
+        # Add authentication headers if needed
+        self.headers = {}
+        if not compress:
+            # aiohttp otherwise offers gzip, deflate and br (when brotli is installed) and decodes them
+            self.headers['Accept-Encoding'] = 'identity'
+        auth_token = os.getenv('PRICING_SERVICE_TOKEN')
+        if auth_token:
+            self.headers['Authorization'] = f'Bearer {auth_token}'
+    
+    async def __aenter__(self) -> 'AsyncPricingServiceClient':
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def aclose(self) -> None:
+        """Close the pooled connections"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """The shared session, created on first use inside the running event loop"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+            )
+        return self.session
+    
+    async def _send(self, method: str, url: str, timeout: Optional[float], **kwargs) -> Tuple[int, Any, Any]:
+        """Send one request once a concurrency slot is free; returns ``(status, headers, body)``"""
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with self._semaphore:
+            async with self._get_session().request(method, url, **kwargs) as response:
+                response.raise_for_status()
+                body = await response.read()
+        return response.status, response.headers, json.loads(body) if body else None
+    
+    async def _make_request(self, method: str, endpoint: str, timeout: Optional[float] = None, **kwargs) -> Dict:
+        """Make HTTP request to pricing service"""
+        url = f"{self.base_url}/api/{endpoint}"
+        if method == 'GET' and not kwargs.keys() - {'params'}:
+            return await self._get_json(url, kwargs.get('params'), timeout)
+        _, _, data = await self._send(method, url, timeout, **kwargs)
+        return data
+    
+    async def _get_json(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None) -> Any:
+        """GET ``url``, revalidating a previously seen response with If-None-Match"""
+        key = requests.Request('GET', url, params=params).prepare().url
+        cached = self._validators.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        status, response_headers, data = await self._send('GET', key, timeout, headers=headers)
+        if status == 304 and cached:
+            self._validators.move_to_end(key)
+            return copy.deepcopy(cached[1])
+        etag = response_headers.get('ETag')
+        if etag:
+            self._validators[key] = (etag, copy.deepcopy(data))
+            self._validators.move_to_end(key)
+            while len(self._validators) > self.max_validators:
+                self._validators.popitem(last=False)
+        return data
+    
+    async def _iter_pages(self, endpoint: str, page_size: Optional[int] = None,
+                          timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily fetch a paginated collection one page at a time"""
+        url = f"{self.base_url}/api/{endpoint}"
+        params = {'page_size': page_size} if page_size else None
+        while url:
+            page = await self._get_json(url, params, timeout)
+            yield page['results']
+            # The next link already carries the cursor and page size
+            url, params = page['next'], None
+    
+    async def _get_all(self, endpoint: str, timeout: Optional[float] = None) -> List[Dict]:
+        """Fetch every page of a paginated collection"""
+        return [item async for page in self._iter_pages(endpoint, timeout=timeout) for item in page]
+    
+    async def _get_many(self, endpoint: str, ids: List[str], timeout: Optional[float] = None) -> List[Dict]:
+        """Fetch ``{endpoint}{id}/`` for every id concurrently, in the order given"""
+        return await asyncio.gather(*(self._make_request('GET', f'{endpoint}{pk}/', timeout) for pk in ids))
+    
+    async def _bulk_post(self, endpoint: str, rows: List[Dict], chunk_size: int,
+                         timeout: Optional[float] = None) -> Dict:
+        """POST ``rows`` to a bulk endpoint in chunks and merge the per-row results
+    
+        Chunks go one at a time, as with the sync client: concurrent upserts of
+        the same key from different chunks would contend for the same rows.
+        """
+        summary = {'created': 0, 'updated': 0, 'errors': 0, 'results': []}
+        for start in range(0, len(rows), chunk_size):
+            response = await self._make_request('POST', endpoint, timeout, json=rows[start:start + chunk_size])
+            for key in ('created', 'updated', 'errors'):
+                summary[key] += response[key]
+            for result in response['results']:
+                # Report indexes relative to the caller's list, not the chunk
+                summary['results'].append({**result, 'index': result['index'] + start})
+        return summary
+    
+    # Pricing Plans
+    async def get_plans(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get all pricing plans"""
+        return await self._get_all('plans/', timeout)
+    
+    def iter_plans_pages(self, page_size: Optional[int] = None,
+                         timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of pricing plans"""
+        return self._iter_pages('plans/', page_size, timeout)
+    
+    async def get_active_plans(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get active pricing plans"""
+        return await self._get_all('plans/active/', timeout)
+    
+    def iter_active_plans_pages(self, page_size: Optional[int] = None,
+                                timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of active pricing plans"""
+        return self._iter_pages('plans/active/', page_size, timeout)
+    
+    async def get_featured_plans(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get featured pricing plans"""
+        return await self._get_all('plans/featured/', timeout)
+    
+    def iter_featured_plans_pages(self, page_size: Optional[int] = None,
+                                  timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of featured pricing plans"""
+        return self._iter_pages('plans/featured/', page_size, timeout)
+    
+    async def get_plan(self, plan_id: str, timeout: Optional[float] = None) -> Dict:
+        """Get specific pricing plan"""
+        return await self._make_request('GET', f'plans/{plan_id}/', timeout)
+    
+    async def get_many_plans(self, plan_ids: List[str], timeout: Optional[float] = None) -> List[Dict]:
+        """Get several pricing plans concurrently"""
+        return await self._get_many('plans/', plan_ids, timeout)
+    
+    async def create_plan(self, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Create new pricing plan"""
+        return await self._make_request('POST', 'plans/', timeout, json=data)
+    
+    async def bulk_create_plans(self, rows: List[Dict], chunk_size: int = 5000,
+                                timeout: Optional[float] = None) -> Dict:
+        """Create or update (by name) many pricing plans"""
+        return await self._bulk_post('plans/bulk/', rows, chunk_size, timeout)
+    
+    async def update_plan(self, plan_id: str, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Update pricing plan"""
+        return await self._make_request('PUT', f'plans/{plan_id}/', timeout, json=data)
+    
+    async def delete_plan(self, plan_id: str, timeout: Optional[float] = None) -> None:
+        """Delete pricing plan"""
+        await self._make_request('DELETE', f'plans/{plan_id}/', timeout)
+    
+    # Customers
+    async def get_customers(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get all customers"""
+        return await self._get_all('customers/', timeout)
+    
+    def iter_customers_pages(self, page_size: Optional[int] = None,
+                             timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of customers"""
+        return self._iter_pages('customers/', page_size, timeout)
+    
+    async def get_active_customers(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get active customers"""
+        return await self._get_all('customers/active/', timeout)
+    
+    def iter_active_customers_pages(self, page_size: Optional[int] = None,
+                                    timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of active customers"""
+        return self._iter_pages('customers/active/', page_size, timeout)
+    
+    async def get_customer(self, customer_id: str, timeout: Optional[float] = None) -> Dict:
+        """Get specific customer"""
+        return await self._make_request('GET', f'customers/{customer_id}/', timeout)
+    
+    async def get_many_customers(self, customer_ids: List[str], timeout: Optional[float] = None) -> List[Dict]:
+        """Get several customers concurrently"""
+        return await self._get_many('customers/', customer_ids, timeout)
+    
+    async def create_customer(self, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Create new customer"""
+        return await self._make_request('POST', 'customers/', timeout, json=data)
+    
+    async def bulk_create_customers(self, rows: List[Dict], chunk_size: int = 5000,
+                                    timeout: Optional[float] = None) -> Dict:
+        """Create or update (by email) many customers"""
+        return await self._bulk_post('customers/bulk/', rows, chunk_size, timeout)
+    
+    async def update_customer(self, customer_id: str, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Update customer"""
+        return await self._make_request('PUT', f'customers/{customer_id}/', timeout, json=data)
+    
+    async def delete_customer(self, customer_id: str, timeout: Optional[float] = None) -> None:
+        """Delete customer"""
+        await self._make_request('DELETE', f'customers/{customer_id}/', timeout)
+    
+    # Subscriptions
+    async def get_subscriptions(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get all subscriptions"""
+        return await self._get_all('subscriptions/', timeout)
+    
+    def iter_subscriptions_pages(self, page_size: Optional[int] = None,
+                                 timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of subscriptions"""
+        return self._iter_pages('subscriptions/', page_size, timeout)
+    
+    async def get_active_subscriptions(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get active subscriptions"""
+        return await self._get_all('subscriptions/active/', timeout)
+    
+    def iter_active_subscriptions_pages(self, page_size: Optional[int] = None,
+                                        timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of active subscriptions"""
+        return self._iter_pages('subscriptions/active/', page_size, timeout)
+    
+    async def get_subscription(self, subscription_id: str, timeout: Optional[float] = None) -> Dict:
+        """Get specific subscription"""
+        return await self._make_request('GET', f'subscriptions/{subscription_id}/', timeout)
+    
+    async def get_many_subscriptions(self, subscription_ids: List[str],
+                                     timeout: Optional[float] = None) -> List[Dict]:
+        """Get several subscriptions concurrently"""
+        return await self._get_many('subscriptions/', subscription_ids, timeout)
+    
+    async def create_subscription(self, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Create new subscription"""
+        return await self._make_request('POST', 'subscriptions/', timeout, json=data)
+    
+    async def bulk_create_subscriptions(self, rows: List[Dict], chunk_size: int = 5000,
+                                        timeout: Optional[float] = None) -> Dict:
+        """Create many subscriptions"""
+        return await self._bulk_post('subscriptions/bulk/', rows, chunk_size, timeout)
+    
+    async def update_subscription(self, subscription_id: str, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Update subscription"""
+        return await self._make_request('PUT', f'subscriptions/{subscription_id}/', timeout, json=data)
+    
+    async def cancel_subscription(self, subscription_id: str, timeout: Optional[float] = None) -> Dict:
+        """Cancel subscription"""
+        return await self.update_subscription(subscription_id, {'status': 'cancelled'}, timeout)
+    
+    # Invoices
+    async def get_invoices(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get all invoices"""
+        return await self._get_all('invoices/', timeout)
+    
+    def iter_invoices_pages(self, page_size: Optional[int] = None,
+                            timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of invoices"""
+        return self._iter_pages('invoices/', page_size, timeout)
+    
+    async def get_pending_invoices(self, timeout: Optional[float] = None) -> List[Dict]:
+        """Get pending invoices"""
+        return await self._get_all('invoices/pending/', timeout)
+    
+    def iter_pending_invoices_pages(self, page_size: Optional[int] = None,
+                                    timeout: Optional[float] = None) -> AsyncIterator[List[Dict]]:
+        """Lazily iterate over pages of pending invoices"""
+        return self._iter_pages('invoices/pending/', page_size, timeout)
+    
+    async def get_invoice(self, invoice_id: str, timeout: Optional[float] = None) -> Dict:
+        """Get specific invoice"""
+        return await self._make_request('GET', f'invoices/{invoice_id}/', timeout)
+    
+    async def get_many_invoices(self, invoice_ids: List[str], timeout: Optional[float] = None) -> List[Dict]:
+        """Get several invoices concurrently"""
+        return await self._get_many('invoices/', invoice_ids, timeout)
+    
+    async def create_invoice(self, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Create new invoice"""
+        return await self._make_request('POST', 'invoices/', timeout, json=data)
+    
+    async def mark_invoice_paid(self, invoice_id: str, timeout: Optional[float] = None) -> Dict:
+        """Mark invoice as paid"""
+        return await self._make_request('PUT', f'invoices/{invoice_id}/', timeout, json={'status': 'paid'})
+    
+    # Usage
+    async def record_usage(self, events: List[Dict], durability: Optional[str] = None,
+                           timeout: Optional[float] = None) -> Dict:
+        """Send a batch of usage events (``subscription``, ``metric``, ``delta``)"""
+        endpoint = 'usage-events/' + (f'?durability={durability}' if durability else '')
+        return await self._make_request('POST', endpoint, timeout, json=events)
+    
+    # Quotes
+    async def quote_batch(self, rows: List[Dict], chunk_size: int = 20000,
+                          timeout: Optional[float] = None) -> List[Dict]:
+        """Price many plan/cycle/discount/custom price/seat combinations, chunks in parallel"""
+        starts = range(0, len(rows), chunk_size)
+        responses = await asyncio.gather(*(
+            self._make_request('POST', 'quotes/batch/', timeout, json=rows[start:start + chunk_size])
+            for start in starts
+        ))
+        return [
+            {**result, 'index': result['index'] + start}
+            for start, response in zip(starts, responses)
+            for result in response['results']
+        ]
+    
+    # Dashboard
+    async def get_dashboard_data(self, timeout: Optional[float] = None) -> Dict:
+        """Get pricing dashboard data"""
+        return await self._make_request('GET', 'dashboard/', timeout)
+    
+    # Settings
+    async def get_settings(self, timeout: Optional[float] = None) -> Dict:
+        """Get pricing settings"""
+        return await self._make_request('GET', 'settings/', timeout)
+    
+    async def update_settings(self, data: Dict, timeout: Optional[float] = None) -> Dict:
+        """Update pricing settings"""
+        return await self._make_request('PUT', 'settings/', timeout, json=data)
+
+
 # Example usage in your main docAnalysis service
 def example_integration():
     """Example of how to use the pricing service client"""
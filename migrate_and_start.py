@@ -128,15 +128,27 @@ def main():
     port = os.environ.get('PORT', '8000')
     print(f"Binding to 0.0.0.0:{port}")
     
+    # SERVER_MODE=asgi runs uvicorn workers, which keep serving cheap reads
+    # while slow requests are in flight
+    if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+        worker = ['--worker-class', 'uvicorn_worker.UvicornWorker']
+        app = 'pricing_service.asgi:application'
+    else:
+        # WEB_THREADS > 1 switches gunicorn to threaded workers; the database
+        # pool is sized to match (see pricing_service.database)
+        worker = ['--threads', os.environ.get('WEB_THREADS', '1')]
+        app = 'pricing_service.wsgi:application'
+    
     os.execvp('gunicorn', [
         'gunicorn',
         '--bind', f'0.0.0.0:{port}',
-        '--workers', '3',
+        '--workers', os.environ.get('WEB_CONCURRENCY', '3'),
+        *worker,
         '--timeout', '120',
         '--access-logfile', '-',
         '--error-logfile', '-',
         '--log-level', 'info',
-        'pricing_service.wsgi:application'
+        app
     ])
 
 if __name__ == '__main__':
@@ -0,0 +1,195 @@
+"""
+Coroutine read paths for the ASGI deployment.
+
+When the service runs under ``pricing_service.asgi`` (``SERVER_MODE=asgi``),
+``pricing.urls`` passes the router's routes through ``with_async_reads()``,
+which serves the hottest reads with these views:
+
+- ``plans/active/`` and ``plans/featured/``
+- customer and subscription detail
+- health
+
+Everything else stays on the regular viewsets, which Django runs in a worker
+thread per request. The views here subclass the regular viewsets, so
+authentication, filters, serializers, pagination and ETags are the same. Only
+the handlers are coroutines. They use the async ORM methods (``aaggregate``,
+``aget``, ``async for``) and the ``a``-prefixed conditional and pagination
+helpers. Other methods on a routed URL, such as ``PUT`` on a customer, still
+reach the synchronous handler.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.http import Http404, JsonResponse
+from django.urls import URLPattern
+from django.utils import timezone
+from rest_framework.response import Response
+
+from pricing_service.database import pool_stats
+
+from .views import CustomerViewSet, PricingPlanViewSet, SubscriptionViewSet
+
+
+class AsyncReadMixin:
+    """Dispatch a viewset on the event loop, awaiting its coroutine handlers
+
+    ``initial()`` (authentication, which may load the user, plus permissions
+    and throttles) runs in a worker thread. Synchronous handlers do too, just
+    as Django runs a sync view under ASGI. ``async_actions`` names the actions
+    the subclass implements as coroutines.
+    """
+    async_actions = set()
+
+    @classmethod
+    def sync_viewset(cls):
+        """The regular viewset this one extends"""
+        mro = cls.__mro__
+        return mro[mro.index(AsyncReadMixin) + 1]
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        # DRF builds a plain function that returns dispatch()'s coroutine;
+        # marking it makes Django await it (and wrap it in async_to_sync under WSGI)
+        return markcoroutinefunction(super().as_view(actions, **initkwargs))
+
+    def get_view_name(self):
+        return self.settings.VIEW_NAME_FUNCTION(self._as_sync_viewset())
+
+    def get_view_description(self, html=False):
+        return self.settings.VIEW_DESCRIPTION_FUNCTION(self._as_sync_viewset(), html)
+
+    def _as_sync_viewset(self):
+        """A copy of this view as the regular viewset, for OPTIONS names and descriptions"""
+        view = object.__new__(self.sync_viewset())
+        view.__dict__.update(self.__dict__)
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        """``get_object`` for coroutine handlers"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def retrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(request, await self.aobject_validators(request), self._aretrieve)
+
+    async def _aretrieve(self):
+        instance = await self.aget_object()
+        return Response(self.get_serializer(instance).data)
+
+    async def _apaginated(self, queryset):
+        page = await self.apaginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class AsyncPricingPlanViewSet(AsyncReadMixin, PricingPlanViewSet):
+    """Active and featured plans as coroutines"""
+    async_actions = {'active', 'featured'}
+
+    async def active(self, request):
+        """Get all active pricing plans"""
+        plans = self.active_queryset()
+        return await self.aconditional_response(
+            request, await self.acollection_validators(request, plans), lambda: self._apaginated(plans)
+        )
+
+    async def featured(self, request):
+        """Get featured pricing plans"""
+        plans = self.featured_queryset()
+        return await self.aconditional_response(
+            request, await self.acollection_validators(request, plans), lambda: self._apaginated(plans)
+        )
+
+
+class AsyncCustomerViewSet(AsyncReadMixin, CustomerViewSet):
+    """Customer detail reads as coroutines"""
+    async_actions = {'retrieve'}
+
+
+class AsyncSubscriptionViewSet(AsyncReadMixin, SubscriptionViewSet):
+    """Subscription detail reads as coroutines"""
+    async_actions = {'retrieve'}
+
+
+ASYNC_VIEWSETS = [AsyncPricingPlanViewSet, AsyncCustomerViewSet, AsyncSubscriptionViewSet]
+
+
+def with_async_reads(urlpatterns):
+    """Return router ``urlpatterns`` with the routes of async actions served by ASYNC_VIEWSETS
+
+    Patterns, names and order are kept. Only the view changes, and it gets the
+    actions and initkwargs the router gave the regular viewset.
+    """
+    async_viewsets = {viewset.sync_viewset(): viewset for viewset in ASYNC_VIEWSETS}
+    patterns = []
+    for pattern in urlpatterns:
+        callback = pattern.callback
+        viewset = async_viewsets.get(getattr(callback, 'cls', None))
+        if viewset is not None and viewset.async_actions & set(callback.actions.values()):
+            pattern = URLPattern(
+                pattern.pattern, viewset.as_view(callback.actions, **callback.initkwargs),
+                pattern.default_args, pattern.name,
+            )
+        patterns.append(pattern)
+    return patterns
+
+
+def _ping_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return pool_stats(connection)
+
+
+async def health_check(request):
+    """Health check endpoint for Railway deployment"""
+    if request.method not in ('GET', 'HEAD'):
+        response = JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        response['Allow'] = 'GET, HEAD'
+        return response
+    try:
+        # Test database connection
+        pool = await sync_to_async(_ping_database)()
+        payload = {
+            'status': 'healthy',
+            'database': 'connected',
+            'timestamp': timezone.now().isoformat()
+        }
+        if pool is not None:
+            payload['database_pool'] = pool
+        return JsonResponse(payload)
+    except Exception as e:
+        return JsonResponse({
+            'status': 'unhealthy',
+            'database': 'disconnected',
+            'error': str(e),
+            'timestamp': timezone.now().isoformat()
+        }, status=503)
@@ -0,0 +1,259 @@
+"""
+Audit trail for API writes.
+
+``AuditMixin`` records an ``AuditLog`` entry for every create, update and
+delete a viewset performs. The request thread does only the cheap part: it
+snapshots the row's field values and appends the entry to a bounded in-process
+queue. A background thread turns queued entries into before/after diffs and
+writes them with ``bulk_create`` every ``AUDIT_FLUSH_INTERVAL`` seconds, or as
+soon as ``AUDIT_BATCH_SIZE`` entries are waiting.
+
+The queue holds at most ``AUDIT_QUEUE_SIZE`` entries. When it is full, new
+entries are dropped and counted rather than blocking requests. Entries still
+queued are written when the process exits normally; a crash loses at most one
+flush interval. ``AuditLog.timestamp`` is the write time, so it can trail the
+change by up to one interval.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+from uuid import UUID
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import AuditLog, Customer, Invoice, PricingPlan, Subscription
+
+
+logger = logging.getLogger(__name__)
+
+# AuditLog foreign key -> model it points at
+AUDIT_LINK_MODELS = {
+    'plan_id': PricingPlan,
+    'customer_id': Customer,
+    'subscription_id': Subscription,
+    'invoice_id': Invoice,
+}
+AUDIT_VERBS = {
+    'created': 'created', 'updated': 'updated', 'deleted': 'deleted',
+    'cancelled': 'cancelled', 'paid': 'marked paid', 'overdue': 'marked overdue',
+    'activated': 'activated', 'renewed': 'renewed', 'expired': 'expired',
+}
+
+
+@lru_cache(maxsize=None)
+def _fields(model):
+    names = tuple(field.attname for field in model._meta.concrete_fields)
+    return names, attrgetter(*names)
+
+
+def snapshot(instance):
+    """Return ``{attname: value}`` for every concrete field of ``instance``"""
+    names, getter = _fields(type(instance))
+    return dict(zip(names, getter(instance)))
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def diff(before, after):
+    """Return ``{field: [old, new]}`` for the fields that differ"""
+    before, after = before or {}, after or {}
+    return {
+        field: [_jsonable(before.get(field)), _jsonable(after.get(field))]
+        for field in sorted(before.keys() | after.keys())
+        if field not in ('created_at', 'updated_at') and before.get(field) != after.get(field)
+    }
+
+
+def client_ip(request):
+    # Behind the Railway/Docker proxy the client is the first forwarded hop
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded:
+        return forwarded.split(',')[0].strip() or None
+    return request.META.get('REMOTE_ADDR') or None
+
+
+class AuditWriter:
+    """Bounded queue of audit entries and the thread that writes them"""
+
+    def __init__(self, background=True):
+        self.background = background
+        self.dropped = 0
+        self._entries = deque()
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, entry):
+        if len(self._entries) >= settings.AUDIT_QUEUE_SIZE:
+            self.dropped += 1
+            return
+        self._entries.append(entry)
+        if self._thread is None and self.background:
+            self._start()
+        if len(self._entries) >= settings.AUDIT_BATCH_SIZE:
+            self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Write every queued entry; returns how many were written"""
+        written = 0
+        while self._entries:
+            batch = []
+            try:
+                while len(batch) < settings.AUDIT_BATCH_SIZE:
+                    batch.append(self._entries.popleft())
+            except IndexError:
+                pass
+            write_entries(batch)
+            written += len(batch)
+        if self.dropped:
+            logger.warning('Audit queue was full; dropped %d entries', self.dropped)
+            self.dropped = 0
+        return written
+
+    def _run(self):
+        while True:
+            self._wake.wait(settings.AUDIT_FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Audit flush failed; the batch was lost')
+            finally:
+                close_old_connections()
+
+    def _reset_after_fork(self):
+        # The writer thread does not survive a fork, and the parent's entries
+        # are the parent's to write
+        self.__init__(self.background)
+
+
+def write_entries(entries):
+    """Turn queued entries into AuditLog rows and insert them"""
+    # Links to rows deleted since (including the audited row itself on delete)
+    # would violate the foreign keys; keep the id in the diff and drop the link.
+    existing = {}
+    for link, model in AUDIT_LINK_MODELS.items():
+        wanted = {entry['links'][link] for entry in entries if entry['links'].get(link)}
+        existing[link] = set(model.objects.filter(pk__in=wanted).values_list('pk', flat=True)) if wanted else set()
+
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            action_type=entry['action_type'],
+            description=entry['description'],
+            changes=diff(entry['before'], entry['after']),
+            ip_address=entry['ip_address'],
+            user_agent=entry['user_agent'],
+            **{link: value for link, value in entry['links'].items() if value in existing[link]},
+        )
+        for entry in entries
+    ], batch_size=settings.AUDIT_BATCH_SIZE)
+
+
+audit_writer = AuditWriter()
+os.register_at_fork(after_in_child=audit_writer._reset_after_fork)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        audit_writer.flush()
+    except Exception:
+        logger.exception('Could not write queued audit entries at exit')
+
+
+def record(request, action_type, before, after, links, label):
+    """Queue one audit entry once the surrounding transaction commits"""
+    if not settings.AUDIT_ENABLED:
+        return
+    user = getattr(request, 'user', None)
+    verb = AUDIT_VERBS[action_type.rsplit('_', 1)[1]]
+    description = f'{label} {verb}'
+    if user is not None and user.is_authenticated:
+        description = f'{description} by {user.get_username()}'
+    entry = {
+        'action_type': action_type,
+        'description': description,
+        'before': before,
+        'after': after,
+        'links': links,
+        'ip_address': client_ip(request),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+    }
+    transaction.on_commit(lambda: audit_writer.submit(entry))
+
+
+class AuditMixin:
+    """Record an AuditLog entry for each create, update and delete
+
+    ``audit_actions`` maps ``create``/``update``/``destroy`` to an
+    ``AuditLog.ACTION_TYPES`` value; override ``get_audit_action`` for actions
+    that depend on what changed. ``audit_links`` maps AuditLog foreign keys to
+    the attribute of the audited row that holds the id.
+    """
+    audit_actions = {}
+    audit_links = {}
+    audit_label_field = 'name'
+
+    def get_audit_action(self, operation, before, after):
+        return self.audit_actions.get(operation)
+
+    def audit(self, operation, before, after):
+        action_type = self.get_audit_action(operation, before, after)
+        if action_type is None:
+            return
+        row = after or before
+        label = f'{self.queryset.model._meta.verbose_name} {row.get(self.audit_label_field) or row["id"]}'
+        links = {link: row.get(attname) for link, attname in self.audit_links.items()}
+        record(self.request, action_type, before, after, links, label)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.audit('create', None, snapshot(serializer.instance))
+
+    def perform_update(self, serializer):
+        before = snapshot(serializer.instance)
+        super().perform_update(serializer)
+        self.audit('update', before, snapshot(serializer.instance))
+
+    def perform_destroy(self, instance):
+        before = snapshot(instance)
+        super().perform_destroy(instance)
+        self.audit('destroy', before, None)
+
+    def write_bulk_rows(self, valid):
+        written = super().write_bulk_rows(valid)
+        supplied = dict(valid)
+        for index, (instance, created) in written.items():
+            if created:
+                self.audit('create', None, snapshot(instance))
+                continue
+            # An upsert only knows the columns the row supplied, not what they replaced
+            after = {
+                (f'{field}_id' if field in self.bulk_related else field): value
+                for field, value in supplied[index].items()
+            }
+            after['id'] = instance.pk
+            self.audit('update', None, after)
+        return written
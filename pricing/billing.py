@@ -0,0 +1,169 @@
+"""
+Billing runs.
+
+A run invoices every active subscription whose ``next_billing_date`` has
+passed. Subscriptions are claimed in chunks with ``SELECT ... FOR UPDATE SKIP
+LOCKED``, so any number of workers can share one run without coordinating:
+each claims rows the others have not locked. Every chunk commits on its own,
+together with the advanced ``next_billing_date`` and its dashboard rollup
+deltas, so an interrupted run is resumed simply by starting another one.
+``(subscription, period_start)`` is unique on Invoice, so no billing period is
+ever invoiced twice.
+
+Each run bills the period in progress at the run time. Periods that passed
+while a subscription was not active are not back-billed.
+"""
+
+import calendar
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import rollups
+from .config import get_pricing_config
+from .models import DashboardRollup, Invoice, Subscription
+from .numbering import assign_invoice_numbers
+
+
+# Months per billing period; lifetime plans are invoiced once
+BILLING_CYCLE_MONTHS = {'monthly': 1, 'quarterly': 3, 'yearly': 12, 'lifetime': None}
+BILLING_CHUNK_SIZE = 500
+CENT = Decimal('0.01')
+
+
+@dataclass
+class BillingRunResult:
+    """Totals for one billing run (or one worker's share of it)"""
+    subscriptions: int = 0
+    invoices: int = 0
+    total_amount: Decimal = field(default_factory=lambda: Decimal('0.00'))
+    remaining: bool = False
+
+    def add(self, other):
+        self.subscriptions += other.subscriptions
+        self.invoices += other.invoices
+        self.total_amount += other.total_amount
+        self.remaining = self.remaining or other.remaining
+        return self
+
+
+def add_months(value, months):
+    """Shift a datetime by whole months, clamping to the end of shorter months"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def billing_period(subscription, at):
+    """Return ``(period_start, next_period_start)`` for the period in progress at ``at``
+
+    Periods are counted from ``start_date`` so month-end anchors do not drift.
+    ``next_period_start`` is None for lifetime plans.
+    """
+    start = subscription.start_date
+    months = BILLING_CYCLE_MONTHS.get(subscription.plan.billing_cycle)
+    if months is None:
+        return start, None
+    elapsed = (at.year - start.year) * 12 + at.month - start.month
+    periods = max(elapsed // months, 0)
+    if periods and add_months(start, periods * months) > at:
+        periods -= 1
+    return add_months(start, periods * months), add_months(start, (periods + 1) * months)
+
+
+def price_invoice(subscription, config, first_invoice):
+    """Return ``(subtotal, discount, tax, total)`` for one billing period"""
+    plan = subscription.plan
+    price = subscription.custom_price or plan.base_price
+    subtotal = price + (plan.setup_fee if first_invoice else Decimal('0.00'))
+    discount = (price - subscription.effective_price).quantize(CENT, rounding=ROUND_HALF_UP)
+    tax = ((subtotal - discount) * config.tax_rate / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+    return subtotal, discount, tax, subtotal - discount + tax
+
+
+def due_subscriptions(at):
+    return Subscription.objects.filter(status='active', next_billing_date__lte=at)
+
+
+def bill_chunk(at, config, chunk_size=BILLING_CHUNK_SIZE):
+    """Claim and invoice up to ``chunk_size`` due subscriptions in one transaction"""
+    result = BillingRunResult()
+    with transaction.atomic():
+        subscriptions = list(
+            due_subscriptions(at).select_related('plan')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('next_billing_date')[:chunk_size]
+        )
+        if not subscriptions:
+            return result
+
+        # Latest period a run has invoiced; manual invoices have no period_start
+        latest_billed = dict(
+            Invoice.objects.filter(subscription__in=subscriptions, period_start__isnull=False)
+            .values('subscription_id').annotate(latest=Max('period_start')).values_list('subscription_id', 'latest')
+        )
+
+        invoices = []
+        deltas = []
+        now = timezone.now()
+        for subscription in subscriptions:
+            period_start, next_period_start = billing_period(subscription, at)
+            subscription.next_billing_date = next_period_start
+            subscription.updated_at = now
+            if subscription.end_date and period_start >= subscription.end_date:
+                subscription.next_billing_date = None
+                continue
+            latest = latest_billed.get(subscription.pk)
+            if latest is not None and latest >= period_start:
+                continue  # this period is already invoiced
+
+            # Manual invoices never carry the setup fee, so it goes on the first period a run bills
+            subtotal, discount, tax, total = price_invoice(subscription, config, first_invoice=latest is None)
+            invoices.append(Invoice(
+                subscription=subscription,
+                status='sent',
+                issue_date=at,
+                due_date=at + timedelta(days=config.payment_terms_days),
+                period_start=period_start,
+                subtotal=subtotal,
+                discount_amount=discount,
+                tax_amount=tax,
+                total_amount=total,
+                notes=config.invoice_notes,
+            ))
+            deltas.append(rollups.invoice_contributions('sent', total, subscription.plan_id, None, at))
+            result.total_amount += total
+
+        assign_invoice_numbers(invoices)
+        Invoice.objects.bulk_create(invoices, batch_size=chunk_size)
+        Subscription.objects.bulk_update(subscriptions, ['next_billing_date', 'updated_at'], batch_size=chunk_size)
+        # bulk_create skips Invoice.save(), which normally keeps the rollups current
+        DashboardRollup.objects.apply(rollups.merge(*deltas))
+
+    result.subscriptions = len(subscriptions)
+    result.invoices = len(invoices)
+    return result
+
+
+def run_billing(at=None, chunk_size=BILLING_CHUNK_SIZE, max_chunks=None):
+    """Bill due subscriptions chunk by chunk until none are left (or ``max_chunks`` ran)
+
+    Returns when every due subscription is either billed or locked by another
+    worker. ``remaining`` is set when ``max_chunks`` stopped the run early.
+    """
+    at = at or timezone.now()
+    result = BillingRunResult()
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        chunk = bill_chunk(at, get_pricing_config(), chunk_size)
+        if not chunk.subscriptions:
+            return result
+        result.add(chunk)
+        chunks += 1
+    result.remaining = due_subscriptions(at).exists()
+    return result
@@ -0,0 +1,162 @@
+"""
+Bulk create/upsert endpoints.
+
+A bulk request validates every row with one reusable serializer whose fields do
+no per-row queries. Foreign keys are checked with one query per chunk, and the
+valid rows are written with ``bulk_create`` inside a single transaction. Whether
+an upserted row was created or updated is read from the write itself. The
+response reports a result for each input row, by index.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+MAX_BULK_ROWS = 50000
+BULK_BATCH_SIZE = 1000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BulkUpsertMixin:
+    """Adds ``POST .../bulk/`` to a viewset
+
+    ``bulk_serializer_class`` validates one row at a time and must not query
+    the database. ``bulk_unique_field`` names the upsert key: rows whose key
+    already exists are updated (only the columns they supply); without it every
+    row is inserted. ``bulk_related`` maps foreign key fields to their models;
+    those fields arrive as UUIDs and are checked in bulk.
+    """
+    bulk_serializer_class = None
+    bulk_unique_field = None
+    bulk_related = {}
+
+    @action(detail=False, methods=['post'], pagination_class=None)
+    def bulk(self, request):
+        """Create or update many rows in one request"""
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of objects.']})
+        if len(rows) > MAX_BULK_ROWS:
+            raise ValidationError({'non_field_errors': [f'At most {MAX_BULK_ROWS} rows per request.']})
+
+        results = [None] * len(rows)
+        valid = self.validate_bulk_rows(rows, results)
+        self.check_bulk_related(valid, results)
+        valid = [(index, data) for index, data in valid if results[index] is None]
+
+        with transaction.atomic():
+            written = self.write_bulk_rows(valid)
+        for index, (instance, created) in written.items():
+            results[index] = {'index': index, 'status': 'created' if created else 'updated', 'id': str(instance.pk)}
+
+        summary = defaultdict(int)
+        for result in results:
+            summary[result['status']] += 1
+        return Response({
+            'created': summary['created'],
+            'updated': summary['updated'],
+            'errors': summary['error'],
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+    def validate_bulk_rows(self, rows, results):
+        """Run field validation on every row; returns ``[(index, validated_data)]``"""
+        serializer = self.bulk_serializer_class(context=self.get_serializer_context())
+        valid = []
+        seen_keys = {}
+        for index, row in enumerate(rows):
+            try:
+                if not isinstance(row, dict):
+                    raise ValidationError({'non_field_errors': ['Expected an object.']})
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                results[index] = {'index': index, 'status': 'error', 'errors': exc.detail}
+                continue
+            if self.bulk_unique_field:
+                key = data[self.bulk_unique_field]
+                if key in seen_keys:
+                    results[index] = {'index': index, 'status': 'error', 'errors': {
+                        self.bulk_unique_field: [f'Duplicate of row {seen_keys[key]} in this request.']
+                    }}
+                    continue
+                seen_keys[key] = index
+            valid.append((index, data))
+        return valid
+
+    def check_bulk_related(self, valid, results):
+        """Flag rows whose foreign keys point at rows that do not exist"""
+        for field, model in self.bulk_related.items():
+            wanted = {data[field] for _, data in valid if data.get(field) is not None}
+            existing = set()
+            for chunk in _chunks(list(wanted), BULK_BATCH_SIZE):
+                existing.update(model.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+            for index, data in valid:
+                if data.get(field) is not None and data[field] not in existing:
+                    results[index] = {'index': index, 'status': 'error', 'errors': {
+                        field: [f'Invalid pk "{data[field]}" - object does not exist.']
+                    }}
+
+    def build_bulk_instance(self, data):
+        model = self.queryset.model
+        values = {
+            (f'{field}_id' if field in self.bulk_related else field): value
+            for field, value in data.items()
+        }
+        return model(**values)
+
+    def write_bulk_rows(self, valid):
+        """Write the validated rows; returns ``{index: (instance, created)}``"""
+        model = self.queryset.model
+        key = self.bulk_unique_field
+
+        # Rows that supply the same columns can share one upsert statement
+        groups = defaultdict(list)
+        for index, data in valid:
+            groups[frozenset(data)].append((index, data))
+
+        written = {}
+        for columns, group in groups.items():
+            instances = [self.build_bulk_instance(data) for _, data in group]
+            options = {'batch_size': BULK_BATCH_SIZE}
+            if key:
+                update_fields = [
+                    f'{column}_id' if column in self.bulk_related else column
+                    for column in columns if column != key
+                ]
+                options.update(
+                    update_conflicts=True, unique_fields=[key], update_fields=update_fields + ['updated_at']
+                )
+            model.objects.bulk_create(instances, **options)
+            for (index, data), instance in zip(group, instances):
+                written[index] = (instance, True)
+
+        if key:
+            # Upserted rows keep their stored pk, which bulk_create does not
+            # return for UUID keys, so read the pks back by upsert key. A row
+            # was inserted by this write exactly when it kept the pk generated
+            # here; a pre-read of existing keys would miss concurrent inserts.
+            pks = {}
+            instances = [instance for instance, _ in written.values()]
+            for chunk in _chunks(instances, BULK_BATCH_SIZE):
+                pks.update(model.objects.filter(
+                    **{f'{key}__in': [getattr(instance, key) for instance in chunk]}
+                ).values_list(key, 'pk'))
+            for index, (instance, _) in written.items():
+                stored = pks[getattr(instance, key)]
+                written[index] = (instance, stored == instance.pk)
+                instance.pk = stored
+
+        self.after_bulk_write([instance for instance, created in written.values() if created])
+        return written
+
+    def after_bulk_write(self, created):
+        """Hook for bookkeeping that ``save()`` would normally do"""
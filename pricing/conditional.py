@@ -0,0 +1,150 @@
+"""
+ETag / Last-Modified support for the pricing viewsets.
+
+Validators come from a single aggregate query (``max(updated_at)`` and row
+counts), so a matching ``If-None-Match`` is answered with a 304 before any
+object is loaded or serialized. ``If-Modified-Since`` is not honoured: a delete
+lowers a row count without moving ``Last-Modified`` forward, so only the ETag
+notices it. The ``a``-prefixed
+methods are the same steps for coroutine handlers (see ``pricing.async_views``).
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _latest(stats):
+    """Newest ``updated_at`` among the row's or collection's own and its dependencies'"""
+    values = [
+        value for key, value in stats.items()
+        if (key == 'last_modified' or key.startswith('updated_')) and value is not None
+    ]
+    return max(values, default=None)
+
+
+class ConditionalGetMixin:
+    """Answer conditional GETs on detail reads (and optionally collections)
+
+    ``etag_dependencies`` lists the relations a detail response embeds; their
+    latest ``updated_at`` and row count are folded into the object's ETag so a
+    change to nested data also changes the validator. Set
+    ``conditional_collections = True`` to do the same for ``list``; there the
+    dependencies under each ``?expand=``-ed relation are folded in.
+    """
+    etag_updated_field = 'updated_at'
+    etag_dependencies = []
+    conditional_collections = False
+
+    def _validators(self, request, values, last_modified):
+        digest = hashlib.sha256(repr((
+            self.queryset.model._meta.label, self.action, request.get_full_path(), values,
+        )).encode('utf-8')).hexdigest()[:32]
+        return quote_etag(digest), last_modified
+
+    def _expanded_dependencies(self):
+        """Relations the collection response embeds through ``?expand=``"""
+        fieldset = self.get_fieldset() if hasattr(self, 'get_fieldset') else None
+        expand = fieldset['expand'] if fieldset else []
+        dependencies = [relation for relation in self.etag_dependencies if relation.split('__')[0] in expand]
+        return dependencies + [name for name in expand if name not in dependencies]
+
+    def _dependency_aggregates(self, relations):
+        aggregates = {}
+        for index, relation in enumerate(relations):
+            aggregates[f'updated_{index}'] = Max(f'{relation}__updated_at')
+            aggregates[f'count_{index}'] = Count(relation, distinct=True)
+        return aggregates
+
+    def _collection_stats(self, queryset):
+        relations = self._expanded_dependencies()
+        # Joining the expanded relations repeats each row, so count the rows themselves distinctly
+        aggregates = {'last_modified': Max(self.etag_updated_field), 'count': Count('pk', distinct=bool(relations))}
+        aggregates.update(self._dependency_aggregates(relations))
+        return queryset.order_by(), aggregates
+
+    def _collection_validators(self, request, stats):
+        if len(stats) == 2:
+            return self._validators(request, (stats['last_modified'], stats['count']), stats['last_modified'])
+        return self._validators(request, tuple(sorted(stats.items())), _latest(stats))
+
+    def collection_validators(self, request, queryset):
+        queryset, aggregates = self._collection_stats(queryset)
+        return self._collection_validators(request, queryset.aggregate(**aggregates))
+
+    async def acollection_validators(self, request, queryset):
+        queryset, aggregates = self._collection_stats(queryset)
+        return self._collection_validators(request, await queryset.aaggregate(**aggregates))
+
+    def _object_stats(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        aggregates = {'last_modified': Max(self.etag_updated_field)}
+        aggregates.update(self._dependency_aggregates(self.etag_dependencies))
+        queryset = self.queryset.model._default_manager.filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ).order_by()
+        return queryset, aggregates
+
+    def _object_validators(self, request, stats):
+        if stats['last_modified'] is None:
+            return None, None  # no such object; let retrieve() raise the 404
+        return self._validators(request, tuple(sorted(stats.items())), _latest(stats))
+
+    def object_validators(self, request):
+        queryset, aggregates = self._object_stats()
+        return self._object_validators(request, queryset.aggregate(**aggregates))
+
+    async def aobject_validators(self, request):
+        queryset, aggregates = self._object_stats()
+        return self._object_validators(request, await queryset.aaggregate(**aggregates))
+
+    def _not_modified(self, request, validators):
+        """Return ``(304 response or None, headers for a full response)``"""
+        etag, last_modified = validators
+        if etag is None:
+            return None, {}
+        headers = HttpResponse()
+        headers['ETag'] = etag
+        if last_modified is not None:  # an empty collection has none
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        # The ETag alone decides; last_modified is left out so If-Modified-Since cannot match
+        not_modified = get_conditional_response(request, etag=etag, response=headers)
+        if not_modified is not headers:
+            return not_modified, {}
+        return None, {name: headers[name] for name in ('ETag', 'Last-Modified') if headers.has_header(name)}
+
+    def _with_validators(self, response, headers):
+        if response.status_code == 200:
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+    def conditional_response(self, request, validators, respond):
+        """Return a 304 if the client's validators match, otherwise ``respond()``"""
+        not_modified, headers = self._not_modified(request, validators)
+        if not_modified is not None:
+            return not_modified
+        return self._with_validators(respond(), headers)
+
+    async def aconditional_response(self, request, validators, respond):
+        """``conditional_response`` for a coroutine ``respond``"""
+        not_modified, headers = self._not_modified(request, validators)
+        if not_modified is not None:
+            return not_modified
+        return self._with_validators(await respond(), headers)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.object_validators(request),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    def list(self, request, *args, **kwargs):
+        respond = lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        if not self.conditional_collections:
+            return respond()
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(request, self.collection_validators(request, queryset), respond)
@@ -0,0 +1,91 @@
+"""
+Process-local cache of the PricingSettings singleton.
+
+Reads come from memory. Once every ``PRICING_SETTINGS_CACHE_TTL`` seconds
+(default 5) a worker checks the stored ``version`` with a one-column query and
+reloads only if another worker has saved the settings since. A change is
+therefore visible everywhere within one TTL, and in the saving worker as soon
+as its transaction commits.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class PricingConfig:
+    """Read-only snapshot of PricingSettings"""
+    id: UUID
+    version: int
+    default_currency: str
+    tax_rate: Decimal
+    trial_days: int
+    trial_plan_id: Optional[UUID]
+    invoice_prefix: str
+    invoice_notes: str
+    payment_terms_days: int
+    allow_custom_pricing: bool
+    require_approval_for_custom: bool
+    auto_renewal: bool
+
+    @classmethod
+    def from_instance(cls, instance):
+        return cls(**{field: getattr(instance, field) for field in cls.__dataclass_fields__})
+
+
+_lock = threading.Lock()
+_state = {'config': None, 'checked_at': 0.0}
+
+
+def _ttl():
+    return getattr(settings, 'PRICING_SETTINGS_CACHE_TTL', 5.0)
+
+
+def get_pricing_config() -> PricingConfig:
+    """Return the current pricing settings, creating the row if it is missing"""
+    config, checked_at = _state['config'], _state['checked_at']
+    if config is not None and time.monotonic() - checked_at < _ttl():
+        return config
+
+    from .models import PricingSettings
+
+    with _lock:
+        config = _state['config']
+        now = time.monotonic()
+        if config is not None and now - _state['checked_at'] < _ttl():
+            return config
+        if config is not None:
+            version = PricingSettings.objects.values_list('version', flat=True).first()
+            if version == config.version:
+                _state['checked_at'] = now
+                return config
+        instance = PricingSettings.objects.first()
+        if instance is not None:
+            return _cache(instance, now)
+
+    # Create the row outside the lock: saving it registers invalidate_pricing_config
+    # with on_commit, which runs at once in autocommit mode and takes the lock
+    try:
+        instance = PricingSettings.objects.create()
+    except ValueError:  # another thread created it first
+        instance = PricingSettings.objects.first()
+    with _lock:
+        return _cache(instance, time.monotonic())
+
+
+def _cache(instance, now) -> PricingConfig:
+    config = PricingConfig.from_instance(instance)
+    _state['config'], _state['checked_at'] = config, now
+    return config
+
+
+def invalidate_pricing_config() -> None:
+    """Drop this process's cached settings so the next read reloads them"""
+    with _lock:
+        _state['config'] = None
@@ -0,0 +1,83 @@
+"""
+Overdue invoice sweeps.
+
+``sweep_overdue_invoices()`` moves every ``sent`` invoice whose ``due_date`` has
+passed to ``overdue``. It works in batches. Each batch claims up to
+``batch_size`` invoices, oldest due date first, through the partial
+``(due_date) WHERE status = 'sent'`` index with ``SELECT ... FOR UPDATE SKIP
+LOCKED``. It then flips them with one ``UPDATE ... WHERE id IN (...)`` and
+commits together with the batch's audit entries and dashboard rollup deltas.
+Row locks last one batch, and invoices a user is editing are skipped until the
+next sweep rather than waited on.
+"""
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import AuditLog, DashboardRollup, Invoice
+
+
+SWEEP_BATCH_SIZE = 5000
+
+
+@dataclass
+class SweepResult:
+    """Totals for one overdue sweep"""
+    invoices: int = 0
+    total_amount: Decimal = field(default_factory=lambda: Decimal('0.00'))
+    batches: int = 0
+
+
+def overdue_candidates(at):
+    return Invoice.objects.filter(status='sent', due_date__lt=at)
+
+
+def sweep_batch(at, batch_size=SWEEP_BATCH_SIZE):
+    """Mark up to ``batch_size`` past-due invoices overdue; returns ``(count, total_amount)``"""
+    with transaction.atomic():
+        claimed = list(
+            overdue_candidates(at).select_for_update(skip_locked=True)
+            .order_by('due_date')
+            .values_list('pk', 'subscription_id', 'invoice_number', 'total_amount')[:batch_size]
+        )
+        if not claimed:
+            return 0, Decimal('0.00')
+        now = timezone.now()
+        Invoice.objects.filter(pk__in=[row[0] for row in claimed]).update(status='overdue', updated_at=now)
+
+        total = sum((row[3] for row in claimed), Decimal('0.00'))
+        DashboardRollup.objects.apply({
+            (rollups.INVOICES_BY_STATUS, 'sent'): (-len(claimed), -total),
+            (rollups.INVOICES_BY_STATUS, 'overdue'): (len(claimed), total),
+        })
+        if settings.AUDIT_ENABLED:
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    action_type='invoice_overdue',
+                    description=f'Invoice {invoice_number} marked overdue',
+                    invoice_id=pk,
+                    subscription_id=subscription_id,
+                    changes={'status': ['sent', 'overdue']},
+                )
+                for pk, subscription_id, invoice_number, _ in claimed
+            ], batch_size=settings.AUDIT_BATCH_SIZE)
+    return len(claimed), total
+
+
+def sweep_overdue_invoices(at=None, batch_size=SWEEP_BATCH_SIZE, max_batches=None):
+    """Mark every invoice that was due before ``at`` (default now) overdue"""
+    at = at or timezone.now()
+    result = SweepResult()
+    while max_batches is None or result.batches < max_batches:
+        count, total = sweep_batch(at, batch_size)
+        if not count:
+            break
+        result.invoices += count
+        result.total_amount += total
+        result.batches += 1
+    return result
@@ -0,0 +1,58 @@
+"""
+Database-side versions of the computed price properties.
+
+``monthly_price_expression()`` and ``effective_price_expression()`` compute in
+SQL exactly what ``PricingPlan.monthly_price`` and
+``Subscription.effective_price`` compute in Python, rounded half-up to cents
+on both sides, so querysets can filter and sort on real prices.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Case, DecimalField, F, Func, Value, When
+from django.db.models.functions import Coalesce, NullIf, Round
+
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class Divide(Func):
+    """Numeric division that does not truncate on SQLite
+
+    SQLite stores whole-number decimals as integers, so ``10.00 / 3`` would be
+    integer division there.
+    """
+    arg_joiner = ' / '
+    template = '(%(expressions)s)'
+    output_field = DecimalField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='(1.0 * %(expressions)s)', **extra_context)
+
+
+def _money(expression):
+    return Round(expression, 2, output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def monthly_price_expression():
+    """Expression equal to ``PricingPlan.monthly_price`` for the current row"""
+    months = Case(
+        When(billing_cycle='monthly', then=Value(Decimal('1'))),
+        When(billing_cycle='quarterly', then=Value(Decimal('3'))),
+        When(billing_cycle='yearly', then=Value(Decimal('12'))),
+        default=Value(Decimal('120')),  # lifetime, spread over ten years
+        output_field=DecimalField(),
+    )
+    return _money(Divide(F('base_price'), months))
+
+
+def effective_price_expression():
+    """Expression equal to ``Subscription.effective_price`` for the current row"""
+    # custom_price of 0 falls back to the plan price, as ``or`` does in Python
+    price = Coalesce(NullIf(F('custom_price'), Value(Decimal('0'))), F('plan__base_price'), output_field=DecimalField())
+    discount = Divide(price * F('discount_percentage'), Value(Decimal('100')))
+    return _money(price - discount)
@@ -0,0 +1,323 @@
+"""
+Fast path for list reads.
+
+A list page is read with ``values()``. A field map compiled once per serializer
+turns each row into the response dict, so no model instance is built and the
+serializer's fields are not walked for every row. Each field gets a converter
+that does what its ``to_representation`` would. Values the JSON renderer encodes
+itself, such as UUIDs, datetimes and ``ReadOnlyField`` Decimals, are passed
+through unchanged (see ``pricing.renderers``).
+
+The response is the same as the serializer path's. Some fields cannot be mapped:
+nested serializers from ``?expand=``, method fields, and sources that are not
+columns, annotations or properties listed in ``Meta.field_dependencies``. Those
+requests take the regular path, as does every request with
+``FAST_LIST_RESPONSES = False``.
+"""
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+
+MAX_FIELD_MAPS = 256
+_field_maps = {}
+
+
+class RowPage(list):
+    """A page of ``values()`` rows and the field map that renders them"""
+
+    def __init__(self, rows, field_map):
+        super().__init__(rows)
+        self.field_map = field_map
+
+
+class RowListSerializer:
+    """Takes the place of ``ListSerializer`` for a RowPage. Only ``data`` is supported"""
+
+    def __init__(self, page):
+        self.instance = page
+
+    @cached_property
+    def data(self):
+        return self.instance.field_map.represent(self.instance)
+
+
+def _decimal_converter(field):
+    represent = field.to_representation
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.normalize_output or field.decimal_places is None:
+        return represent
+    exponent = -field.decimal_places
+
+    def convert(value):
+        # Columns already have the field's scale, so quantizing would not change them
+        if type(value) is Decimal and value.as_tuple().exponent == exponent:
+            return f'{value:f}'
+        return represent(value)
+    return convert
+
+
+def _datetime_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not settings.USE_TZ or hasattr(field, 'timezone') or output_format is None or output_format.lower() != 'iso-8601':
+        return field.to_representation
+    represent = field.to_representation
+    current = timezone.get_current_timezone()
+
+    def convert(value):
+        # Aware datetimes are left for the renderer, which writes DRF's ISO 8601 with Z
+        if timezone.is_aware(value):
+            return value.astimezone(current)
+        return represent(value)
+    return convert
+
+
+def _converter(field, model_field):
+    """Return a function for ``field.to_representation``, or None when it would return the value as is
+
+    ``model_field`` is the column the value comes from, if there is one.
+    """
+    if isinstance(field, serializers.ReadOnlyField):
+        return None
+    if isinstance(field, serializers.UUIDField):
+        return None if field.uuid_format == 'hex_verbose' else field.to_representation
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return None if field.pk_field is None else field.to_representation
+    if isinstance(field, serializers.JSONField):
+        return field.to_representation if field.binary else None
+    if isinstance(field, serializers.DecimalField):
+        return _decimal_converter(field)
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime_converter(field)
+    if isinstance(field, serializers.ChoiceField):
+        if all(str(key) == key for key in field.choice_strings_to_values.values()) and (
+            isinstance(model_field, (models.CharField, models.TextField))
+        ):
+            return None
+        return field.to_representation
+    if type(field) in (serializers.CharField, serializers.EmailField, serializers.IPAddressField):
+        if isinstance(model_field, (models.CharField, models.TextField, models.GenericIPAddressField)):
+            return None
+        return str
+    if type(field) is serializers.IntegerField:
+        return None if isinstance(model_field, models.IntegerField) else int
+    if type(field) is serializers.BooleanField:
+        return None if isinstance(model_field, models.BooleanField) else field.to_representation
+    return field.to_representation
+
+
+def _lookup_path(model, lookup):
+    """Resolve ``a__b__c`` through forward relations
+
+    Returns ``(final model field, nullable relations on the way)``, or None
+    when the lookup is not a chain of forward foreign keys ending in a column.
+    """
+    parts = lookup.split('__')
+    nullable = []
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(model._meta.pk.name if part == 'pk' else part)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        if index == len(parts) - 1:
+            return field, nullable
+        if not (field.many_to_one or field.one_to_one):
+            return None
+        if field.null:
+            nullable.append('__'.join(parts[:index + 1]))
+        model = field.related_model
+    return None
+
+
+def _namespace_builder(lookups):
+    """Return ``row -> object`` with the lookups as (nested) attributes, for property getters"""
+    tree = {}
+    for lookup in lookups:
+        *parents, leaf = lookup.split('__')
+        node = tree
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = lookup
+
+    def build(row, node=tree):
+        return SimpleNamespace(**{
+            name: build(row, child) if isinstance(child, dict) else row[child]
+            for name, child in node.items()
+        })
+    return build
+
+
+class FieldMap:
+    """How to read and render one serializer's fields from ``values()`` rows
+
+    ``columns`` holds ``(name, key, converter, guard)`` in field order. ``guard``
+    is a nullable relation on the way to a dotted source. When it is null, DRF
+    leaves a read-only field out, so the map does the same. ``properties`` maps
+    a model property to ``(getter, namespace builder)``.
+    """
+
+    def __init__(self, model, columns, lookups, properties, dependencies):
+        self.model = model
+        self.columns = columns
+        self.lookups = lookups
+        self.properties = properties
+        self.dependencies = dependencies
+
+    @classmethod
+    def compile(cls, serializer, queryset):
+        """Return the map for ``serializer``'s fields, or None when a field cannot be mapped"""
+        model = queryset.model
+        selected = queryset.query.annotation_select
+        dependencies = getattr(serializer.Meta, 'field_dependencies', {})
+        columns, lookups, properties = [], {model._meta.pk.name: None}, {}
+        for field in serializer._readable_fields:
+            if isinstance(field, serializers.BaseSerializer) or field.source == '*':
+                return None
+            source = model._meta.pk.name if field.source == 'pk' else field.source
+            if source in selected:
+                lookups[source] = None
+                columns.append((field.field_name, source, _converter(field, None), None))
+                continue
+            if isinstance(getattr(model, source, None), property):
+                if not cls._add_property(model, source, dependencies, lookups, properties):
+                    return None
+                columns.append((field.field_name, source, _converter(field, None), None))
+                continue
+
+            lookup = source.replace('.', '__')
+            resolved = _lookup_path(model, lookup)
+            if resolved is None:
+                return None
+            model_field, nullable = resolved
+            if model_field.is_relation and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                return None
+            guard = None
+            if nullable:
+                # DRF leaves out a read-only field whose relation is null
+                if field.default is not empty or field.allow_null or field.required:
+                    return None
+                guard = nullable[0]
+                lookups[guard] = None
+            lookups[lookup] = None
+            columns.append((field.field_name, lookup, _converter(field, model_field), guard))
+        return cls(model, columns, list(lookups), properties, dependencies)
+
+    @staticmethod
+    def _add_property(model, name, dependencies, lookups, properties):
+        if name not in dependencies or any(_lookup_path(model, lookup) is None for lookup in dependencies[name]):
+            return False
+        for lookup in dependencies[name]:
+            lookups[lookup] = None
+        properties[name] = (getattr(model, name).fget, _namespace_builder(dependencies[name]))
+        return True
+
+    def bind(self, queryset):
+        """Return a RowQuery for ``queryset``, or None when its ordering cannot be read from rows"""
+        lookups, properties = dict.fromkeys(self.lookups), dict(self.properties)
+        pk_name = self.model._meta.pk.name
+        for term in queryset.query.order_by or self.model._meta.ordering:
+            if not isinstance(term, str):
+                return None
+            # Keyset pagination reads each ordering key from the last row for its cursor
+            name = term.lstrip('-')
+            name = pk_name if name == 'pk' else name
+            if name in lookups or name in properties:
+                continue
+            if name in queryset.query.annotation_select or _lookup_path(self.model, name) is not None:
+                lookups[name] = None
+            elif not self._add_property(self.model, name, self.dependencies, lookups, properties):
+                return None
+        return RowQuery(self, queryset.prefetch_related(None).values(*lookups), properties)
+
+    def represent(self, rows):
+        data = []
+        for row in rows:
+            item = {}
+            for name, key, convert, guard in self.columns:
+                if guard is not None and row[guard] is None:
+                    continue
+                value = row[key]
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+
+class RowQuery:
+    """A list query read as ``values()`` rows"""
+
+    def __init__(self, field_map, queryset, properties):
+        self.field_map = field_map
+        self.queryset = queryset
+        self.properties = properties
+
+    def page(self, rows):
+        """Add the computed properties to ``rows`` and wrap them for ``get_serializer``"""
+        for name, (getter, build) in self.properties.items():
+            for row in rows:
+                row[name] = getter(build(row))
+        return RowPage(rows, self.field_map)
+
+
+class FastListMixin:
+    """Serve the list actions in ``fast_list_actions`` from ``values()`` rows
+
+    Goes after ``SparseFieldsetMixin``, whose fieldset picks the fields to map.
+    Handlers keep calling ``paginate_queryset()`` and ``get_serializer(page,
+    many=True)`` as usual. Coroutine handlers await ``apaginate_queryset()``.
+    """
+    fast_list_actions = {'list'}
+
+    def get_row_query(self, queryset):
+        """Return a RowQuery for this list request, or None for the regular path"""
+        if not getattr(settings, 'FAST_LIST_RESPONSES', True) or self.request.method not in ('GET', 'HEAD'):
+            return None
+        if self.action not in self.fast_list_actions:
+            return None
+        key = (
+            self.get_serializer_class(), repr(self.get_fieldset()), queryset.model,
+            tuple(queryset.query.annotation_select), timezone.get_current_timezone_name(),
+        )
+        if key not in _field_maps:
+            if len(_field_maps) >= MAX_FIELD_MAPS:
+                _field_maps.clear()
+            _field_maps[key] = FieldMap.compile(self.get_serializer(), queryset)
+        field_map = _field_maps[key]
+        return None if field_map is None else field_map.bind(queryset)
+
+    def paginate_queryset(self, queryset):
+        rows = self.get_row_query(queryset)
+        if rows is None:
+            return super().paginate_queryset(queryset)
+        page = super().paginate_queryset(rows.queryset)
+        return None if page is None else rows.page(page)
+
+    async def apaginate_queryset(self, queryset):
+        """``paginate_queryset`` for coroutine handlers"""
+        rows = self.get_row_query(queryset)
+        page = await self.paginator.apaginate_queryset(
+            queryset if rows is None else rows.queryset, self.request, view=self,
+        )
+        return page if rows is None else rows.page(page)
+
+    def get_serializer(self, *args, **kwargs):
+        instance = args[0] if args else kwargs.get('instance')
+        if isinstance(instance, RowPage):
+            return RowListSerializer(instance)
+        if kwargs.get('many') and isinstance(instance, QuerySet):
+            # An unpaginated list
+            rows = self.get_row_query(instance)
+            if rows is not None:
+                return RowListSerializer(rows.page(list(rows.queryset)))
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,215 @@
+"""
+Sparse fieldsets and related-resource expansion.
+
+GET requests may pass three query parameters:
+
+- ``?fields=a,b`` keeps only the named top-level fields.
+- ``?exclude=a,b`` drops fields.
+- ``?expand=x,y`` nests related objects. A foreign key such as ``customer``
+  turns from an id into the object, and a reverse relation such as
+  ``invoices`` is added.
+
+The query is narrowed to match. ``only()`` loads just the columns the
+remaining fields read, ``select_related`` joins just the expanded or
+referenced relations, and ``prefetch_related`` fetches just the expanded
+collections, each narrowed the same way. Requests without these parameters are
+served exactly as before.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+FIELDSET_PARAMS = ('fields', 'exclude', 'expand')
+
+
+def parse_names(value):
+    """Split a comma separated query parameter into a list of names"""
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class FieldsetSerializerMixin:
+    """Serializer that takes ``fields``, ``exclude`` and ``expand`` arguments
+
+    ``Meta.expandable_fields`` maps a name to a function that returns the nested
+    serializer. ``Meta.default_expand`` lists the names expanded when the
+    caller does not say. ``Meta.field_dependencies`` maps computed fields
+    (properties, method fields) to the model lookups they read, so the view
+    knows which columns to load.
+    """
+
+    def __init__(self, *args, fields=None, exclude=(), expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if expand is None:
+            expand = getattr(self.Meta, 'default_expand', [])
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in expand:
+            self.fields[name] = expandable[name]()
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+        for name in exclude:
+            self.fields.pop(name, None)
+
+
+def _resolve(model, lookup, annotations, columns, joins, prefetches):
+    """Add what reading ``lookup`` needs; returns False if it is not a model field"""
+    parts = lookup.split('__')
+    if parts[0] in annotations or lookup == 'pk':
+        return True
+    path = []
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        path.append(part)
+        lookup_path = '__'.join(path)
+        if field.one_to_many:
+            # Read for a count or similar, so the rows need only their back reference
+            queryset = field.related_model._default_manager.only(field.field.name)
+            prefetches.setdefault(lookup_path, Prefetch(lookup_path, queryset=queryset))
+            return True
+        if field.many_to_many:
+            prefetches.setdefault(lookup_path, Prefetch(lookup_path))
+            return True
+        columns.add(lookup_path)
+        if field.is_relation and index < len(parts) - 1:
+            joins.add(lookup_path)
+            model = field.related_model
+    return True
+
+
+def query_requirements(serializer, model, annotations=(), extra_lookups=()):
+    """Return ``(columns, joins, prefetches)`` that rendering ``serializer`` needs
+
+    ``columns`` is None when some field reads something other than a model
+    field or declared dependency; the query then loads every column.
+    """
+    columns, joins, prefetches = set(), set(), {}
+    every_column = False
+    dependencies = getattr(getattr(serializer, 'Meta', None), 'field_dependencies', {})
+    lookups = [lookup for name in extra_lookups for lookup in dependencies.get(name, [name])]
+    for name, field in serializer.fields.items():
+        if not isinstance(field, BaseSerializer):
+            if name in dependencies:
+                lookups.extend(dependencies[name])
+            elif field.source == '*':
+                every_column = True
+            else:
+                lookups.append(field.source.replace('.', '__'))
+            continue
+
+        # An expanded relation
+        child = field.child if isinstance(field, ListSerializer) else field
+        relation = model._meta.get_field(field.source)
+        if relation.one_to_many or relation.many_to_many:
+            # The back reference must be loaded for the prefetch to match rows to parents
+            back = [relation.field.name] if relation.one_to_many else []
+            queryset = narrow_queryset(relation.related_model._default_manager.all(), child, back)
+            prefetches[field.source] = Prefetch(field.source, queryset=queryset)
+            continue
+        nested_columns, nested_joins, nested_prefetches = query_requirements(child, relation.related_model)
+        if nested_columns is None:
+            nested_columns = [column.name for column in relation.related_model._meta.concrete_fields]
+        columns.add(field.source)
+        columns.update(f'{field.source}__{column}' for column in nested_columns)
+        joins.add(field.source)
+        joins.update(f'{field.source}__{join}' for join in nested_joins)
+        for lookup, prefetch in nested_prefetches.items():
+            prefetches[f'{field.source}__{lookup}'] = Prefetch(
+                f'{field.source}__{lookup}', queryset=prefetch.queryset,
+            )
+
+    for lookup in lookups:
+        if not _resolve(model, lookup, annotations, columns, joins, prefetches):
+            every_column = True
+    return None if every_column else columns, joins, prefetches
+
+
+def narrow_queryset(queryset, serializer, extra_lookups=()):
+    """Load only the columns, joins and prefetches ``serializer`` reads"""
+    columns, joins, prefetches = query_requirements(
+        serializer, queryset.model, queryset.query.annotations, extra_lookups,
+    )
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if joins:
+        queryset = queryset.select_related(*sorted(joins))
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches.values())
+    if columns is not None:
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """Apply ``?fields=``, ``?exclude=`` and ``?expand=`` to a viewset's reads
+
+    The serializer class must use ``FieldsetSerializerMixin``. Writes ignore
+    the parameters, so validation always sees every field.
+    """
+
+    def get_fieldset(self):
+        """Return the serializer arguments for this request, or None without the parameters"""
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = self._parse_fieldset()
+        return self._fieldset
+
+    def _parse_fieldset(self):
+        params = self.request.query_params
+        if self.request.method not in SAFE_METHODS or not any(param in params for param in FIELDSET_PARAMS):
+            return None
+        serializer_class = self.get_serializer_class()
+        meta = serializer_class.Meta
+        expandable = getattr(meta, 'expandable_fields', {})
+        known = set(serializer_class(expand=[]).fields) | set(expandable)
+
+        errors = {}
+        fields = parse_names(params['fields']) if 'fields' in params else None
+        exclude = parse_names(params.get('exclude', ''))
+        for param, names, allowed in (('fields', fields or [], known), ('exclude', exclude, known)):
+            unknown = [name for name in names if name not in allowed]
+            if unknown:
+                errors[param] = [f"Unknown field: {', '.join(unknown)}."]
+        if 'expand' in params:
+            expand = parse_names(params['expand'])
+            unknown = [name for name in expand if name not in expandable]
+            if unknown:
+                errors['expand'] = [f"Cannot expand: {', '.join(unknown)}. Choose from: {', '.join(expandable)}."]
+        else:
+            expand = [
+                name for name in getattr(meta, 'default_expand', [])
+                if fields is None or name in fields
+            ]
+        if errors:
+            raise ValidationError(errors)
+        expand = [name for name in expand if name not in exclude]
+        return {'fields': fields, 'exclude': exclude, 'expand': expand}
+
+    def needs_field(self, name):
+        """Whether the response shows ``name`` or the request filters or orders on it"""
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return True
+        if (fieldset['fields'] is None or name in fieldset['fields']) and name not in fieldset['exclude']:
+            return True
+        params = self.request.query_params
+        ordering = [term.lstrip('-') for term in parse_names(params.get('ordering', ''))]
+        return name in ordering or f'min_{name}' in params or f'max_{name}' in params
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            kwargs.update(fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.get_fieldset() is None:
+            return queryset
+        # Keyset pagination reads the ordering keys from each row
+        ordering = [term.lstrip('-') for term in queryset.query.order_by or queryset.model._meta.ordering]
+        return narrow_queryset(queryset, self.get_serializer(), ordering)
@@ -0,0 +1,39 @@
+"""
+Filter backends shared by the pricing viewsets.
+"""
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def field_converter(queryset, field):
+    """Return the ``to_python`` of a model field or annotation on ``queryset``"""
+    if field in queryset.query.annotations:
+        return queryset.query.annotations[field].output_field.to_python
+    try:
+        return queryset.model._meta.get_field(field).to_python
+    except FieldDoesNotExist:
+        raise ValueError(f"'{field}' is not a field or annotation of {queryset.model.__name__}")
+
+
+class RangeFilter(BaseFilterBackend):
+    """Filter on ``?min_<field>=`` and ``?max_<field>=`` (both inclusive)
+
+    Applies to the names listed in the view's ``range_filter_fields``, which may
+    be model fields or annotations added by ``get_queryset``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for field in getattr(view, 'range_filter_fields', []):
+            for prefix, lookup in (('min', 'gte'), ('max', 'lte')):
+                param = f'{prefix}_{field}'
+                raw = request.query_params.get(param)
+                if raw is None:
+                    continue
+                try:
+                    value = field_converter(queryset, field)(raw)
+                except (ValueError, DjangoValidationError):
+                    raise ValidationError({param: 'Enter a valid value.'})
+                queryset = queryset.filter(**{f'{field}__{lookup}': value})
+        return queryset
@@ -0,0 +1,200 @@
+"""
+Subscription lifecycle.
+
+``Subscription.next_transition_at`` holds when a subscription is next due a
+status change: ``trial_end_date`` while in trial, ``end_date`` while active,
+otherwise null. ``Subscription.save()`` keeps it current. A lifecycle run
+claims due subscriptions through that column's index, earliest first, with
+``SELECT ... FOR UPDATE SKIP LOCKED``, and applies:
+
+- trial ended: ``trial`` becomes ``active``, and billing starts at the trial end
+- end date reached with ``PricingSettings.auto_renewal``: stays ``active``,
+  and ``end_date`` moves on by whole billing cycles until it is in the future
+  (lifetime plans lose their end date)
+- end date reached otherwise: ``active`` becomes ``expired``, and billing stops
+
+Each batch commits its set-based updates together with audit entries and
+dashboard rollup deltas. The run then calls ``run_billing``, so converted and
+renewed subscriptions are invoiced in the same pass.
+
+Each batch takes a transaction-level PostgreSQL advisory lock before it claims
+rows, so it also works through pgbouncer's transaction pooling. Every replica
+can run the scheduler; only one applies a batch at a time. A run that finds the
+lock taken returns at once and leaves the rest, and its billing, to the holder.
+"""
+
+import zlib
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from . import rollups
+from .billing import BILLING_CYCLE_MONTHS, BillingRunResult, add_months, run_billing
+from .config import get_pricing_config
+from .models import AuditLog, DashboardRollup, Subscription, next_transition_time
+
+
+LIFECYCLE_BATCH_SIZE = 1000
+LIFECYCLE_LOCK = 'pricing.lifecycle'
+
+
+@dataclass
+class LifecycleResult:
+    """Transitions applied by one lifecycle run"""
+    subscriptions: int = 0
+    activated: int = 0
+    renewed: int = 0
+    expired: int = 0
+    skipped: bool = False  # another replica held the lock for a batch
+    billing: BillingRunResult = field(default_factory=BillingRunResult)
+
+
+def try_advisory_xact_lock(name, using=DEFAULT_DB_ALIAS):
+    """Try to take an advisory lock held until the current transaction ends; returns whether it was taken
+
+    Call inside ``transaction.atomic()``. Backends without advisory locks
+    (SQLite in development) always get it.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_xact_lock(%s)', [zlib.crc32(name.encode())])
+        return cursor.fetchone()[0]
+
+
+def due_transitions(at):
+    return Subscription.objects.filter(next_transition_at__lte=at)
+
+
+def renewed_end_date(subscription, at):
+    """First end of a billing cycle after ``at``, counted from the current end date"""
+    months = BILLING_CYCLE_MONTHS.get(subscription.plan.billing_cycle)
+    if months is None:
+        return None
+    end_date, cycles = subscription.end_date, 1
+    while (renewed := add_months(end_date, months * cycles)) <= at:
+        cycles += 1
+    return renewed
+
+
+def _audit_entries(subscriptions, action_type, verb, changes):
+    return [
+        AuditLog(
+            action_type=action_type,
+            description=f'Subscription {subscription.pk} {verb}',
+            subscription_id=subscription.pk,
+            plan_id=subscription.plan_id,
+            customer_id=subscription.customer_id,
+            changes=changes(subscription),
+        )
+        for subscription in subscriptions
+    ]
+
+
+def transition_batch(at, auto_renewal, batch_size=LIFECYCLE_BATCH_SIZE):
+    """Apply up to ``batch_size`` due transitions in one transaction; returns a LifecycleResult"""
+    result = LifecycleResult()
+    with transaction.atomic():
+        if not try_advisory_xact_lock(LIFECYCLE_LOCK):
+            result.skipped = True
+            return result
+        subscriptions = list(
+            due_transitions(at).select_related('plan')
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('next_transition_at')[:batch_size]
+        )
+        if not subscriptions:
+            return result
+
+        activated, renewed, expired, stale = [], [], [], []
+        for subscription in subscriptions:
+            if subscription.status == 'trial' and subscription.trial_end_date and subscription.trial_end_date <= at:
+                activated.append(subscription)
+            elif subscription.status == 'active' and subscription.end_date and subscription.end_date <= at:
+                (renewed if auto_renewal else expired).append(subscription)
+            else:
+                stale.append(subscription)  # changed by a bulk update that skipped save()
+
+        now = timezone.now()
+        deltas = []
+        audit = []
+        if activated:
+            Subscription.objects.filter(pk__in=[s.pk for s in activated]).update(
+                status='active', next_billing_date=F('trial_end_date'), next_transition_at=F('end_date'), updated_at=now,
+            )
+            deltas += [rollups.diff(
+                rollups.subscription_contributions('trial', s.plan_id),
+                rollups.subscription_contributions('active', s.plan_id),
+            ) for s in activated]
+            audit += _audit_entries(activated, 'subscription_activated', 'activated',
+                                    lambda s: {'status': ['trial', 'active']})
+        if expired:
+            Subscription.objects.filter(pk__in=[s.pk for s in expired]).update(
+                status='expired', next_billing_date=None, next_transition_at=None, updated_at=now,
+            )
+            deltas += [rollups.diff(
+                rollups.subscription_contributions('active', s.plan_id),
+                rollups.subscription_contributions('expired', s.plan_id),
+            ) for s in expired]
+            audit += _audit_entries(expired, 'subscription_expired', 'expired',
+                                    lambda s: {'status': ['active', 'expired']})
+        if renewed:
+            ended = {s.pk: s.end_date for s in renewed}
+            for subscription in renewed:
+                # Billing stops at end_date; pick up again where it stopped
+                if subscription.next_billing_date is None:
+                    subscription.next_billing_date = subscription.end_date
+                subscription.end_date = renewed_end_date(subscription, at)
+                subscription.next_transition_at = subscription.end_date
+                subscription.updated_at = now
+            audit += _audit_entries(renewed, 'subscription_renewed', 'renewed', lambda s: {
+                'end_date': [ended[s.pk].isoformat(), s.end_date and s.end_date.isoformat()],
+            })
+            Subscription.objects.bulk_update(
+                renewed, ['end_date', 'next_billing_date', 'next_transition_at', 'updated_at'], batch_size=batch_size,
+            )
+        if stale:
+            for subscription in stale:
+                subscription.next_transition_at = next_transition_time(
+                    subscription.status, subscription.trial_end_date, subscription.end_date
+                )
+            Subscription.objects.bulk_update(stale, ['next_transition_at'], batch_size=batch_size)
+
+        # .update() and bulk_update() skip Subscription.save(), which normally keeps the rollups current
+        DashboardRollup.objects.apply(rollups.merge(*deltas))
+        if audit and settings.AUDIT_ENABLED:
+            AuditLog.objects.bulk_create(audit, batch_size=settings.AUDIT_BATCH_SIZE)
+
+    result.subscriptions = len(subscriptions)
+    result.activated, result.renewed, result.expired = len(activated), len(renewed), len(expired)
+    return result
+
+
+def run_lifecycle(at=None, batch_size=LIFECYCLE_BATCH_SIZE):
+    """Apply every transition due by ``at`` (default now), then bill what became due"""
+    at = at or timezone.now()
+    result = LifecycleResult()
+    auto_renewal = get_pricing_config().auto_renewal
+    while True:
+        batch = transition_batch(at, auto_renewal, batch_size)
+        if batch.skipped:
+            # Another replica is working through the same transitions and bills them when it is done
+            result.skipped = True
+            return result
+        if not batch.subscriptions:
+            break
+        result.subscriptions += batch.subscriptions
+        result.activated += batch.activated
+        result.renewed += batch.renewed
+        result.expired += batch.expired
+    result.billing = run_billing(at)
+    return result
+
+
+def next_transition_due():
+    """Earliest pending ``next_transition_at``; one probe of its index"""
+    return Subscription.objects.aggregate(due=Min('next_transition_at'))['due']
@@ -0,0 +1,108 @@
+"""
+Compare the sync and async integration clients.
+
+Starts a local stub of the pricing API in its own process. It answers
+``GET /api/customers/<id>/`` after a fixed delay that stands in for network and
+server time. The same customers are then fetched three ways: one call after
+another with ``PricingServiceClient``, with that client from a thread pool (how
+async callers use it today), and with
+``AsyncPricingServiceClient.get_many_customers``. No database is touched.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from integration_client import AsyncPricingServiceClient, PricingServiceClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep connections alive so pooling counts
+    wbufsize = 64 * 1024  # send headers and body in one write, avoiding delayed-ACK stalls
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        customer_id = self.path.rstrip('/').rsplit('/', 1)[-1]
+        body = json.dumps({
+            'id': customer_id, 'name': 'Stub customer', 'email': f'{customer_id}@example.com',
+            'customer_type': 'business', 'status': 'active',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_stub(latency, ready):
+    """Run the stub server until killed; sends its port through ``ready``"""
+    handler = type('Handler', (StubHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    ready.send(server.server_address[1])
+    server.serve_forever()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the sync and async pricing service clients against a local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Customers fetched per client')
+        parser.add_argument('--concurrency', type=int, default=20, help='Threads or in-flight requests')
+        parser.add_argument('--latency', type=float, default=20.0, help='Stub response delay in milliseconds')
+
+    def handle(self, *args, **options):
+        # A separate process, so the stub does not compete with the clients for the GIL
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        server = multiprocessing.Process(target=serve_stub, args=(options['latency'] / 1000, sender), daemon=True)
+        server.start()
+        base_url = f'http://127.0.0.1:{receiver.recv()}'
+        ids = [str(uuid.uuid4()) for _ in range(options['requests'])]
+        concurrency = options['concurrency']
+        try:
+            results = [
+                ('sync, sequential', self.timed(self.sync_sequential, base_url, ids)),
+                (f'sync, {concurrency} threads', self.timed(self.sync_threads, base_url, ids, concurrency)),
+                (f'async, {concurrency} in flight', self.timed(
+                    asyncio.run, self.async_gather(base_url, ids, concurrency)
+                )),
+            ]
+        finally:
+            server.terminate()
+            server.join()
+
+        self.stdout.write(f"{len(ids)} requests, {options['latency']:.0f} ms stub latency")
+        for label, elapsed in results:
+            self.stdout.write(f'{label:<24} {elapsed:>7.2f} s  {len(ids) / elapsed:>8,.0f} req/s')
+
+    def sync_sequential(self, base_url, ids):
+        client = PricingServiceClient(base_url)
+        return [client.get_customer(pk) for pk in ids]
+
+    def sync_threads(self, base_url, ids, concurrency):
+        client = PricingServiceClient(base_url)
+        # requests keeps 10 connections per host by default; size the pool to the threads
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        client.session.mount('http://', adapter)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(client.get_customer, ids))
+
+    async def async_gather(self, base_url, ids, concurrency):
+        async with AsyncPricingServiceClient(base_url, max_concurrency=concurrency) as client:
+            return await client.get_many_customers(ids)
+
+    def timed(self, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - started
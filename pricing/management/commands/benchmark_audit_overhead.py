@@ -0,0 +1,80 @@
+"""
+Measure what audit logging adds to a write request.
+
+Times the request-thread work (snapshot and queueing) per call, the per-entry
+cost of the background write, and the latency of ``PUT /api/plans/<id>/`` with
+auditing on and off, against a plan seeded by ``pricing.management.seeding``.
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pricing.audit import AuditWriter, snapshot, write_entries
+from pricing.management.seeding import rolled_back, seed_rows
+from pricing.models import AuditLog
+
+
+class Command(BaseCommand):
+    help = 'Report the per-request overhead of audit logging'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=20000, help='Iterations for the per-call timings')
+        parser.add_argument('--requests', type=int, default=300, help='PUT requests per setting')
+
+    def handle(self, *args, **options):
+        calls = options['calls']
+        with rolled_back():
+            plan = seed_rows('Audit benchmark', plans=1, plan_fields=lambda i, rows: {'plan_type': 'basic'}).plans[0]
+
+            started = time.perf_counter()
+            for _ in range(calls):
+                before = snapshot(plan)
+            per_snapshot = (time.perf_counter() - started) / calls
+
+            # The writer under test has no thread, so nothing is written
+            # until the explicit flush
+            writer = AuditWriter(background=False)
+            entry = {
+                'action_type': 'plan_updated', 'description': 'Audit benchmark updated',
+                'before': before, 'after': dict(before, base_price=Decimal('12.00')),
+                'links': {'plan_id': plan.pk}, 'ip_address': '127.0.0.1', 'user_agent': 'benchmark',
+            }
+            with override_settings(AUDIT_QUEUE_SIZE=calls, AUDIT_BATCH_SIZE=calls + 1):
+                started = time.perf_counter()
+                for _ in range(calls):
+                    writer.submit(entry)
+                per_submit = (time.perf_counter() - started) / calls
+
+            batch = [entry] * min(calls, 5000)
+            started = time.perf_counter()
+            write_entries(batch)
+            per_write = (time.perf_counter() - started) / len(batch)
+
+            self.stdout.write(f'snapshot          {per_snapshot * 1e6:8.2f} us/call')
+            self.stdout.write(f'queue entry       {per_submit * 1e6:8.2f} us/call')
+            self.stdout.write(f'background write  {per_write * 1e6:8.2f} us/entry (off the request thread)')
+
+            client = APIClient()
+            client.force_authenticate(user=get_user_model()(username='audit-benchmark'))
+            url = reverse('pricingplan-detail', args=[plan.pk])
+            timings = {}
+            for enabled in (False, True, False, True):
+                with override_settings(AUDIT_ENABLED=enabled):
+                    started = time.perf_counter()
+                    for number in range(options['requests']):
+                        client.put(url, {
+                            'name': 'Audit benchmark', 'plan_type': 'basic',
+                            'base_price': f'{10 + number % 50}.00',
+                        }, format='json')
+                    timings.setdefault(enabled, []).append((time.perf_counter() - started) / options['requests'])
+            off, on = min(timings[False]), min(timings[True])
+            self.stdout.write(f'PUT audit off     {off * 1e6:8.0f} us/request')
+            self.stdout.write(f'PUT audit on      {on * 1e6:8.0f} us/request ({(on - off) * 1e6:+.0f} us)')
+            if AuditLog.objects.filter(plan=plan).count() != len(batch):
+                self.stderr.write('Unexpected audit rows were written during the benchmark')
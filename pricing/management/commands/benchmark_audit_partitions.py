@@ -0,0 +1,114 @@
+"""
+Compare a partitioned and an unpartitioned audit log (PostgreSQL only).
+
+Seeds two scratch copies of ``pricing_auditlog`` with the same rows spread over
+``--months`` months, one partitioned by month like the real table and one
+plain, both indexed on ``(timestamp, id)``. It then times the newest-first
+page, a keyset page a year back, a one-month count, and retiring the oldest
+month (``DELETE`` against ``DETACH`` plus ``DROP``). The scratch tables are
+dropped afterwards. Seeding 50M rows takes a while and several GB of disk.
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from pricing.partitions import add_months, month_start
+
+
+PLAIN = 'bench_auditlog_plain'
+PARTITIONED = 'bench_auditlog_partitioned'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark audit log queries and retention with and without monthly partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000000, help='Rows in each copy')
+        parser.add_argument('--months', type=int, default=24, help='Months the rows are spread over')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the best is reported')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning needs PostgreSQL')
+        first = add_months(month_start(date.today()), 1 - options['months'])
+        try:
+            self.seed(options['rows'], first, options['months'])
+            self.compare(first, options['repeat'])
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {PLAIN}, {PARTITIONED}')
+
+    def seed(self, rows, first, months):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {PLAIN}, {PARTITIONED}')
+            cursor.execute(f'CREATE TABLE {PLAIN} (LIKE pricing_auditlog INCLUDING DEFAULTS)')
+            cursor.execute(
+                f'CREATE TABLE {PARTITIONED} (LIKE pricing_auditlog INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")'
+            )
+            for offset in range(months):
+                month = add_months(first, offset)
+                cursor.execute(
+                    f'CREATE TABLE {PARTITIONED}_p{month:%Y%m} PARTITION OF {PARTITIONED} '
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                )
+            cursor.execute(
+                f'INSERT INTO {PLAIN} (id, action_type, description, changes, "timestamp", ip_address, user_agent) '
+                "SELECT gen_random_uuid(), 'plan_updated', 'benchmark row', '{}'::jsonb, "
+                "%s::timestamptz + random() * (%s::timestamptz - %s::timestamptz), NULL, '' "
+                'FROM generate_series(1, %s)',
+                [first, date.today(), first, rows],
+            )
+            cursor.execute(f'INSERT INTO {PARTITIONED} SELECT * FROM {PLAIN}')
+            for table in (PLAIN, PARTITIONED):
+                cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, "timestamp")')
+                cursor.execute(f'CREATE INDEX ON {table} ("timestamp", id)')
+                cursor.execute(f'ANALYZE {table}')
+        self.stdout.write(f'Seeded {rows:,} rows into each copy in {time.perf_counter() - started:.0f} s')
+
+    def compare(self, first, repeat):
+        year_ago = add_months(month_start(date.today()), -12)
+        queries = [
+            ('newest page', 'SELECT * FROM {table} ORDER BY "timestamp" DESC, id DESC LIMIT 100', []),
+            ('keyset page, a year back',
+             'SELECT * FROM {table} WHERE ("timestamp", id) < (%s::timestamptz, %s::uuid) '
+             'ORDER BY "timestamp" DESC, id DESC LIMIT 100',
+             [year_ago, 'ffffffff-ffff-ffff-ffff-ffffffffffff']),
+            ('one month count',
+             'SELECT count(*) FROM {table} WHERE "timestamp" >= %s AND "timestamp" < %s',
+             [year_ago, add_months(year_ago, 1)]),
+        ]
+        self.stdout.write(f'{"query":<26} {"plain":>12} {"partitioned":>12}')
+        with connection.cursor() as cursor:
+            for label, sql, params in queries:
+                timings = [self.best(cursor, sql.format(table=table), params, repeat) for table in (PLAIN, PARTITIONED)]
+                self.stdout.write(f'{label:<26} {timings[0] * 1000:>9.1f} ms {timings[1] * 1000:>9.1f} ms')
+
+            cursor.execute(
+                f'EXPLAIN SELECT count(*) FROM {PARTITIONED} WHERE "timestamp" >= %s AND "timestamp" < %s',
+                [year_ago, add_months(year_ago, 1)],
+            )
+            scanned = sum(f'{PARTITIONED}_p' in line for (line,) in cursor.fetchall())
+            self.stdout.write(f'one month count scans {scanned} partition(s)')
+
+            cutoff = add_months(first, 1)
+            started = time.perf_counter()
+            cursor.execute(f'DELETE FROM {PLAIN} WHERE "timestamp" < %s', [cutoff])
+            deleted = time.perf_counter() - started
+            started = time.perf_counter()
+            cursor.execute(f'ALTER TABLE {PARTITIONED} DETACH PARTITION {PARTITIONED}_p{first:%Y%m}')
+            cursor.execute(f'DROP TABLE {PARTITIONED}_p{first:%Y%m}')
+            detached = time.perf_counter() - started
+        self.stdout.write(f'{"retire oldest month":<26} {deleted * 1000:>9.1f} ms {detached * 1000:>9.1f} ms')
+
+    def best(self, cursor, sql, params, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,125 @@
+"""
+Measure the bandwidth and latency trade-off of response compression.
+
+Seeds customers, subscriptions and invoices (see ``pricing.management.seeding``).
+It fetches list pages of several sizes and a customer CSV export,
+then compresses each body with every installed codec at a few levels. For each
+codec and level it reports:
+
+- the compressed size
+- the compress and decompress time
+- the time to deliver the body (compress, transfer, decompress) on links of
+  the given speeds
+
+Transfer time is size over link speed; round trips and TCP slow start are left
+out. It also fetches every payload through ``CompressionMiddleware`` with each
+codec negotiated and fails unless the decoded body equals the plain one.
+"""
+
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from pricing.management.seeding import rolled_back, seed_rows
+from pricing_service.compression import CODECS, INSTALLED
+
+
+PAYLOADS = [
+    ('subscriptions, 10 rows', '/api/subscriptions/?page_size=10'),
+    ('subscriptions, 100 rows', '/api/subscriptions/?page_size=100'),
+    ('subscriptions, 1000 rows', '/api/subscriptions/?page_size=1000'),
+    ('invoices, 100 rows', '/api/invoices/?page_size=100'),
+    ('invoices, 1000 rows', '/api/invoices/?page_size=1000'),
+    ('customer CSV export', '/api/customers/export/'),
+]
+LEVELS = {'gzip': [1, 6, 9], 'br': [1, 4, 6], 'zstd': [1, 3, 9]}
+
+
+class Command(BaseCommand):
+    help = 'Report compressed size and delivery time of typical responses per codec and level'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Rows per model (and in the export)')
+        parser.add_argument('--links', default='10,100,1000', help='Link speeds in Mbit/s, comma separated')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per codec; the median is reported')
+
+    def handle(self, *args, **options):
+        links = [float(speed) for speed in options['links'].split(',')]
+        codecs = [
+            CODECS[name](level)
+            for name, levels in LEVELS.items() if INSTALLED[name]
+            for level in levels
+        ]
+        client = APIClient()
+        client.force_authenticate(user=get_user_model()(username='compression-benchmark'))
+
+        with rolled_back():
+            self.seed(options['rows'])
+            bodies = {label: self.fetch(client, url, 'identity')[1] for label, url in PAYLOADS}
+            self.check_round_trips(codecs, bodies)
+
+        header = f"{'codec':<9} {'bytes':>10} {'ratio':>6} {'compress':>10} {'decompress':>10}"
+        header += ''.join(f" {f'{speed:g} Mbit/s':>12}" for speed in links)
+        for label, body in bodies.items():
+            self.stdout.write(f'\n{label}: {len(body):,} bytes')
+            self.stdout.write(header)
+            self.stdout.write(self.row('identity', body, len(body), 0, 0, links))
+            for codec in codecs:
+                compressed = codec.compress(body)
+                compress_time = self.timed(codec.compress, body, options['repeat'])
+                decompress_time = self.timed(codec.decompress, compressed, options['repeat'])
+                self.stdout.write(self.row(
+                    f'{codec.name}:{codec.level}', body, len(compressed), compress_time, decompress_time, links,
+                ))
+
+    def row(self, name, body, size, compress_time, decompress_time, links):
+        line = (
+            f'{name:<9} {size:>10,} {len(body) / size:>5.1f}x '
+            f'{compress_time * 1000:>7.2f} ms {decompress_time * 1000:>7.2f} ms'
+        )
+        for speed in links:
+            total = compress_time + size * 8 / (speed * 1e6) + decompress_time
+            line += f' {total * 1000:>9.2f} ms'
+        return line
+
+    def timed(self, func, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(data)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
+
+    def fetch(self, client, url, accept_encoding):
+        response = client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.get('Content-Encoding'), body
+
+    def check_round_trips(self, codecs, bodies):
+        """Fetch every payload through the middleware with each codec and decode it"""
+        for codec in codecs:
+            with override_settings(RESPONSE_COMPRESSION=f'{codec.name}:{codec.level}'):
+                client = APIClient()  # a new handler builds the middleware from the settings above
+                client.force_authenticate(user=get_user_model()(username='compression-benchmark'))
+                for label, url in PAYLOADS:
+                    encoding, body = self.fetch(client, url, f'{codec.name}, identity;q=0.5')
+                    if encoding != codec.name or codec.decompress(body) != bodies[label]:
+                        raise CommandError(f'{label}: {codec.name}:{codec.level} did not round-trip')
+
+    def seed(self, count):
+        seed_rows(
+            'Compression benchmark', plans=20, customers=count, subscriptions=count, invoices=count,
+            plan_fields=lambda i, rows: {'billing_cycle': ('monthly', 'quarterly', 'yearly')[i % 3]},
+            customer_fields=lambda i, rows: {
+                'company_name': f'Company {i % 300}', 'city': ('Berlin', 'Paris', 'Madrid', 'Rome')[i % 4],
+            },
+            subscription_fields=lambda i, rows: {'discount_percentage': Decimal(i % 4 * 5)},
+            invoice_fields=lambda i, rows: {'status': ('paid', 'sent', 'overdue')[i % 3]},
+        )
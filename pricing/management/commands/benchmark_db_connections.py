@@ -0,0 +1,102 @@
+"""
+Compare per-request connection cost on PostgreSQL for each DB_CONNECTION_MODE.
+
+Each simulated request does what Django's request cycle does around a view.
+It runs ``close_if_unusable_or_obsolete()`` on request start, runs one
+``SELECT 1``, and runs ``close_if_unusable_or_obsolete()`` again on request
+finish. The modes use the default database's settings with different
+connection handling:
+
+- ``direct``: connect and close every request
+- ``pool``: check a connection out of the psycopg pool and back in, checking
+  it on checkout
+- ``persistent``: ``CONN_MAX_AGE``, which is what pgbouncer mode does on the
+  Django side
+
+With ``--threads`` above 1, the pool is smaller than the number of threads, so
+requests wait for a connection. The pool's wait counters are reported.
+"""
+
+import statistics
+import threading
+import time
+from copy import deepcopy
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import ConnectionHandler
+
+from pricing_service.database import pool_stats
+
+
+class Command(BaseCommand):
+    help = 'Benchmark connection setup per request: direct, pooled and persistent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per thread and mode')
+        parser.add_argument('--threads', type=int, default=1, help='Concurrent request threads')
+        parser.add_argument('--pool-size', type=int, default=None, help='Pool max_size (default: --threads)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs the default database to be PostgreSQL')
+
+        base = deepcopy(connection.settings_dict)
+        base['OPTIONS'] = {key: value for key, value in base['OPTIONS'].items() if key != 'pool'}
+        pool_size = options['pool_size'] or options['threads']
+        modes = {
+            'direct': {**base, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'pool': {
+                **base, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True,
+                'OPTIONS': {**base['OPTIONS'], 'pool': {'min_size': pool_size, 'max_size': pool_size}},
+            },
+            'persistent': {**base, 'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+        }
+
+        self.stdout.write(f"{options['requests']} requests x {options['threads']} threads, pool size {pool_size}")
+        self.stdout.write(f"{'mode':<11} {'req/s':>8} {'p50':>9} {'p99':>9}")
+        for mode, settings_dict in modes.items():
+            handler = ConnectionHandler({'default': settings_dict})
+            latencies, elapsed = self.run(handler, options['requests'], options['threads'])
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{mode:<11} {len(latencies) / elapsed:>8,.0f} '
+                f'{quantiles[49] * 1000:>6.2f} ms {quantiles[98] * 1000:>6.2f} ms'
+            )
+            if mode == 'pool':
+                stats = pool_stats(handler['default'])
+                self.stdout.write(
+                    f"{'':<11} waited {stats.get('requests_waiting', 0)} now, "
+                    f"{stats.get('requests_wait_ms', 0)} ms in total, "
+                    f"{stats['avg_wait_ms']} ms per checkout"
+                )
+                handler['default'].close_pool()
+            handler.close_all()
+
+    def run(self, handler, count, threads):
+        latencies = []
+        lock = threading.Lock()
+
+        def worker():
+            # ConnectionHandler gives each thread its own DatabaseWrapper, as in a server
+            wrapper = handler['default']
+            own = []
+            for _ in range(count):
+                started = time.perf_counter()
+                wrapper.close_if_unusable_or_obsolete()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                wrapper.close_if_unusable_or_obsolete()
+                own.append(time.perf_counter() - started)
+            wrapper.close()
+            with lock:
+                latencies.extend(own)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return latencies, time.perf_counter() - started
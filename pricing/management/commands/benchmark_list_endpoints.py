@@ -0,0 +1,126 @@
+"""
+Measure list endpoint latency with and without the fast list path.
+
+Seeds plans, customers, subscriptions, invoices and audit logs (see
+``pricing.management.seeding``), then times one page of every list endpoint
+three ways:
+
+- ``serializer``: model instances, DRF serializers and ``JSONRenderer`` (the
+  regular path)
+- ``+orjson``: the same with ``FastJSONRenderer``
+- ``fast``: ``values()`` rows, the compiled field map and ``FastJSONRenderer``
+
+It fails if a fast response differs from the regular one by a single byte.
+"""
+
+import statistics
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from pricing import views
+from pricing.config import get_pricing_config
+from pricing.management.seeding import rolled_back, seed_rows
+from pricing.renderers import FastJSONRenderer
+
+
+ENDPOINTS = [
+    'pricingplan-list', 'pricingplan-active', 'pricingplan-featured',
+    'customer-list', 'customer-active',
+    'subscription-list', 'subscription-active',
+    'invoice-list', 'invoice-pending', 'invoice-overdue',
+    'pricingsettings-list', 'auditlog-list',
+]
+VIEWSETS = [
+    views.PricingPlanViewSet, views.CustomerViewSet, views.SubscriptionViewSet,
+    views.InvoiceViewSet, views.PricingSettingsViewSet, views.AuditLogViewSet,
+]
+
+
+@contextmanager
+def renderer(renderer_class):
+    """Render the list viewsets with ``renderer_class``"""
+    saved = [viewset.renderer_classes for viewset in VIEWSETS]
+    for viewset in VIEWSETS:
+        viewset.renderer_classes = [renderer_class]
+    try:
+        yield
+    finally:
+        for viewset, renderer_classes in zip(VIEWSETS, saved):
+            viewset.renderer_classes = renderer_classes
+
+
+class Command(BaseCommand):
+    help = 'Compare list endpoint latency on the serializer path and the fast list path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per model')
+        parser.add_argument('--page-size', type=int, default=100, help='Rows per response')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint and path')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        client.force_authenticate(user=get_user_model()(username='list-benchmark'))
+        modes = {
+            'serializer': (False, JSONRenderer),
+            '+orjson': (False, FastJSONRenderer),
+            'fast': (True, FastJSONRenderer),
+        }
+
+        results = []
+        with rolled_back():
+            self.seed(options['rows'])
+            for name in ENDPOINTS:
+                url = f"{reverse(name)}?page_size={options['page_size']}"
+                timings, bodies = {}, {}
+                for mode, (fast, renderer_class) in modes.items():
+                    with override_settings(FAST_LIST_RESPONSES=fast), renderer(renderer_class):
+                        timings[mode], bodies[mode] = self.time_requests(client, url, options['repeat'])
+                if len(set(bodies.values())) != 1:
+                    raise CommandError(f'{name}: the fast response differs from the serializer response')
+                results.append((name, timings, len(bodies['fast'])))
+
+        self.stdout.write(
+            f"{options['rows']} rows per model, {options['page_size']} per page, "
+            f"median of {options['repeat']} requests"
+        )
+        self.stdout.write(f"{'endpoint':<22} {'bytes':>8} {'serializer':>11} {'+orjson':>9} {'fast':>9} {'speedup':>8}")
+        for name, timings, size in results:
+            self.stdout.write(
+                f"{name:<22} {size:>8,} {timings['serializer'] * 1000:>8.2f} ms "
+                f"{timings['+orjson'] * 1000:>6.2f} ms {timings['fast'] * 1000:>6.2f} ms "
+                f"{timings['serializer'] / timings['fast']:>7.1f}x"
+            )
+
+    def time_requests(self, client, url, repeat):
+        """Return the median latency of ``url`` and its body"""
+        response = client.get(url)  # warm the field map and settings caches
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            client.get(url)
+            latencies.append(time.perf_counter() - started)
+        return statistics.median(latencies), response.content
+
+    def seed(self, count):
+        get_pricing_config()  # creates the settings singleton
+        seed_rows(
+            'List benchmark', plans=count, customers=count, subscriptions=count, invoices=count, audit_logs=True,
+            plan_fields=lambda i, rows: {
+                'description': 'Benchmark plan', 'billing_cycle': ('monthly', 'quarterly', 'yearly')[i % 3],
+                'is_featured': i % 2 == 0,
+            },
+            customer_fields=lambda i, rows: {'city': 'Berlin'},
+            subscription_fields=lambda i, rows: {'discount_percentage': Decimal(i % 4 * 5)},
+            invoice_fields=lambda i, rows: {'status': ('paid', 'sent', 'overdue')[i % 3]},
+            audit_log_fields=lambda i, rows: {'changes': {'status': 'active'}},
+        )
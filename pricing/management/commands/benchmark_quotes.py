@@ -0,0 +1,71 @@
+"""
+Measure batch quote throughput.
+
+Prices a random what-if grid with the quote engine alone and through
+``POST /api/quotes/batch/``, against plans seeded by
+``pricing.management.seeding``.
+"""
+
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pricing.management.seeding import rolled_back, seed_rows
+from pricing.quotes import MONTHS_PER_BILLING_CYCLE, quote_batch
+
+
+class Command(BaseCommand):
+    help = 'Report batch quote throughput for the engine and the API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quotes', type=int, default=20000, help='Quotes per batch')
+        parser.add_argument('--plans', type=int, default=20, help='Distinct plans in the grid')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed batches; the best is reported')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        client.force_authenticate(user=get_user_model()(username='quote-benchmark'))
+        rng = random.Random(0)
+        with rolled_back():
+            plans = [str(plan.pk) for plan in self.seed(options['plans'], rng)]
+            rows = [self.row(plans, rng) for _ in range(options['quotes'])]
+            body = json.dumps(rows)
+            quote_batch(rows[:10])  # warm the settings cache and plan query
+
+            engine = min(self.timed(quote_batch, rows) for _ in range(options['repeat']))
+            endpoint = min(self.timed(
+                client.post, reverse('quote-batch'), body, content_type='application/json'
+            ) for _ in range(options['repeat']))
+
+        quotes = options['quotes']
+        self.stdout.write(f'engine    {quotes / engine:>12,.0f} quotes/s  ({engine * 1000:.1f} ms per batch)')
+        self.stdout.write(f'endpoint  {quotes / endpoint:>12,.0f} quotes/s  ({endpoint * 1000:.1f} ms per batch)')
+
+    def seed(self, count, rng):
+        return seed_rows('Quote benchmark', plans=count, plan_fields=lambda i, rows: {
+            'plan_type': 'basic', 'billing_cycle': rng.choice(list(MONTHS_PER_BILLING_CYCLE)),
+            'base_price': Decimal(rng.randint(100, 99999)) / 100,
+            'setup_fee': Decimal(rng.randint(0, 9999)) / 100,
+        }).plans
+
+    def row(self, plans, rng):
+        row = {
+            'plan': rng.choice(plans),
+            'billing_cycle': rng.choice(list(MONTHS_PER_BILLING_CYCLE)),
+            'discount_percentage': rng.choice(['0', '5', '10', '12.5', '15', '20', '25']),
+            'seats': rng.randint(1, 100),
+        }
+        if rng.random() < 0.25:
+            row['custom_price'] = str(Decimal(rng.randint(100, 99999)) / 100)
+        return row
+
+    def timed(self, func, *args, **kwargs):
+        started = time.perf_counter()
+        func(*args, **kwargs)
+        return time.perf_counter() - started
@@ -0,0 +1,178 @@
+"""
+Compare WSGI and ASGI deployments under mixed traffic.
+
+Seeds plans, customers and subscriptions, then starts gunicorn twice with the
+same worker count: sync workers on ``pricing_service.wsgi`` and uvicorn workers
+on ``pricing_service.asgi``. Each server gets the same load for ``--duration``
+seconds:
+
+- slow clients stream the customer export again and again
+- fast clients cycle through active and featured plans, customer and
+  subscription detail, and health
+
+It reports throughput and p50/p95/p99 latency of the fast requests. The seeded
+rows are committed, because the servers are separate processes, and deleted
+afterwards; do not point this at a production database. Requests carry a JWT, so
+the default JWT authentication must be configured.
+"""
+
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from pricing.models import Customer, PricingPlan, Subscription
+
+
+MODES = {
+    'wsgi': ['pricing_service.wsgi:application'],
+    'asgi': ['--worker-class', 'uvicorn_worker.UvicornWorker', 'pricing_service.asgi:application'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare fast-request latency under mixed traffic for WSGI and ASGI gunicorn'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help='gunicorn workers per server')
+        parser.add_argument('--fast-clients', type=int, default=20, help='Clients sending cheap reads')
+        parser.add_argument('--slow-clients', type=int, default=6, help='Clients streaming exports')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load per server')
+        parser.add_argument('--customers', type=int, default=20000, help='Customers to seed (export size)')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        user, _ = get_user_model().objects.get_or_create(username='server-mode-benchmark')
+        token = str(RefreshToken.for_user(user).access_token)
+        try:
+            paths = self.seed(tag, options['customers'])
+            results = {
+                mode: self.run_mode(mode, paths, token, options)
+                for mode in options['modes']
+            }
+        finally:
+            Subscription.objects.filter(customer__email__startswith=f'bench-{tag}-').delete()
+            Customer.objects.filter(email__startswith=f'bench-{tag}-').delete()
+            PricingPlan.objects.filter(name__startswith=f'Server mode {tag} ').delete()
+            user.delete()
+
+        self.stdout.write(
+            f"{options['workers']} workers, {options['fast_clients']} fast and "
+            f"{options['slow_clients']} slow clients, {options['duration']:.0f} s each"
+        )
+        self.stdout.write(f"{'mode':<6} {'fast req/s':>10} {'p50':>9} {'p95':>9} {'p99':>9} {'exports':>8} {'errors':>7}")
+        for mode, result in results.items():
+            latencies, exports, errors = result
+            if not latencies:
+                raise CommandError(f'{mode}: no fast request completed')
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{mode:<6} {len(latencies) / options["duration"]:>10.0f} '
+                f'{quantiles[49] * 1000:>6.1f} ms {quantiles[94] * 1000:>6.1f} ms {quantiles[98] * 1000:>6.1f} ms '
+                f'{exports:>8} {errors:>7}'
+            )
+
+    def seed(self, tag, customer_count):
+        """Create the rows the fast requests read; returns their paths"""
+        rng = random.Random(0)
+        plans = PricingPlan.objects.bulk_create([
+            PricingPlan(
+                name=f'Server mode {tag} {i}', plan_type='standard', base_price=Decimal(rng.randint(500, 50000)) / 100,
+                is_featured=i % 5 == 0,
+            )
+            for i in range(50)
+        ])
+        customers = Customer.objects.bulk_create([
+            Customer(name=f'Customer {i}', email=f'bench-{tag}-{i}@example.com')
+            for i in range(customer_count)
+        ], batch_size=1000)
+        subscriptions = Subscription.objects.bulk_create([
+            Subscription(customer=customer, plan=rng.choice(plans), start_date=timezone.now(), status='active')
+            for customer in customers[:200]
+        ])
+        return (
+            ['/api/plans/active/', '/api/plans/featured/', '/api/health/']
+            + [f'/api/customers/{customer.pk}/' for customer in customers[:200]]
+            + [f'/api/subscriptions/{subscription.pk}/' for subscription in subscriptions]
+        )
+
+    def run_mode(self, mode, paths, token, options):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(options['workers']),
+             '--timeout', '120', *MODES[mode]],
+            cwd=settings.BASE_DIR, env=dict(os.environ, SERVER_MODE=mode),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        base_url = f'http://127.0.0.1:{port}'
+        try:
+            self.wait_until_up(base_url, server)
+            return self.load(base_url, paths, token, options)
+        finally:
+            server.terminate()
+            server.wait()
+
+    def wait_until_up(self, base_url, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with {server.returncode}')
+            try:
+                requests.get(f'{base_url}/health/', timeout=5)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise CommandError('gunicorn did not start')
+
+    def load(self, base_url, paths, token, options):
+        stop = threading.Event()
+        latencies, errors, exports = [], [0], [0]
+        lock = threading.Lock()
+        headers = {'Authorization': f'Bearer {token}'}
+
+        def fast_client(seed):
+            rng = random.Random(seed)
+            session = requests.Session()
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = session.get(base_url + rng.choice(paths), headers=headers)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    errors[0] += response.status_code != 200
+
+        def slow_client():
+            session = requests.Session()
+            while not stop.is_set():
+                with session.get(f'{base_url}/api/customers/export/', headers=headers, stream=True) as response:
+                    for _ in response.iter_content(64 * 1024):
+                        pass
+                with lock:
+                    exports[0] += 1
+                    errors[0] += response.status_code != 200
+
+        threads = [threading.Thread(target=slow_client) for _ in range(options['slow_clients'])]
+        threads += [threading.Thread(target=fast_client, args=(seed,)) for seed in range(options['fast_clients'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return latencies, exports[0], errors[0]
@@ -0,0 +1,92 @@
+"""
+Measure usage event ingestion throughput.
+
+Posts batches of random usage events to ``POST /api/usage-events/`` in each
+durability mode, flushes, and checks that the subscription counters add up.
+The subscriptions come from ``pricing.management.seeding``.
+"""
+
+import json
+import random
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pricing.management.seeding import rolled_back, seed_rows
+from pricing.metering import DURABILITY_MODES, USAGE_COUNTERS, drain_journal, usage_buffer
+from pricing.models import Subscription
+
+
+class Command(BaseCommand):
+    help = 'Report usage event ingestion throughput for each durability mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscriptions', type=int, default=200, help='Subscriptions receiving events')
+        parser.add_argument('--batches', type=int, default=20, help='Requests per mode')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events per request')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        client.force_authenticate(user=get_user_model()(username='usage-benchmark'))
+        rng = random.Random(0)
+        url = reverse('usage-event-list')
+        failures = []
+        # The flusher thread has its own connection and cannot see the
+        # uncommitted seed rows, so only the explicit flush below may write
+        with override_settings(USAGE_FLUSH_INTERVAL=3600, USAGE_MAX_PENDING=10 ** 9), rolled_back():
+            subscriptions = self.seed(options['subscriptions'])
+            for mode in DURABILITY_MODES:
+                expected = Counter()
+                bodies = []
+                for _ in range(options['batches']):
+                    events = [self.event(subscriptions, rng) for _ in range(options['batch_size'])]
+                    for event in events:
+                        expected[(event['subscription'], USAGE_COUNTERS[event['metric']])] += event['delta']
+                    bodies.append(json.dumps(events))
+
+                before = self.counters(subscriptions)
+                started = time.perf_counter()
+                for body in bodies:
+                    response = client.post(f'{url}?durability={mode}', body, content_type='application/json')
+                    if response.status_code not in (200, 202) or response.data['errors']:
+                        raise CommandError(f'{mode}: unexpected response {response.status_code}')
+                ingested = time.perf_counter() - started
+                started = time.perf_counter()
+                usage_buffer.flush()
+                drain_journal()
+                flushed = time.perf_counter() - started
+
+                after = self.counters(subscriptions)
+                if any(after[key] - before[key] != expected[key] for key in after):
+                    failures.append(mode)
+                total = options['batches'] * options['batch_size']
+                self.stdout.write(
+                    f'{mode:<9} {total / ingested:>10,.0f} events/s accepted, '
+                    f'flush {flushed * 1000:.0f} ms, counters {"ok" if mode not in failures else "WRONG"}'
+                )
+        if failures:
+            raise CommandError(f'Counters did not add up for: {", ".join(failures)}')
+
+    def seed(self, count):
+        rows = seed_rows(
+            'Usage benchmark', plans=1, customers=1, subscriptions=count,
+            subscription_fields=lambda i, rows: {'current_users': 1000000, 'current_storage_gb': 1000000},
+        )
+        return [str(subscription.pk) for subscription in rows.subscriptions]
+
+    def event(self, subscriptions, rng):
+        metric = rng.choice(['loan_applications', 'loan_applications', 'users', 'storage_gb'])
+        delta = 1 if metric == 'loan_applications' else rng.choice([-1, 1, 2])
+        return {'subscription': rng.choice(subscriptions), 'metric': metric, 'delta': delta}
+
+    def counters(self, subscriptions):
+        return {
+            (str(pk), counter): value
+            for pk, *values in Subscription.objects.filter(pk__in=subscriptions).values_list('pk', *USAGE_COUNTERS.values())
+            for counter, value in zip(USAGE_COUNTERS.values(), values)
+        }
@@ -0,0 +1,127 @@
+"""
+Check that every API endpoint runs a fixed number of queries.
+
+Seeds data at two sizes (see ``pricing.management.seeding``), calls each
+endpoint at both sizes and fails if a query count grows with the row count
+or goes over the endpoint's budget. Meant for CI and staging databases.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pricing.management.seeding import rolled_back, seed_rows
+from pricing.models import PricingSettings
+from pricing.query_budget import count_queries
+
+
+# (url name, detail object key, max queries). Conditional-GET viewsets spend
+# one extra aggregate query on their ETag. A name may carry a query string.
+ENDPOINTS = [
+    ('pricingplan-list', None, 2),
+    ('pricingplan-active', None, 2),
+    ('pricingplan-featured', None, 2),
+    ('pricingplan-detail', 'plan', 3),
+    ('customer-list', None, 1),
+    ('customer-active', None, 1),
+    ('customer-detail', 'customer', 3),
+    ('subscription-list', None, 1),
+    ('subscription-active', None, 1),
+    ('subscription-detail', 'subscription', 3),
+    ('invoice-list', None, 1),
+    ('invoice-pending', None, 1),
+    ('invoice-overdue', None, 1),
+    ('invoice-detail', 'invoice', 2),
+    ('pricingsettings-list', None, 1),
+    ('auditlog-list', None, 1),
+    ('auditlog-detail', 'audit_log', 2),
+    ('dashboard-list', None, 2),
+    # Sparse fieldsets and expansion (see pricing.fieldsets)
+    ('pricingplan-list?fields=id,name,monthly_price', None, 2),
+    ('pricingplan-list?expand=subscriptions', None, 3),
+    ('pricingplan-detail?fields=id,subscription_count', 'plan', 3),
+    ('customer-list?fields=id,name,email', None, 1),
+    ('customer-list?expand=subscriptions', None, 2),
+    ('customer-detail?expand=', 'customer', 2),
+    ('subscription-list?expand=customer,plan,invoices', None, 2),
+    ('subscription-detail?fields=status,effective_price', 'subscription', 2),
+    ('invoice-list?expand=subscription', None, 1),
+]
+
+
+class Command(BaseCommand):
+    help = 'Fail if any API endpoint issues more queries as the number of rows grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=3, help='Rows per model for the first run')
+        parser.add_argument('--large', type=int, default=30, help='Rows per model for the second run')
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        client.force_authenticate(user=get_user_model()(username='query-budget'))
+
+        counts = {}
+        for size in (options['small'], options['large']):
+            counts[size] = self.measure(client, size)
+
+        failures = []
+        for name, _, budget in ENDPOINTS:
+            small, large = (counts[size][name] for size in counts)
+            status = 'ok'
+            if small != large:
+                status = 'GROWS'
+                failures.append(name)
+            elif large > budget:
+                status = 'OVER BUDGET'
+                failures.append(name)
+            self.stdout.write(f"{name:<52} {small:>4} {large:>4}  budget {budget:<3} {status}")
+
+        if failures:
+            raise CommandError(f"Query budget failures: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All endpoints within query budget'))
+
+    def measure(self, client, size):
+        """Seed ``size`` rows per model and count queries for each endpoint"""
+        counts = {}
+        with rolled_back():
+            objects = self.seed(size)
+            for name, key, _ in ENDPOINTS:
+                kwargs = {'pk': objects[key].pk} if key else {}
+                url_name, _, query = name.partition('?')
+                url = reverse(url_name, kwargs=kwargs) + (f'?{query}' if query else '')
+                # Warm process caches (e.g. pricing settings) so only steady-state queries count
+                client.get(url)
+                response, counts[name] = count_queries(client.get, url)
+                if response.status_code != 200:
+                    raise CommandError(f"{name} returned {response.status_code}")
+        return counts
+
+    def seed(self, size):
+        """Create ``size`` rows per model, concentrated on one plan and customer"""
+        if not PricingSettings.objects.exists():
+            PricingSettings.objects.create()
+
+        statuses = ('paid', 'sent')
+        # Half the subscriptions land on the first plan and customer so their
+        # detail endpoints have a growing number of related rows.
+        rows = seed_rows(
+            f'Budget {size}', plans=size, customers=size, subscriptions=size,
+            invoices=size * len(statuses), audit_logs=True,
+            plan_fields=lambda i, rows: {'base_price': Decimal('10.00') * (i + 1), 'is_featured': i % 2 == 0},
+            subscription_fields=lambda i, rows: {
+                'customer': rows.customers[0 if i % 2 == 0 else i], 'plan': rows.plans[0 if i % 2 == 0 else i],
+            },
+            invoice_fields=lambda i, rows: {
+                'subscription': rows.subscriptions[i // len(statuses)], 'status': statuses[i % len(statuses)],
+            },
+        )
+        return {
+            'plan': rows.plans[0],
+            'customer': rows.customers[0],
+            'subscription': rows.subscriptions[0],
+            'invoice': rows.invoices[0],
+            'audit_log': rows.audit_logs[0],
+        }
@@ -0,0 +1,18 @@
+"""
+Apply journaled usage events to the subscription counters.
+
+Web workers drain the journal on their own every ``USAGE_FLUSH_INTERVAL``
+seconds; run this after a deploy that stopped them, or from cron when no web
+worker is taking usage traffic.
+"""
+
+from django.core.management.base import BaseCommand
+
+from pricing.metering import drain_journal
+
+
+class Command(BaseCommand):
+    help = 'Apply and delete usage events waiting in the journal'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f'Applied {drain_journal()} journaled usage events'))
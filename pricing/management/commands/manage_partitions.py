@@ -0,0 +1,48 @@
+"""
+Create upcoming audit log partitions and retire expired ones.
+
+Run daily from cron. Months older than ``AUDIT_LOG_RETENTION_MONTHS`` are
+detached from ``pricing_auditlog``, which is a catalog change rather than a
+DELETE, and left behind as standalone tables for archiving. Pass ``--drop`` to
+drop them instead. Does nothing unless the table is partitioned (PostgreSQL).
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pricing.partitions import (
+    PARTITION_MONTHS_AHEAD, PARTITIONED_TABLES, detach_partition, ensure_partitions,
+    expired_partitions, is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = 'Create future audit log partitions and detach or drop expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD,
+                            help='Months after the current one to create partitions for')
+        parser.add_argument('--retention-months', type=int, default=settings.AUDIT_LOG_RETENTION_MONTHS,
+                            help='Whole months to keep before the current one')
+        parser.add_argument('--drop', action='store_true', help='Drop expired partitions instead of detaching them')
+        parser.add_argument('--dry-run', action='store_true', help='List expired partitions without touching them')
+
+    def handle(self, *args, **options):
+        if not any(is_partitioned(table) for table in PARTITIONED_TABLES):
+            self.stdout.write('No partitioned tables; nothing to do')
+            return
+        if not options['dry_run']:
+            for name in ensure_partitions(options['months_ahead']):
+                self.stdout.write(f'Created {name}')
+
+        verb = 'Dropped' if options['drop'] else 'Detached'
+        retired = 0
+        for table in PARTITIONED_TABLES:
+            for month, name in expired_partitions(table, options['retention_months']):
+                if options['dry_run']:
+                    self.stdout.write(f'Would retire {name}')
+                    continue
+                detach_partition(table, name, drop=options['drop'])
+                self.stdout.write(f'{verb} {name}')
+                retired += 1
+        self.stdout.write(self.style.SUCCESS(f'{retired} partitions retired'))
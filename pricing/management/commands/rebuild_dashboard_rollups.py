@@ -0,0 +1,20 @@
+"""
+Recompute the dashboard rollup counters from the source tables.
+
+Run after the rollup migration, after bulk data loads that bypass the ORM, or
+whenever the dashboard is suspected to have drifted.
+"""
+
+from django.core.management.base import BaseCommand
+
+from pricing.models import DashboardRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard rollup counters from customers, subscriptions and invoices'
+
+    def handle(self, *args, **options):
+        DashboardRollup.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {DashboardRollup.objects.count()} dashboard rollup rows'
+        ))
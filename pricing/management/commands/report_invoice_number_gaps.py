@@ -0,0 +1,25 @@
+"""
+List invoice sequence values that were allocated but never used.
+
+Gaps are expected: each worker reserves numbers in blocks and loses the unused
+rest of its block when it exits, and rolled-back transactions do not return
+their numbers. Use this report to account for them during audits.
+"""
+
+from django.core.management.base import BaseCommand
+
+from pricing.numbering import invoice_number_gaps
+
+
+class Command(BaseCommand):
+    help = 'Report unused ranges in the invoice number sequence'
+
+    def handle(self, *args, **options):
+        gaps = invoice_number_gaps()
+        for first, last in gaps:
+            if first == last:
+                self.stdout.write(f'{first}')
+            else:
+                self.stdout.write(f'{first}-{last} ({last - first + 1} numbers)')
+        missing = sum(last - first + 1 for first, last in gaps)
+        self.stdout.write(self.style.SUCCESS(f'{len(gaps)} gaps, {missing} unused numbers'))
@@ -0,0 +1,67 @@
+"""
+Invoice every subscription whose billing period has come due.
+
+Safe to run repeatedly and from several hosts at once: workers claim
+subscriptions with SKIP LOCKED and a period is never invoiced twice, so an
+interrupted run is finished by running the command again.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from pricing.billing import BILLING_CHUNK_SIZE, BillingRunResult, run_billing
+from pricing_service.database import close_pools
+
+
+def _run_worker(at, chunk_size):
+    try:
+        return run_billing(at, chunk_size)
+    finally:
+        close_pools()
+
+
+class Command(BaseCommand):
+    help = 'Generate invoices for all subscriptions that are due for billing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help='Bill as of this ISO 8601 datetime (default: now)')
+        parser.add_argument('--chunk-size', type=int, default=BILLING_CHUNK_SIZE,
+                            help='Subscriptions claimed per transaction')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes sharing the run (PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        at = timezone.now()
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError('--at must be an ISO 8601 datetime')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        workers = options['workers']
+        if workers > 1 and not connection.features.has_select_for_update_skip_locked:
+            self.stderr.write(self.style.WARNING(
+                f'{connection.vendor} does not support SKIP LOCKED; running a single worker'
+            ))
+            workers = 1
+
+        if workers == 1:
+            result = run_billing(at, options['chunk_size'])
+        else:
+            # Children must open their own connections (and pools) rather than share ours
+            close_pools()
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                result = BillingRunResult()
+                for share in pool.map(_run_worker, [at] * workers, [options['chunk_size']] * workers):
+                    result.add(share)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Billed {result.subscriptions} subscriptions as of {at.isoformat()}: '
+            f'{result.invoices} invoices totalling {result.total_amount}'
+        ))
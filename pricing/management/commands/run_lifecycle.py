@@ -0,0 +1,64 @@
+"""
+Apply due subscription lifecycle transitions and invoice what they make due.
+
+Run once from cron, or with ``--loop`` as a long-lived scheduler on every
+replica. Replicas share an advisory lock, so only one applies a batch at a
+time. Between runs the scheduler sleeps until the earliest
+``next_transition_at``, read from its index, for at most ``--max-sleep``
+seconds.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from pricing.lifecycle import LIFECYCLE_BATCH_SIZE, next_transition_due, run_lifecycle
+
+
+class Command(BaseCommand):
+    help = 'End trials, renew or expire subscriptions at their end date, and bill renewals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help='Run as of this ISO 8601 datetime (default: now; not with --loop)')
+        parser.add_argument('--batch-size', type=int, default=LIFECYCLE_BATCH_SIZE,
+                            help='Subscriptions transitioned per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep running, waking when the next transition is due')
+        parser.add_argument('--max-sleep', type=float, default=60.0,
+                            help='Longest wait between runs with --loop, in seconds')
+
+    def handle(self, *args, **options):
+        at = None
+        if options['at']:
+            if options['loop']:
+                raise CommandError('--at cannot be combined with --loop')
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError('--at must be an ISO 8601 datetime')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        while True:
+            self.report(run_lifecycle(at, options['batch_size']))
+            if not options['loop']:
+                return
+            due = next_transition_due()
+            wait = options['max_sleep']
+            if due is not None:
+                wait = min(wait, max((due - timezone.now()).total_seconds(), 1.0))
+            close_old_connections()
+            time.sleep(wait)
+
+    def report(self, result):
+        if result.skipped:
+            self.stdout.write(
+                f'Another replica holds the lifecycle lock; skipped after {result.subscriptions} transitions'
+            )
+            return
+        if result.subscriptions or result.billing.invoices:
+            self.stdout.write(self.style.SUCCESS(
+                f'{result.activated} trials ended, {result.renewed} renewed, {result.expired} expired; '
+                f'billed {result.billing.invoices} invoices totalling {result.billing.total_amount}'
+            ))
@@ -0,0 +1,37 @@
+"""
+Mark sent invoices whose due date has passed as overdue.
+
+Run from cron (every few minutes is fine; a sweep with nothing to do is one
+index probe). Safe to run from several hosts at once: batches claim invoices
+with SKIP LOCKED.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from pricing.dunning import SWEEP_BATCH_SIZE, sweep_overdue_invoices
+
+
+class Command(BaseCommand):
+    help = 'Move sent invoices past their due date to overdue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help='Sweep as of this ISO 8601 datetime (default: now)')
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE,
+                            help='Invoices updated per transaction')
+
+    def handle(self, *args, **options):
+        at = timezone.now()
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError('--at must be an ISO 8601 datetime')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        result = sweep_overdue_invoices(at, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {result.invoices} invoices overdue as of {at.isoformat()} '
+            f'in {result.batches} batches, totalling {result.total_amount}'
+        ))
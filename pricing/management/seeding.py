@@ -0,0 +1,89 @@
+"""
+Scratch data for the benchmark and check commands.
+
+``rolled_back()`` runs a block inside a transaction that is always rolled
+back, so the commands leave no rows behind on the CI and staging databases
+they are pointed at. ``seed_rows()`` bulk inserts the rows they measure.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from pricing.models import AuditLog, Customer, Invoice, PricingPlan, Subscription
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction and roll it back, however the block ends"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+@dataclass
+class Seed:
+    """The rows ``seed_rows()`` created, in insertion order"""
+    plans: list = field(default_factory=list)
+    customers: list = field(default_factory=list)
+    subscriptions: list = field(default_factory=list)
+    invoices: list = field(default_factory=list)
+    audit_logs: list = field(default_factory=list)
+
+
+def seed_rows(label, plans=0, customers=0, subscriptions=0, invoices=0, audit_logs=False,
+              plan_fields=None, customer_fields=None, subscription_fields=None,
+              invoice_fields=None, audit_log_fields=None):
+    """
+    Bulk insert rows named after ``label`` and return them as a ``Seed``.
+
+    Subscriptions cycle through the plans and customers, invoices through the
+    subscriptions, and ``audit_logs`` adds one entry per subscription. Each
+    ``*_fields(i, rows)`` callable returns the fields of row ``i`` that differ
+    from those defaults; ``rows`` is the ``Seed`` built so far.
+    """
+    now = timezone.now()
+    slug = label.lower().replace(' ', '-')
+    rows = Seed()
+
+    def build(model, count, defaults, overrides):
+        objects = []
+        for i in range(count):
+            values = defaults(i)
+            if overrides:
+                values.update(overrides(i, rows))
+            objects.append(model(**values))
+        return model.objects.bulk_create(objects, batch_size=1000)
+
+    rows.plans = build(PricingPlan, plans, lambda i: {
+        'name': f'{label} {i}', 'plan_type': 'standard', 'base_price': Decimal(1000 + i) / 100,
+    }, plan_fields)
+    rows.customers = build(Customer, customers, lambda i: {
+        'name': f'{label} {i}', 'email': f'{slug}-{i}@example.com',
+    }, customer_fields)
+    rows.subscriptions = build(Subscription, subscriptions, lambda i: {
+        'customer': rows.customers[i % len(rows.customers)], 'plan': rows.plans[i % len(rows.plans)],
+        'status': 'active', 'start_date': now,
+    }, subscription_fields)
+    rows.invoices = build(Invoice, invoices, lambda i: {
+        'subscription': rows.subscriptions[i % len(rows.subscriptions)],
+        'invoice_number': f'{slug.upper()}-{i}', 'status': 'paid', 'issue_date': now,
+        'due_date': now + timedelta(days=30), 'subtotal': Decimal('10.00'), 'total_amount': Decimal('10.00'),
+    }, invoice_fields)
+    rows.audit_logs = build(AuditLog, len(rows.subscriptions) if audit_logs else 0, lambda i: {
+        'action_type': 'subscription_created', 'description': f'{label} seed',
+        'plan': rows.subscriptions[i].plan, 'customer': rows.subscriptions[i].customer,
+        'subscription': rows.subscriptions[i],
+    }, audit_log_fields)
+    return rows
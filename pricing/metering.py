@@ -0,0 +1,228 @@
+"""
+Usage metering.
+
+Usage events raise or lower a subscription's ``current_*`` counters. A batch of
+events is coalesced into one net increment per subscription and counter, and
+increments are written with ``UPDATE ... SET counter = GREATEST(counter + n, 0)``.
+The write never reads the row first, so concurrent writers cannot lose updates.
+Subscriptions whose increments are identical share one statement. The rows are
+locked in primary key order first, so writers flushing overlapping
+subscriptions cannot deadlock.
+
+How an accepted batch reaches the database depends on its durability mode:
+
+- ``buffered``: merged into this process's in-memory buffer and flushed by a
+  background thread every ``USAGE_FLUSH_INTERVAL`` seconds. This is the
+  fastest mode, but increments still in the buffer are lost if the process
+  dies.
+- ``journal``: appended to the ``UsageEvent`` table in the request, then
+  applied and deleted by the flusher. Accepted events survive a crash, and any
+  worker (or ``flush_usage_events``) can drain the journal.
+- ``sync``: applied in the request, so the counters include the batch once
+  the response is sent.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Now
+
+from .models import Subscription, UsageEvent
+
+
+logger = logging.getLogger(__name__)
+
+# Event metric -> Subscription counter
+USAGE_COUNTERS = {
+    'loan_applications': 'current_loan_applications',
+    'users': 'current_users',
+    'storage_gb': 'current_storage_gb',
+}
+DURABILITY_MODES = ('buffered', 'journal', 'sync')
+MAX_USAGE_DELTA = 1000000
+UPDATE_BATCH_SIZE = 1000
+JOURNAL_BATCH_SIZE = 5000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def coalesce(events):
+    """Sum ``(subscription_id, metric, delta)`` events into ``{subscription_id: {counter: delta}}``"""
+    increments = defaultdict(lambda: defaultdict(int))
+    for subscription_id, metric, delta in events:
+        increments[subscription_id][USAGE_COUNTERS[metric]] += delta
+    return increments
+
+
+def merge_increments(target, increments):
+    for subscription_id, deltas in increments.items():
+        counters = target.setdefault(subscription_id, defaultdict(int))
+        for counter, delta in deltas.items():
+            counters[counter] += delta
+
+
+def apply_increments(increments):
+    """Write coalesced increments with one UPDATE per distinct set of deltas"""
+    groups = defaultdict(list)
+    for subscription_id, deltas in increments.items():
+        key = tuple(sorted((counter, delta) for counter, delta in deltas.items() if delta))
+        if key:
+            groups[key].append(subscription_id)
+    with transaction.atomic():
+        # The groups below update rows in no global order; take every lock in pk order up front
+        locked = sorted(subscription_id for ids in groups.values() for subscription_id in ids)
+        for chunk in _chunks(locked, UPDATE_BATCH_SIZE):
+            list(Subscription.objects.filter(pk__in=chunk).order_by('pk').select_for_update().values_list('pk'))
+        for key in sorted(groups):
+            updates = {counter: Greatest(F(counter) + delta, 0) for counter, delta in key}
+            for chunk in _chunks(sorted(groups[key]), UPDATE_BATCH_SIZE):
+                Subscription.objects.filter(pk__in=chunk).update(updated_at=Now(), **updates)
+
+
+def drain_journal(batch_size=JOURNAL_BATCH_SIZE):
+    """Apply and delete journaled events; returns how many were applied
+
+    Rows are claimed with SKIP LOCKED, so several workers can drain at once.
+    """
+    drained = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                UsageEvent.objects.select_for_update(skip_locked=True)
+                .values_list('pk', 'subscription_id', 'metric', 'delta')[:batch_size]
+            )
+            if not rows:
+                return drained
+            apply_increments(coalesce(row[1:] for row in rows))
+            for chunk in _chunks([row[0] for row in rows], UPDATE_BATCH_SIZE):
+                UsageEvent.objects.filter(pk__in=chunk).delete()
+        drained += len(rows)
+
+
+class UsageBuffer:
+    """Increments accepted by this process and not yet written"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, increments):
+        with self._lock:
+            merge_increments(self._pending, increments)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='usage-flusher', daemon=True)
+                self._thread.start()
+            if len(self._pending) >= getattr(settings, 'USAGE_MAX_PENDING', 10000):
+                self._wake.set()
+
+    def flush(self):
+        """Write everything buffered so far; on failure it is kept for the next flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            apply_increments(pending)
+        except Exception:
+            with self._lock:
+                merge_increments(self._pending, pending)
+            raise
+        return len(pending)
+
+    def _run(self):
+        while True:
+            self._wake.wait(getattr(settings, 'USAGE_FLUSH_INTERVAL', 1.0))
+            self._wake.clear()
+            try:
+                self.flush()
+                drain_journal()
+            except Exception:
+                logger.exception('Usage flush failed; retrying on the next interval')
+            finally:
+                close_old_connections()
+
+    def _reset_after_fork(self):
+        # The flusher thread does not survive a fork, and the parent's
+        # increments are the parent's to write
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._wake = threading.Event()
+        self._thread = None
+
+
+usage_buffer = UsageBuffer()
+os.register_at_fork(after_in_child=usage_buffer._reset_after_fork)
+
+
+@atexit.register
+def _flush_at_exit():
+    # Graceful worker shutdowns keep their buffered increments
+    try:
+        usage_buffer.flush()
+    except Exception:
+        logger.exception('Could not flush buffered usage at exit')
+
+
+def parse_usage_events(rows):
+    """Validate request rows; returns ``(events, errors)``
+
+    ``events`` holds ``(subscription_id, metric, delta)`` for the valid rows and
+    ``errors`` maps the index of each invalid row to ``{field: [message]}``.
+    """
+    parsed = []
+    errors = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+            continue
+        try:
+            subscription_id = uuid.UUID(str(row.get('subscription')))
+        except ValueError:
+            errors[index] = {'subscription': ['Must be a valid UUID.']}
+            continue
+        metric = row.get('metric')
+        if not isinstance(metric, str) or metric not in USAGE_COUNTERS:
+            errors[index] = {'metric': [f"Choose one of: {', '.join(USAGE_COUNTERS)}."]}
+            continue
+        delta = row.get('delta', 1)
+        if type(delta) is not int or not 0 < abs(delta) <= MAX_USAGE_DELTA:
+            errors[index] = {'delta': [f'Enter a non-zero whole number between -{MAX_USAGE_DELTA} and {MAX_USAGE_DELTA}.']}
+            continue
+        parsed.append((index, subscription_id, metric, delta))
+
+    existing = set()
+    wanted = list({subscription_id for _, subscription_id, _, _ in parsed})
+    for chunk in _chunks(wanted, UPDATE_BATCH_SIZE):
+        existing.update(Subscription.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    events = []
+    for index, subscription_id, metric, delta in parsed:
+        if subscription_id not in existing:
+            errors[index] = {'subscription': [f'Invalid pk "{subscription_id}" - object does not exist.']}
+        else:
+            events.append((subscription_id, metric, delta))
+    return events, errors
+
+
+def record_usage(events, durability):
+    """Accept validated ``(subscription_id, metric, delta)`` events"""
+    if durability == 'journal':
+        UsageEvent.objects.bulk_create(
+            [UsageEvent(subscription_id=s, metric=m, delta=d) for s, m, d in events],
+            batch_size=UPDATE_BATCH_SIZE,
+        )
+    elif durability == 'sync':
+        apply_increments(coalesce(events))
+    else:
+        usage_buffer.add(coalesce(events))
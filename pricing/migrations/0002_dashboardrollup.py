@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:34
+
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('metric', models.CharField(max_length=50)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('shard', models.PositiveSmallIntegerField(default=0)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Rollup',
+                'verbose_name_plural': 'Dashboard Rollups',
+                'constraints': [models.UniqueConstraint(fields=('metric', 'key', 'shard'), name='unique_dashboard_rollup_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0002_dashboardrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingsettings',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
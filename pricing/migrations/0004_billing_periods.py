@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:41
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def schedule_existing_subscriptions(apps, schema_editor):
+    # The first billing run invoices the period in progress for each of these
+    Subscription = apps.get_model('pricing', 'Subscription')
+    Subscription.objects.filter(next_billing_date__isnull=True).update(next_billing_date=F('start_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0003_pricingsettings_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='period_start',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subscription',
+            name='next_billing_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('subscription', 'period_start'), name='unique_invoice_period'),
+        ),
+        migrations.RunPython(schedule_existing_subscriptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+# INCREMENT BY is the block size each nextval() reserves
+# (pricing.numbering.INVOICE_NUMBER_BLOCK_SIZE)
+def create_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE SEQUENCE IF NOT EXISTS pricing_invoice_number_seq INCREMENT BY 100 START WITH 1')
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP SEQUENCE IF EXISTS pricing_invoice_number_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0004_billing_periods'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='number_sequence',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='invoice_number',
+            field=models.CharField(blank=True, max_length=50, unique=True),
+        ),
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
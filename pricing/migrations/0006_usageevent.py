@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:51
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0005_invoice_number_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('metric', models.CharField(choices=[('loan_applications', 'Loan Applications'), ('users', 'Users'), ('storage_gb', 'Storage (GB)')], max_length=20)),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_events', to='pricing.subscription')),
+            ],
+            options={
+                'verbose_name': 'Usage Event',
+                'verbose_name_plural': 'Usage Events',
+            },
+        ),
+    ]
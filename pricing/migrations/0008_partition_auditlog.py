@@ -0,0 +1,85 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:02
+
+from datetime import date
+
+from django.db import migrations, models
+
+from pricing.partitions import PARTITION_MONTHS_AHEAD, add_months, month_start, partition_name
+
+
+# AuditLog foreign key column -> referenced table
+LINKS = {
+    'plan_id': 'pricing_pricingplan',
+    'customer_id': 'pricing_customer',
+    'subscription_id': 'pricing_subscription',
+    'invoice_id': 'pricing_invoice',
+}
+
+
+def add_links(schema_editor):
+    for column, target in LINKS.items():
+        schema_editor.execute(f'CREATE INDEX pricing_auditlog_{column}_idx ON pricing_auditlog ({column})')
+        schema_editor.execute(
+            f'ALTER TABLE pricing_auditlog ADD CONSTRAINT pricing_auditlog_{column}_fk '
+            f'FOREIGN KEY ({column}) REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def partition_auditlog(apps, schema_editor):
+    # PostgreSQL requires the partition key in the primary key, so it becomes
+    # (id, timestamp) in the database; Django keeps treating id as the key.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    execute('ALTER TABLE pricing_auditlog RENAME TO pricing_auditlog_unpartitioned')
+    execute('ALTER TABLE pricing_auditlog_unpartitioned RENAME CONSTRAINT pricing_auditlog_pkey TO pricing_auditlog_unpartitioned_pkey')
+    execute('CREATE TABLE pricing_auditlog (LIKE pricing_auditlog_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+    execute('ALTER TABLE pricing_auditlog ADD CONSTRAINT pricing_auditlog_pkey PRIMARY KEY (id, "timestamp")')
+    execute('CREATE TABLE pricing_auditlog_default PARTITION OF pricing_auditlog DEFAULT')
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min("timestamp") FROM pricing_auditlog_unpartitioned')
+        oldest = cursor.fetchone()[0]
+    month = month_start(oldest or date.today())
+    last = add_months(month_start(date.today()), PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        execute(
+            f'CREATE TABLE {partition_name("pricing_auditlog", month)} PARTITION OF pricing_auditlog '
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+        month = add_months(month, 1)
+
+    execute('INSERT INTO pricing_auditlog SELECT * FROM pricing_auditlog_unpartitioned')
+    execute('DROP TABLE pricing_auditlog_unpartitioned')
+    add_links(schema_editor)
+
+
+def unpartition_auditlog(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    execute = schema_editor.execute
+    execute('ALTER TABLE pricing_auditlog RENAME TO pricing_auditlog_partitioned')
+    execute('ALTER TABLE pricing_auditlog_partitioned RENAME CONSTRAINT pricing_auditlog_pkey TO pricing_auditlog_partitioned_pkey')
+    for column in LINKS:
+        execute(f'ALTER INDEX pricing_auditlog_{column}_idx RENAME TO pricing_auditlog_partitioned_{column}_idx')
+    execute('CREATE TABLE pricing_auditlog (LIKE pricing_auditlog_partitioned INCLUDING DEFAULTS)')
+    execute('INSERT INTO pricing_auditlog SELECT * FROM pricing_auditlog_partitioned')
+    # Partitions detached by retention are standalone tables and are left alone
+    execute('DROP TABLE pricing_auditlog_partitioned')
+    execute('ALTER TABLE pricing_auditlog ADD CONSTRAINT pricing_auditlog_pkey PRIMARY KEY (id)')
+    add_links(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0007_auditlog_action_types'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_auditlog, unpartition_auditlog),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp', 'id'], name='pricing_auditlog_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.7 on 2026-10-17 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0008_partition_auditlog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['name', 'id'], name='pricing_cust_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['status', 'name', 'id'], name='pricing_cust_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-created_at', '-id'], name='pricing_inv_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('status__in', ['draft', 'sent'])), fields=['-created_at', '-id'], name='pricing_inv_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingplan',
+            index=models.Index(fields=['base_price', 'name', 'id'], name='pricing_plan_price_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingplan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['base_price', 'name', 'id'], name='pricing_plan_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pricingplan',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_featured', True)), fields=['base_price', 'name', 'id'], name='pricing_plan_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['-created_at', '-id'], name='pricing_sub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='pricing_sub_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0009_workload_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action_type',
+            field=models.CharField(choices=[('plan_created', 'Plan Created'), ('plan_updated', 'Plan Updated'), ('plan_deleted', 'Plan Deleted'), ('subscription_created', 'Subscription Created'), ('subscription_updated', 'Subscription Updated'), ('subscription_cancelled', 'Subscription Cancelled'), ('invoice_created', 'Invoice Created'), ('invoice_paid', 'Invoice Paid'), ('invoice_overdue', 'Invoice Overdue'), ('customer_created', 'Customer Created'), ('customer_updated', 'Customer Updated'), ('customer_deleted', 'Customer Deleted'), ('subscription_deleted', 'Subscription Deleted'), ('invoice_updated', 'Invoice Updated'), ('invoice_deleted', 'Invoice Deleted'), ('settings_updated', 'Settings Updated')], max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('status', 'sent')), fields=['due_date', 'id'], name='pricing_inv_sent_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('status', 'overdue')), fields=['due_date', 'id'], name='pricing_inv_overdue_due_idx'),
+        ),
+    ]
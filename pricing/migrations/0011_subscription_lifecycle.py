@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-17 07:08
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def schedule_transitions(apps, schema_editor):
+    # Existing trials without a trial_end_date stay in trial until one is set
+    Subscription = apps.get_model('pricing', 'Subscription')
+    Subscription.objects.filter(status='trial').update(next_transition_at=F('trial_end_date'))
+    Subscription.objects.filter(status='active').update(next_transition_at=F('end_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pricing', '0010_overdue_invoices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='next_transition_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(schedule_transitions, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action_type',
+            field=models.CharField(choices=[('plan_created', 'Plan Created'), ('plan_updated', 'Plan Updated'), ('plan_deleted', 'Plan Deleted'), ('subscription_created', 'Subscription Created'), ('subscription_updated', 'Subscription Updated'), ('subscription_cancelled', 'Subscription Cancelled'), ('subscription_activated', 'Subscription Activated'), ('subscription_renewed', 'Subscription Renewed'), ('subscription_expired', 'Subscription Expired'), ('invoice_created', 'Invoice Created'), ('invoice_paid', 'Invoice Paid'), ('invoice_overdue', 'Invoice Overdue'), ('customer_created', 'Customer Created'), ('customer_updated', 'Customer Updated'), ('customer_deleted', 'Customer Deleted'), ('subscription_deleted', 'Subscription Deleted'), ('invoice_updated', 'Invoice Updated'), ('invoice_deleted', 'Invoice Deleted'), ('settings_updated', 'Settings Updated')], max_length=30),
+        ),
+    ]
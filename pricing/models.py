@@ -1,9 +1,26 @@
-from django.db import models
+from django.db import models, transaction, connection
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from collections import defaultdict
+from datetime import timedelta
 from decimal import Decimal
+import random
 import uuid
 
+from . import rollups
+from .config import get_pricing_config, invalidate_pricing_config
+from .expressions import effective_price_expression, monthly_price_expression, to_cents
+from .numbering import assign_invoice_numbers
+
+
+class PricingPlanQuerySet(models.QuerySet):
+    
+    def with_monthly_price(self):
+        """Make ``monthly_price`` available to filter() and order_by()"""
+        return self.alias(monthly_price=monthly_price_expression())
+
 
 class PricingPlan(models.Model):
     """Pricing plans for different subscription tiers"""
@@ -54,10 +71,20 @@ class PricingPlan(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     # created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_plans')
     
+    objects = PricingPlanQuerySet.as_manager()
+    
     class Meta:
         ordering = ['base_price', 'name']
         verbose_name = "Pricing Plan"
         verbose_name_plural = "Pricing Plans"
+        # Listings page on the ordering plus id (see pricing.pagination)
+        indexes = [
+            models.Index(fields=['base_price', 'name', 'id'], name='pricing_plan_price_name_idx'),
+            models.Index(fields=['base_price', 'name', 'id'], name='pricing_plan_active_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['base_price', 'name', 'id'], name='pricing_plan_featured_idx',
+                         condition=models.Q(is_active=True, is_featured=True)),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.get_plan_type_display()})"
@@ -68,11 +95,32 @@ class PricingPlan(models.Model):
         if self.billing_cycle == 'monthly':
             return self.base_price
         elif self.billing_cycle == 'quarterly':
-            return self.base_price / 3
+            return to_cents(self.base_price / 3)
         elif self.billing_cycle == 'yearly':
-            return self.base_price / 12
+            return to_cents(self.base_price / 12)
         else:  # lifetime
-            return self.base_price / 120  # Assuming 10 years lifetime
+            return to_cents(self.base_price / 120)  # Assuming 10 years lifetime
+
+
+class CustomerQuerySet(models.QuerySet):
+    
+    def with_spend(self):
+        """Annotate ``total_spent`` (paid invoices) and ``active_subscriptions``
+        
+        Both are correlated subqueries rather than joins, so neither total is
+        multiplied by the other's rows and either can be used in ORDER BY/WHERE.
+        """
+        money = DecimalField(max_digits=16, decimal_places=2)
+        paid = Invoice.objects.filter(
+            subscription__customer=OuterRef('pk'), status='paid'
+        ).order_by().values('subscription__customer').annotate(total=Sum('total_amount')).values('total')
+        active = Subscription.objects.filter(
+            customer=OuterRef('pk'), status='active'
+        ).order_by().values('customer').annotate(total=Count('pk')).values('total')
+        return self.annotate(
+            total_spent=Coalesce(Subquery(paid, output_field=money), Value(Decimal('0.00')), output_field=money),
+            active_subscriptions=Coalesce(Subquery(active), Value(0)),
+        )
 
 
 class Customer(models.Model):
@@ -116,13 +164,42 @@ class Customer(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     # created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_customers')
     
+    objects = CustomerQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
         verbose_name = "Customer"
         verbose_name_plural = "Customers"
+        indexes = [
+            models.Index(fields=['name', 'id'], name='pricing_cust_name_idx'),
+            models.Index(fields=['status', 'name', 'id'], name='pricing_cust_status_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.email})"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            DashboardRollup.objects.apply(rollups.customer_contributions())
+
+
+def next_transition_time(status, trial_end_date, end_date):
+    """When a subscription in ``status`` is next due a lifecycle change (see pricing.lifecycle)"""
+    if status == 'trial':
+        return trial_end_date
+    if status == 'active':
+        return end_date
+    return None
+
+
+class SubscriptionQuerySet(models.QuerySet):
+    
+    def with_effective_price(self):
+        """Make ``effective_price`` available to filter() and order_by()"""
+        return self.alias(effective_price=effective_price_expression())
 
 
 class Subscription(models.Model):
@@ -145,6 +222,12 @@ class Subscription(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField(null=True, blank=True)
     trial_end_date = models.DateTimeField(null=True, blank=True)
+    # Start of the next period to invoice; null once nothing more is billable.
+    # Advanced by the billing run (see pricing.billing).
+    next_billing_date = models.DateTimeField(null=True, blank=True, db_index=True)
+    # trial_end_date while in trial, end_date while active, otherwise null.
+    # Kept by save(); the lifecycle run claims due rows through this index.
+    next_transition_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
     
     # Pricing
     custom_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
@@ -160,21 +243,53 @@ class Subscription(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     # created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_subscriptions')
     
+    objects = SubscriptionQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Subscription"
         verbose_name_plural = "Subscriptions"
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='pricing_sub_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='pricing_sub_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer.name} - {self.plan.name}"
     
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.next_billing_date is None:
+            self.next_billing_date = self.start_date
+        if self._state.adding and self.status == 'trial' and self.trial_end_date is None:
+            self.trial_end_date = self.start_date + timedelta(days=get_pricing_config().trial_days)
+        self.next_transition_at = next_transition_time(self.status, self.trial_end_date, self.end_date)
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                # Lock the stored row so concurrent saves see each other's changes
+                previous = Subscription.objects.select_for_update().filter(pk=self.pk).values('status', 'plan_id').first()
+            super().save(*args, **kwargs)
+            deltas = rollups.diff(
+                previous and rollups.subscription_contributions(**previous),
+                rollups.subscription_contributions(self.status, self.plan_id),
+            )
+            if previous and previous['plan_id'] != self.plan_id:
+                # Paid revenue is reported against the subscription's current plan
+                paid = self.invoices.filter(status='paid').aggregate(count=Count('id'), amount=Sum('total_amount'))
+                if paid['count']:
+                    deltas = rollups.merge(deltas, {
+                        (rollups.REVENUE_BY_PLAN, str(previous['plan_id'])): (-paid['count'], -paid['amount']),
+                        (rollups.REVENUE_BY_PLAN, str(self.plan_id)): (paid['count'], paid['amount']),
+                    })
+            DashboardRollup.objects.apply(deltas)
+    
     @property
     def effective_price(self):
         """Calculate effective price after discounts"""
         price = self.custom_price or self.plan.base_price
         if self.discount_percentage > 0:
             discount_amount = price * (self.discount_percentage / 100)
-            return price - discount_amount
+            return to_cents(price - discount_amount)
         return price
 
 
@@ -191,13 +306,18 @@ class Invoice(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='invoices')
-    invoice_number = models.CharField(max_length=50, unique=True)
+    # Allocated on save from a database sequence; see pricing.numbering
+    invoice_number = models.CharField(max_length=50, unique=True, blank=True)
+    number_sequence = models.BigIntegerField(null=True, blank=True, unique=True, editable=False)
     
     # Invoice details
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     issue_date = models.DateTimeField()
     due_date = models.DateTimeField()
     paid_date = models.DateTimeField(null=True, blank=True)
+    # Billing period this invoice covers; set by the billing run, which relies
+    # on (subscription, period_start) being unique to stay idempotent
+    period_start = models.DateTimeField(null=True, blank=True)
     
     # Amounts
     subtotal = models.DecimalField(max_digits=10, decimal_places=2)
@@ -217,9 +337,48 @@ class Invoice(models.Model):
         ordering = ['-created_at']
         verbose_name = "Invoice"
         verbose_name_plural = "Invoices"
+        constraints = [
+            models.UniqueConstraint(fields=['subscription', 'period_start'], name='unique_invoice_period'),
+        ]
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='pricing_inv_created_idx'),
+            # Only open invoices; /api/invoices/pending/ reads nothing else
+            models.Index(fields=['-created_at', '-id'], name='pricing_inv_open_created_idx',
+                         condition=models.Q(status__in=['draft', 'sent'])),
+            # The overdue sweep claims by due date; /api/invoices/overdue/ lists by it
+            models.Index(fields=['due_date', 'id'], name='pricing_inv_sent_due_idx',
+                         condition=models.Q(status='sent')),
+            models.Index(fields=['due_date', 'id'], name='pricing_inv_overdue_due_idx',
+                         condition=models.Q(status='overdue')),
+        ]
     
     def __str__(self):
         return f"Invoice {self.invoice_number} - {self.subscription.customer.name}"
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.invoice_number:
+            assign_invoice_numbers([self])
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Invoice.objects.select_for_update(of=('self',)).filter(pk=self.pk).values(
+                    'status', 'total_amount', 'paid_date', 'issue_date', 'subscription_id',
+                    plan_id=F('subscription__plan_id'),
+                ).first()
+            super().save(*args, **kwargs)
+            old_contributions = None
+            plan_id = None
+            if previous:
+                previous_subscription_id = previous.pop('subscription_id')
+                old_contributions = rollups.invoice_contributions(**previous)
+                if previous_subscription_id == self.subscription_id:
+                    plan_id = previous['plan_id']
+            if plan_id is None and self.status == 'paid':
+                plan_id = self.subscription.plan_id
+            DashboardRollup.objects.apply(rollups.diff(
+                old_contributions,
+                rollups.invoice_contributions(self.status, self.total_amount, plan_id, self.paid_date, self.issue_date),
+            ))
 
 
 class PricingSettings(models.Model):
@@ -252,6 +411,9 @@ class PricingSettings(models.Model):
     require_approval_for_custom = models.BooleanField(default=True)
     auto_renewal = models.BooleanField(default=True)
     
+    # Bumped on every save so other workers can tell their cached copy is stale
+    version = models.PositiveIntegerField(default=1, editable=False)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -265,10 +427,18 @@ class PricingSettings(models.Model):
         return "Pricing Settings"
     
     def save(self, *args, **kwargs):
-        # Ensure only one instance exists
-        if not self.pk and PricingSettings.objects.exists():
+        # Ensure only one instance exists. The pk has a default, so check the
+        # instance state rather than the pk.
+        if self._state.adding and PricingSettings.objects.exists():
             raise ValueError("Only one PricingSettings instance is allowed")
+        bump_version = not self._state.adding
+        if bump_version:
+            # Workers compare this against their cached copy (see pricing.config)
+            self.version = F('version') + 1
         super().save(*args, **kwargs)
+        if bump_version:
+            self.refresh_from_db(fields=['version'])
+        transaction.on_commit(invalidate_pricing_config)
 
 
 class AuditLog(models.Model):
@@ -281,10 +451,18 @@ class AuditLog(models.Model):
         ('subscription_created', 'Subscription Created'),
         ('subscription_updated', 'Subscription Updated'),
         ('subscription_cancelled', 'Subscription Cancelled'),
+        ('subscription_activated', 'Subscription Activated'),
+        ('subscription_renewed', 'Subscription Renewed'),
+        ('subscription_expired', 'Subscription Expired'),
         ('invoice_created', 'Invoice Created'),
         ('invoice_paid', 'Invoice Paid'),
+        ('invoice_overdue', 'Invoice Overdue'),
         ('customer_created', 'Customer Created'),
         ('customer_updated', 'Customer Updated'),
+        ('customer_deleted', 'Customer Deleted'),
+        ('subscription_deleted', 'Subscription Deleted'),
+        ('invoice_updated', 'Invoice Updated'),
+        ('invoice_deleted', 'Invoice Deleted'),
         ('settings_updated', 'Settings Updated'),
     ]
     
@@ -313,6 +491,121 @@ class AuditLog(models.Model):
         ordering = ['-timestamp']
         verbose_name = "Audit Log"
         verbose_name_plural = "Audit Logs"
+        # On PostgreSQL the table is partitioned by month on timestamp (see pricing.partitions)
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='pricing_auditlog_ts_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_action_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+class UsageEvent(models.Model):
+    """Journal of accepted usage increments waiting to be applied (see pricing.metering)"""
+    
+    METRIC_CHOICES = [
+        ('loan_applications', 'Loan Applications'),
+        ('users', 'Users'),
+        ('storage_gb', 'Storage (GB)'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='usage_events')
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Usage Event"
+        verbose_name_plural = "Usage Events"
+    
+    def __str__(self):
+        return f"{self.metric} {self.delta:+d} - {self.subscription_id}"
+
+
+class DashboardRollupManager(models.Manager):
+    
+    def apply(self, deltas):
+        """Add ``{(metric, key): (count, amount)}`` deltas to the counters
+        
+        Call this inside the transaction that made the change. Bulk writes that
+        skip ``save()`` (``bulk_create``, ``QuerySet.update``) must call it with
+        the merged deltas of every row they touch.
+        """
+        if not deltas:
+            return
+        shard = random.randrange(rollups.ROLLUP_SHARDS)
+        # Sorted so that transactions on the same shard lock rows in the same order
+        keys = sorted(deltas)
+        self.bulk_create(
+            [self.model(metric=metric, key=key, shard=shard) for metric, key in keys],
+            ignore_conflicts=True,
+        )
+        for metric, key in keys:
+            count, amount = deltas[(metric, key)]
+            self.filter(metric=metric, key=key, shard=shard).update(
+                count=F('count') + count, amount=F('amount') + amount
+            )
+    
+    def snapshot(self):
+        """Return ``{metric: {key: (count, amount)}}`` summed over all shards"""
+        totals = defaultdict(dict)
+        rows = self.values('metric', 'key').annotate(
+            total_count=Sum('count'), total_amount=Sum('amount')
+        ).order_by()
+        for row in rows:
+            totals[row['metric']][row['key']] = (row['total_count'], row['total_amount'])
+        return totals
+    
+    def rebuild(self):
+        """Recompute every counter from the source tables"""
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Writers queue on their counter update until we commit, so their
+                # deltas land on top of totals that do not include them yet.
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {self.model._meta.db_table} IN EXCLUSIVE MODE')
+            self.all().delete()
+            
+            deltas = {(rollups.CUSTOMERS, ''): (Customer.objects.count(), rollups.ZERO)}
+            for row in Subscription.objects.values('status').annotate(n=Count('id')).order_by():
+                deltas[(rollups.SUBSCRIPTIONS_BY_STATUS, row['status'])] = (row['n'], rollups.ZERO)
+            active = Subscription.objects.filter(status='active')
+            for row in active.values('plan_id').annotate(n=Count('id')).order_by():
+                deltas[(rollups.ACTIVE_SUBSCRIPTIONS_BY_PLAN, str(row['plan_id']))] = (row['n'], rollups.ZERO)
+            for row in Invoice.objects.values('status').annotate(n=Count('id'), total=Sum('total_amount')).order_by():
+                deltas[(rollups.INVOICES_BY_STATUS, row['status'])] = (row['n'], row['total'])
+            paid = Invoice.objects.filter(status='paid')
+            by_plan = paid.values(plan=F('subscription__plan_id')).annotate(n=Count('id'), total=Sum('total_amount'))
+            for row in by_plan.order_by():
+                deltas[(rollups.REVENUE_BY_PLAN, str(row['plan']))] = (row['n'], row['total'])
+            by_month = paid.annotate(
+                month=TruncMonth(Coalesce('paid_date', 'issue_date'))
+            ).values('month').annotate(n=Count('id'), total=Sum('total_amount'))
+            for row in by_month.order_by():
+                deltas[(rollups.REVENUE_BY_MONTH, row['month'].strftime('%Y-%m'))] = (row['n'], row['total'])
+            
+            self.apply(rollups.merge(deltas))
+
+
+class DashboardRollup(models.Model):
+    """Incrementally maintained counters behind the pricing dashboard"""
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    metric = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, blank=True)
+    shard = models.PositiveSmallIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal('0.00'))
+    
+    objects = DashboardRollupManager()
+    
+    class Meta:
+        verbose_name = "Dashboard Rollup"
+        verbose_name_plural = "Dashboard Rollups"
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'key', 'shard'], name='unique_dashboard_rollup_shard'),
+        ]
+    
+    def __str__(self):
+        return f"{self.metric}[{self.key}] #{self.shard}"
@@ -0,0 +1,97 @@
+"""
+Invoice number allocation.
+
+Numbers look like ``<invoice_prefix>-<year>-<seq>``; ``seq`` comes from the
+``pricing_invoice_number_seq`` database sequence and is also stored on
+``Invoice.number_sequence``. The sequence advances by
+``INVOICE_NUMBER_BLOCK_SIZE``, so each ``nextval`` reserves a whole block that
+this process then hands out from memory: concurrent writers never wait on one
+another, and a bulk insert needs one query however many numbers it takes.
+
+Numbers are unique but not gapless. A block's unused tail is lost when its
+process exits, and numbers taken by a transaction that rolls back are not
+reused. ``invoice_number_gaps()`` (and the ``report_invoice_number_gaps``
+command) lists the missing ranges.
+
+Backends without sequences (SQLite in development) fall back to
+``max(number_sequence) + 1``, which is only safe for a single writer.
+"""
+
+import os
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, Max, Window
+from django.db.models.functions import Lag
+
+from .config import get_pricing_config
+
+
+INVOICE_NUMBER_SEQUENCE = 'pricing_invoice_number_seq'
+# Must match the sequence's INCREMENT BY (migration 0005_invoice_number_sequence)
+INVOICE_NUMBER_BLOCK_SIZE = 100
+
+_lock = threading.Lock()
+_blocks = {}  # database alias -> [next value, end of block)
+
+# A forked worker must not keep handing out its parent's block
+os.register_at_fork(after_in_child=_blocks.clear)
+
+
+def _reserve_blocks(connection, count):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [INVOICE_NUMBER_SEQUENCE, count])
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def _next_from_table(count, using):
+    from .models import Invoice
+
+    latest = Invoice.objects.using(using).aggregate(latest=Max('number_sequence'))['latest'] or 0
+    return list(range(latest + 1, latest + 1 + count))
+
+
+def allocate_invoice_sequences(count, using=DEFAULT_DB_ALIAS):
+    """Return ``count`` unused sequence values, in ascending order"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return _next_from_table(count, using)
+
+    values = []
+    with _lock:
+        block = _blocks.get(using)
+        if block:
+            take = min(block[1] - block[0], count)
+            values.extend(range(block[0], block[0] + take))
+            block[0] += take
+        missing = count - len(values)
+        if missing:
+            starts = _reserve_blocks(connection, -(-missing // INVOICE_NUMBER_BLOCK_SIZE))
+            for start in starts:
+                take = min(INVOICE_NUMBER_BLOCK_SIZE, count - len(values))
+                values.extend(range(start, start + take))
+                _blocks[using] = [start + take, start + INVOICE_NUMBER_BLOCK_SIZE]
+    return values
+
+
+def format_invoice_number(prefix, year, sequence):
+    return f"{prefix}-{year}-{sequence:06d}"
+
+
+def assign_invoice_numbers(invoices, using=DEFAULT_DB_ALIAS):
+    """Give each unsaved invoice a ``number_sequence`` and ``invoice_number``"""
+    prefix = get_pricing_config().invoice_prefix
+    for invoice, sequence in zip(invoices, allocate_invoice_sequences(len(invoices), using)):
+        issue_date = invoice._meta.get_field('issue_date').to_python(invoice.issue_date)
+        invoice.number_sequence = sequence
+        invoice.invoice_number = format_invoice_number(prefix, issue_date.year, sequence)
+
+
+def invoice_number_gaps(using=DEFAULT_DB_ALIAS):
+    """Return ``[(first_missing, last_missing)]`` for unused values between allocated ones"""
+    from .models import Invoice
+
+    rows = Invoice.objects.using(using).filter(number_sequence__isnull=False).annotate(
+        previous=Window(Lag('number_sequence'), order_by=F('number_sequence').asc()),
+    ).filter(number_sequence__gt=F('previous') + 1).order_by('number_sequence')
+    return [(previous + 1, sequence - 1) for previous, sequence in rows.values_list('previous', 'number_sequence')]
@@ -0,0 +1,159 @@
+"""
+Keyset (cursor) pagination for the pricing API.
+
+Pages are selected with a ``WHERE (ordering keys) > (last row's keys)`` filter
+instead of an OFFSET, so fetching page 10,000 costs the same as fetching page 1.
+The queryset ordering (usually ``Meta.ordering``) is extended with the primary
+key as a tiebreaker so rows that share an ordering value are never skipped or
+repeated.
+"""
+
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .filters import field_converter
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on the queryset ordering plus the primary key"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for coroutine handlers"""
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """Return the query for the requested page plus one row to detect a next page"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.converters = [self.get_converter(queryset, field) for field, _ in self.ordering]
+
+        self.cursor_values, self.reverse = self.decode_cursor(request)
+        self.page_limit = self.get_page_size(request)
+
+        if self.cursor_values is not None:
+            queryset = queryset.filter(self.keyset_filter(self.cursor_values, self.reverse))
+        order_by = [
+            f"{'-' if descending != self.reverse else ''}{field}"
+            for field, descending in self.ordering
+        ]
+        return queryset.order_by(*order_by)[:self.page_limit + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_limit
+        self.page = rows[:self.page_limit]
+        if self.reverse:
+            self.page.reverse()
+
+        # Moving backwards always leaves a page behind us, and vice versa.
+        started = self.cursor_values is not None
+        self.has_next = has_more if not self.reverse else started
+        self.has_previous = started if not self.reverse else has_more
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Return ``[(field, descending), ...]`` ending with the primary key"""
+        pk_name = queryset.model._meta.pk.name
+        ordering = []
+        for term in queryset.query.order_by or queryset.model._meta.ordering:
+            field = term.lstrip('-')
+            ordering.append((pk_name if field == 'pk' else field, term.startswith('-')))
+        if pk_name not in [field for field, _ in ordering]:
+            # Follow the direction of the leading key so the tiebreaker is monotonic
+            ordering.append((pk_name, ordering[0][1] if ordering else False))
+        return ordering
+
+    def get_converter(self, queryset, field):
+        """Return a function that turns a cursor string back into a field value"""
+        return field_converter(queryset, field)
+
+    def keyset_filter(self, values, reverse):
+        """Build ``(a, b, c) > (x, y, z)`` as a chain of OR'd equality prefixes"""
+        clauses = []
+        for index, (field, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{field}__{lookup}': values[index]})
+            for prefix_index in range(index):
+                clause &= Q(**{self.ordering[prefix_index][0]: values[prefix_index]})
+            clauses.append(clause)
+        return reduce(or_, clauses)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            raw_values = cursor['v']
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [convert(value) for convert, value in zip(self.converters, raw_values)]
+            return values, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def cursor_value(self, row, field):
+        """Read an ordering key from a model instance or a ``values()`` row"""
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    def encode_cursor(self, instance, reverse):
+        values = [str(self.cursor_value(instance, field)) for field, _ in self.ordering]
+        cursor = {'v': values}
+        if reverse:
+            cursor['r'] = 1
+        encoded = b64encode(json.dumps(cursor, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
@@ -0,0 +1,137 @@
+"""
+Monthly range partitions for the audit log (PostgreSQL only).
+
+Migration 0008 turns ``pricing_auditlog`` into a table partitioned by month on
+``timestamp``. Month ``YYYY-MM`` lives in ``pricing_auditlog_pYYYYMM``, and
+``pricing_auditlog_default`` catches rows that no month covers, so inserts
+never fail for want of a partition. ``ensure_partitions()`` creates the
+current month and ``PARTITION_MONTHS_AHEAD`` months after it; it runs after
+every ``migrate`` and from the ``manage_partitions`` command.
+
+Queries with a ``timestamp`` bound (the newest-first listing with its keyset
+cursor, ``?min_timestamp=``/``?max_timestamp=``, exports by date) read only
+the partitions that can match. Retention detaches, and optionally drops,
+whole months rather than deleting rows.
+
+The primary key is ``(id, timestamp)`` in the database, because PostgreSQL
+requires the partition key in every unique index. Django still treats ``id``
+as the primary key, and ids come from ``uuid4``.
+"""
+
+import re
+from datetime import date
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+# Partitioned table -> partition key column
+PARTITIONED_TABLES = {
+    'pricing_auditlog': 'timestamp',
+}
+PARTITION_MONTHS_AHEAD = 3
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(table, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_class WHERE relname = %s AND relkind = 'p' AND pg_table_is_visible(oid)",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(table, using=DEFAULT_DB_ALIAS):
+    """Return ``{month: partition name}`` for the attached monthly partitions"""
+    pattern = re.compile(rf'^{re.escape(table)}_p(\d{{4}})(\d{{2}})$')
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits i '
+            'JOIN pg_class parent ON parent.oid = i.inhparent '
+            'JOIN pg_class child ON child.oid = i.inhrelid '
+            'WHERE parent.relname = %s AND pg_table_is_visible(parent.oid)',
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_partition(table, month, using=DEFAULT_DB_ALIAS):
+    """Create and attach the partition for ``month``
+
+    Rows already in the default partition for that month are moved into the
+    new partition first, since attaching fails while the default holds any.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    column = PARTITIONED_TABLES[table]
+    name = partition_name(table, month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(table + "_default")} '
+            f"WHERE {quote(column)} >= '{start}' AND {quote(column)} < '{end}' RETURNING *) "
+            f'INSERT INTO {quote(name)} SELECT * FROM moved'
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+    return name
+
+
+def ensure_partitions(months_ahead=PARTITION_MONTHS_AHEAD, today=None, using=DEFAULT_DB_ALIAS):
+    """Create any missing partitions from this month to ``months_ahead`` months out
+
+    Returns the names of the partitions created. Does nothing for tables that
+    are not partitioned, such as on SQLite.
+    """
+    current = month_start(today or date.today())
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table, using):
+            continue
+        existing = monthly_partitions(table, using)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month not in existing:
+                created.append(create_partition(table, month, using))
+    return created
+
+
+def expired_partitions(table, keep_months, today=None, using=DEFAULT_DB_ALIAS):
+    """Return ``[(month, name)]`` for partitions wholly older than ``keep_months`` months"""
+    cutoff = add_months(month_start(today or date.today()), -keep_months)
+    return sorted(
+        (month, name) for month, name in monthly_partitions(table, using).items() if month < cutoff
+    )
+
+
+def detach_partition(table, name, drop=False, using=DEFAULT_DB_ALIAS):
+    """Detach one partition, leaving it as a standalone table unless ``drop``"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}')
+        if drop:
+            cursor.execute(f'DROP TABLE {quote(name)}')
@@ -0,0 +1,35 @@
+"""
+Query budget helpers.
+
+Used by the ``check_query_budgets`` management command to make sure API
+endpoints issue a fixed number of queries no matter how many rows they return.
+"""
+
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code issues more queries than allowed"""
+
+
+@contextmanager
+def query_budget(max_queries, using='default', label=''):
+    """Fail if the wrapped block runs more than ``max_queries`` queries"""
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > max_queries:
+        statements = '\n'.join(query['sql'] for query in context.captured_queries)
+        raise QueryBudgetExceeded(
+            f"{label or 'Block'} ran {len(context)} queries, budget is {max_queries}:\n{statements}"
+        )
+
+
+def count_queries(func, *args, using='default', **kwargs):
+    """Call ``func`` and return ``(result, number_of_queries)``"""
+    with CaptureQueriesContext(connections[using]) as context:
+        result = func(*args, **kwargs)
+    return result, len(context)
+
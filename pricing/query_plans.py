@@ -0,0 +1,61 @@
+"""
+Query plan helpers.
+
+Used by the ``check_query_plans`` management command to make sure list
+endpoints read their page from an index rather than scanning and sorting the
+whole table. Understands PostgreSQL's ``EXPLAIN (FORMAT JSON)`` and SQLite's
+``EXPLAIN QUERY PLAN``.
+"""
+
+import json
+
+from django.db import connections
+
+
+def _pg_problems(plan, table):
+    problems = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table:
+            problems.append(f'sequential scan of {table}')
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(f"sort on {', '.join(node.get('Sort Key', []))}")
+        nodes.extend(node.get('Plans', []))
+    return problems
+
+
+def _sqlite_problems(rows, table):
+    problems = []
+    for *_, detail in rows:
+        # "SCAN t USING INDEX i" walks an index in order; a bare "SCAN t" reads the table
+        if detail == f'SCAN {table}':
+            problems.append(f'full scan of {table}')
+        if detail.startswith('USE TEMP B-TREE FOR'):
+            problems.append(detail.lower().replace('use temp b-tree for', 'sort for'))
+    return problems
+
+
+def explain(sql, params=None, using='default'):
+    """Return the plan of ``sql`` as text lines"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def plan_problems(sql, table, params=None, using='default'):
+    """Return what keeps ``sql`` from reading ``table`` through an index, or ``[]``"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return _pg_problems(plan[0]['Plan'], table)
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return _sqlite_problems(cursor.fetchall(), table)
@@ -0,0 +1,201 @@
+"""
+Batch price quotes.
+
+Quotes are priced column-wise: the request rows are turned into parallel lists
+of integers (money in cents, percentages in hundredths of a percent) and each
+pricing step runs once over a whole column. Integer arithmetic with explicit
+half-up rounding reproduces the Decimal model properties to the cent:
+
+- ``effective_price``: ``Subscription.effective_price`` for the custom price
+  (or plan price) and discount
+- ``monthly_price``: the effective price over the months in the billing
+  cycle, as in ``PricingPlan.monthly_price``
+- ``subtotal``: effective price times seats, plus the plan's setup fee
+- ``tax_amount``: ``PricingSettings.tax_rate`` of the subtotal, as on invoices
+"""
+
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from .config import get_pricing_config
+from .models import PricingPlan
+
+
+MAX_QUOTES = 100000
+
+MONTHS_PER_BILLING_CYCLE = {'monthly': 1, 'quarterly': 3, 'yearly': 12, 'lifetime': 120}
+MAX_SEATS = 1000000
+
+
+class QuoteError(ValueError):
+    """One field of one quote row is invalid"""
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+
+
+class _Parsed(dict):
+    """Parsed field values keyed by raw value; what-if grids repeat a handful of values"""
+
+    def __init__(self, parse):
+        super().__init__()
+        self.parse = parse
+
+    def __missing__(self, raw):
+        if type(raw) is bool:  # True == 1 as a dict key
+            raise TypeError
+        value = self[raw] = self.parse(raw)
+        return value
+
+
+def _plan_key(value):
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise QuoteError('plan', 'Must be a valid UUID.')
+
+
+def _hundredths(value, field, maximum=None):
+    """Parse a non-negative amount with at most two decimals into an int of hundredths"""
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise QuoteError(field, 'A valid number is required.')
+    if not amount.is_finite() or amount < 0 or amount.as_tuple().exponent < -2:
+        raise QuoteError(field, 'Enter a non-negative number with at most 2 decimal places.')
+    if maximum is not None and amount > maximum:
+        raise QuoteError(field, f'Ensure this value is less than or equal to {maximum}.')
+    return int(amount * 100)
+
+
+def _money(column):
+    """Format a column of cents as decimal strings"""
+    return [f'{cents // 100}.{cents % 100:02d}' for cents in column]
+
+
+def parse_quote_rows(rows):
+    """Split request rows into quote columns and per-row errors
+
+    Returns ``(columns, errors)``; ``columns['index']`` holds the positions of
+    the valid rows and ``errors`` maps the others to ``{field: [message]}``.
+    """
+    columns = {name: [] for name in ('index', 'plan', 'billing_cycle', 'price', 'discount', 'seats', 'setup')}
+    errors = {}
+    plans = _Parsed(_plan_key)
+    prices = _Parsed(lambda value: _hundredths(value, 'custom_price'))
+    discounts = _Parsed(lambda value: _hundredths(value, 'discount_percentage', maximum=100))
+    for index, row in enumerate(rows):
+        field = 'non_field_errors'
+        try:
+            if not isinstance(row, dict):
+                raise QuoteError(field, 'Expected an object.')
+            field = 'plan'
+            if 'plan' not in row:
+                raise QuoteError(field, 'This field is required.')
+            plan = plans[row['plan']]
+            field = 'billing_cycle'
+            cycle = row.get('billing_cycle')
+            if cycle is not None and cycle not in MONTHS_PER_BILLING_CYCLE:
+                raise QuoteError(field, f'"{cycle}" is not a valid choice.')
+            field = 'custom_price'
+            price = row.get('custom_price')
+            if price is not None:
+                price = prices[price]
+            field = 'discount_percentage'
+            discount = discounts[row.get('discount_percentage', 0)]
+            seats = row.get('seats', 1)
+            if type(seats) is not int or not 1 <= seats <= MAX_SEATS:
+                raise QuoteError('seats', f'Enter a whole number between 1 and {MAX_SEATS}.')
+            setup = row.get('include_setup_fee', True)
+            if type(setup) is not bool:
+                raise QuoteError('include_setup_fee', 'Must be a valid boolean.')
+        except QuoteError as exc:
+            errors[index] = {exc.field: [str(exc)]}
+            continue
+        except TypeError:  # unhashable or boolean value
+            errors[index] = {field: ['A valid value is required.']}
+            continue
+        columns['index'].append(index)
+        columns['plan'].append(plan)
+        columns['billing_cycle'].append(cycle)
+        columns['price'].append(price)
+        columns['discount'].append(discount)
+        columns['seats'].append(seats)
+        columns['setup'].append(setup)
+    return columns, errors
+
+
+def price_quote_columns(price, discount, months, seats, setup_fee, tax_rate):
+    """Price whole columns of integer inputs; every list has one entry per quote
+
+    ``price`` and ``setup_fee`` are in cents, ``discount`` and ``tax_rate`` in
+    hundredths of a percent. ``(2n + d) // 2d`` is ``n / d`` rounded half up.
+    """
+    effective = [
+        p if d == 0 else (p * (10000 - d) + 5000) // 10000
+        for p, d in zip(price, discount)
+    ]
+    monthly = [e if m == 1 else (2 * e + m) // (2 * m) for e, m in zip(effective, months)]
+    subtotal = [e * s + f for e, s, f in zip(effective, seats, setup_fee)]
+    tax = [(t * tax_rate + 5000) // 10000 for t in subtotal]
+    return effective, monthly, subtotal, tax
+
+
+def quote_batch(rows):
+    """Price every row; returns one result per row, in order"""
+    columns, errors = parse_quote_rows(rows)
+
+    plans = {}
+    if columns['plan']:
+        plans = {
+            str(pk): (int(base_price * 100), int(setup_fee * 100), cycle)
+            for pk, base_price, setup_fee, cycle in PricingPlan.objects.filter(
+                pk__in=set(columns['plan'])
+            ).values_list('pk', 'base_price', 'setup_fee', 'billing_cycle')
+        }
+    for index, plan in zip(columns['index'], columns['plan']):
+        if plan not in plans:
+            errors[index] = {'plan': [f'Invalid pk "{plan}" - object does not exist.']}
+    if len(plans) < len(set(columns['plan'])):
+        keep = [position for position, plan in enumerate(columns['plan']) if plan in plans]
+        columns = {name: [values[position] for position in keep] for name, values in columns.items()}
+
+    plan_rows = [plans[plan] for plan in columns['plan']]
+    cycles = [cycle or plan[2] for cycle, plan in zip(columns['billing_cycle'], plan_rows)]
+    # A custom price of 0 falls back to the plan price, as in effective_price
+    price = [custom or plan[0] for custom, plan in zip(columns['price'], plan_rows)]
+    setup_fee = [plan[1] if setup else 0 for setup, plan in zip(columns['setup'], plan_rows)]
+    effective, monthly, subtotal, tax = price_quote_columns(
+        price,
+        columns['discount'],
+        [MONTHS_PER_BILLING_CYCLE[cycle] for cycle in cycles],
+        columns['seats'],
+        setup_fee,
+        int(get_pricing_config().tax_rate * 100),
+    )
+    total = [s + t for s, t in zip(subtotal, tax)]
+
+    results = [None] * len(rows)
+    for index, row_errors in errors.items():
+        results[index] = {'index': index, 'status': 'error', 'errors': row_errors}
+    for index, plan, cycle, seats, *amounts in zip(
+        columns['index'], columns['plan'], cycles, columns['seats'],
+        _money(price), _money(effective), _money(monthly), _money(setup_fee),
+        _money(subtotal), _money(tax), _money(total),
+    ):
+        results[index] = {
+            'index': index,
+            'status': 'ok',
+            'plan': plan,
+            'billing_cycle': cycle,
+            'seats': seats,
+            'unit_price': amounts[0],
+            'effective_price': amounts[1],
+            'monthly_price': amounts[2],
+            'setup_fee': amounts[3],
+            'subtotal': amounts[4],
+            'tax_amount': amounts[5],
+            'total_amount': amounts[6],
+        }
+    return results
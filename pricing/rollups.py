@@ -0,0 +1,65 @@
+"""
+Dashboard rollup bookkeeping.
+
+Every customer, subscription and invoice row contributes a fixed set of
+``(metric, key) -> (count, amount)`` entries to the dashboard. A write changes
+the rollups by ``contributions(new) - contributions(old)``, and those deltas are
+applied to ``DashboardRollup`` in the same transaction as the write. Nothing
+here touches the database; see ``DashboardRollupManager`` for that.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+
+CUSTOMERS = 'customers'
+SUBSCRIPTIONS_BY_STATUS = 'subscriptions_by_status'
+ACTIVE_SUBSCRIPTIONS_BY_PLAN = 'active_subscriptions_by_plan'
+INVOICES_BY_STATUS = 'invoices_by_status'
+REVENUE_BY_PLAN = 'revenue_by_plan'
+REVENUE_BY_MONTH = 'revenue_by_month'
+
+# Counter rows per (metric, key). Writers pick a shard at random so concurrent
+# transactions rarely wait on the same row lock; readers sum the shards.
+ROLLUP_SHARDS = 8
+
+ZERO = Decimal('0.00')
+
+
+def customer_contributions():
+    return {(CUSTOMERS, ''): (1, ZERO)}
+
+
+def subscription_contributions(status, plan_id):
+    contributions = {(SUBSCRIPTIONS_BY_STATUS, status): (1, ZERO)}
+    if status == 'active':
+        contributions[(ACTIVE_SUBSCRIPTIONS_BY_PLAN, str(plan_id))] = (1, ZERO)
+    return contributions
+
+
+def invoice_contributions(status, total_amount, plan_id, paid_date, issue_date):
+    total_amount = Decimal(total_amount)
+    contributions = {(INVOICES_BY_STATUS, status): (1, total_amount)}
+    if status == 'paid':
+        revenue_date = paid_date or issue_date
+        contributions[(REVENUE_BY_PLAN, str(plan_id))] = (1, total_amount)
+        contributions[(REVENUE_BY_MONTH, revenue_date.strftime('%Y-%m'))] = (1, total_amount)
+    return contributions
+
+
+def merge(*delta_sets):
+    """Add several delta dicts together, dropping entries that cancel out"""
+    merged = defaultdict(lambda: (0, ZERO))
+    for deltas in delta_sets:
+        for key, (count, amount) in deltas.items():
+            merged[key] = (merged[key][0] + count, merged[key][1] + amount)
+    return {key: delta for key, delta in merged.items() if delta != (0, ZERO)}
+
+
+def negate(contributions):
+    return {key: (-count, -amount) for key, (count, amount) in contributions.items()}
+
+
+def diff(old=None, new=None):
+    """Return the deltas that turn the ``old`` contributions into ``new``"""
+    return merge(new or {}, negate(old or {}))
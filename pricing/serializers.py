@@ -1,12 +1,14 @@
 from rest_framework import serializers
+from .config import get_pricing_config
+from .fieldsets import FieldsetSerializerMixin
 from .models import (
     PricingPlan, Customer, Subscription, Invoice, 
-    PricingSettings, AuditLog
+    PricingSettings, AuditLog, next_transition_time
 )
-from decimal import Decimal
+from datetime import timedelta
 
 
-class PricingPlanSerializer(serializers.ModelSerializer):
+class PricingPlanSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for PricingPlan model"""
     monthly_price = serializers.ReadOnlyField()
     
@@ -21,10 +23,17 @@ class PricingPlanSerializer(serializers.ModelSerializer):
             'monthly_price'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = {
+            'subscriptions': lambda: SubscriptionSerializer(many=True, read_only=True),
+        }
+        field_dependencies = {'monthly_price': ['billing_cycle', 'base_price']}
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Customer model"""
+    # Filled from CustomerQuerySet.with_spend(); left out when not annotated
+    total_spent = serializers.DecimalField(max_digits=16, decimal_places=2, coerce_to_string=False, read_only=True)
+    active_subscriptions = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Customer
@@ -32,12 +41,18 @@ class CustomerSerializer(serializers.ModelSerializer):
             'id', 'name', 'email', 'phone', 'company_name',
             'customer_type', 'status', 'address_line1', 'address_line2',
             'city', 'state', 'postal_code', 'country', 'billing_email',
-            'tax_id', 'created_at', 'updated_at'
+            'tax_id', 'created_at', 'updated_at', 'total_spent',
+            'active_subscriptions'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = {
+            'subscriptions': lambda: SubscriptionSerializer(many=True, read_only=True),
+        }
+        # Annotations, not columns
+        field_dependencies = {'total_spent': [], 'active_subscriptions': []}
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Subscription model"""
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     plan_name = serializers.CharField(source='plan.name', read_only=True)
@@ -47,15 +62,23 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         model = Subscription
         fields = [
             'id', 'customer', 'plan', 'customer_name', 'plan_name',
-            'status', 'start_date', 'end_date', 'trial_end_date',
-            'custom_price', 'discount_percentage', 'effective_price',
+            'status', 'start_date', 'end_date', 'trial_end_date', 'next_billing_date',
+            'next_transition_at', 'custom_price', 'discount_percentage', 'effective_price',
             'current_loan_applications', 'current_users', 'current_storage_gb',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'effective_price']
+        read_only_fields = [
+            'id', 'next_billing_date', 'next_transition_at', 'created_at', 'updated_at', 'effective_price'
+        ]
+        expandable_fields = {
+            'customer': lambda: CustomerSerializer(read_only=True),
+            'plan': lambda: PricingPlanSerializer(read_only=True),
+            'invoices': lambda: InvoiceSerializer(many=True, read_only=True),
+        }
+        field_dependencies = {'effective_price': ['custom_price', 'discount_percentage', 'plan__base_price']}
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class InvoiceSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for Invoice model"""
     customer_name = serializers.CharField(source='subscription.customer.name', read_only=True)
     plan_name = serializers.CharField(source='subscription.plan.name', read_only=True)
@@ -65,14 +88,17 @@ class InvoiceSerializer(serializers.ModelSerializer):
         model = Invoice
         fields = [
             'id', 'subscription', 'subscription_id', 'invoice_number',
-            'status', 'issue_date', 'due_date', 'paid_date',
+            'status', 'issue_date', 'due_date', 'paid_date', 'period_start',
             'subtotal', 'tax_amount', 'discount_amount', 'total_amount',
             'notes', 'customer_name', 'plan_name', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'invoice_number', 'period_start', 'created_at', 'updated_at']
+        expandable_fields = {
+            'subscription': lambda: SubscriptionSerializer(read_only=True),
+        }
 
 
-class PricingSettingsSerializer(serializers.ModelSerializer):
+class PricingSettingsSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for PricingSettings model"""
     trial_plan_name = serializers.CharField(source='trial_plan.name', read_only=True)
     
@@ -82,15 +108,14 @@ class PricingSettingsSerializer(serializers.ModelSerializer):
             'id', 'default_currency', 'tax_rate', 'trial_days',
             'trial_plan', 'trial_plan_name', 'invoice_prefix',
             'invoice_notes', 'payment_terms_days', 'allow_custom_pricing',
-            'require_approval_for_custom', 'auto_renewal',
+            'require_approval_for_custom', 'auto_renewal', 'version',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at']
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for AuditLog model"""
-    user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     plan_name = serializers.CharField(source='plan.name', read_only=True)
     customer_name = serializers.CharField(source='customer.name', read_only=True)
     
@@ -99,23 +124,52 @@ class AuditLogSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'action_type', 'description', 'plan', 'plan_name',
             'customer', 'customer_name', 'subscription', 'invoice',
-            'changes', 'timestamp', 'user', 'user_name', 'ip_address'
+            'changes', 'timestamp', 'ip_address'
         ]
         read_only_fields = ['id', 'timestamp']
 
 
+# Row validators for the bulk endpoints. Declaring the unique and foreign key
+# fields explicitly drops DRF's per-row UniqueValidator and queryset lookups;
+# BulkUpsertMixin checks those for the whole batch instead.
+class BulkPricingPlanSerializer(PricingPlanSerializer):
+    """Bulk row validator for PricingPlan, upserted on name"""
+    name = serializers.CharField(max_length=100)
+
+
+class BulkCustomerSerializer(CustomerSerializer):
+    """Bulk row validator for Customer, upserted on email"""
+    email = serializers.EmailField(max_length=254)
+
+
+class BulkSubscriptionSerializer(SubscriptionSerializer):
+    """Bulk row validator for Subscription; customer and plan are bare UUIDs"""
+    customer = serializers.UUIDField()
+    plan = serializers.UUIDField()
+    
+    def validate(self, attrs):
+        # bulk_create skips Subscription.save(), which normally sets these
+        attrs.setdefault('next_billing_date', attrs['start_date'])
+        if attrs.get('status', 'trial') == 'trial' and attrs.get('trial_end_date') is None:
+            attrs['trial_end_date'] = attrs['start_date'] + timedelta(days=get_pricing_config().trial_days)
+        attrs['next_transition_at'] = next_transition_time(
+            attrs.get('status', 'trial'), attrs.get('trial_end_date'), attrs.get('end_date')
+        )
+        return attrs
+
+
 # Dashboard-specific serializers
 class PricingDashboardSerializer(serializers.Serializer):
     """Serializer for pricing dashboard data"""
     total_customers = serializers.IntegerField()
     active_subscriptions = serializers.IntegerField()
-    total_revenue = serializers.DecimalField(max_digits=10, decimal_places=2)
-    monthly_revenue = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_revenue = serializers.DecimalField(max_digits=16, decimal_places=2)
+    monthly_revenue = serializers.DecimalField(max_digits=16, decimal_places=2)
     pending_invoices = serializers.IntegerField()
     overdue_invoices = serializers.IntegerField()
     trial_subscriptions = serializers.IntegerField()
     popular_plan = serializers.CharField()
-    revenue_by_plan = serializers.DictField()
+    revenue_by_plan = serializers.DictField(child=serializers.DecimalField(max_digits=16, decimal_places=2))
     monthly_revenue_trend = serializers.ListField()
 
 
@@ -144,40 +198,47 @@ class CustomerAnalyticsSerializer(serializers.Serializer):
     churn_risk = serializers.CharField()
 
 
+class BillingRunSerializer(serializers.Serializer):
+    """Serializer for billing run requests"""
+    run_at = serializers.DateTimeField(required=False)
+    chunk_size = serializers.IntegerField(min_value=1, max_value=5000, default=500)
+    max_chunks = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
 # Nested serializers for detailed views
 class DetailedPricingPlanSerializer(PricingPlanSerializer):
     """Detailed serializer for PricingPlan with related data"""
-    subscriptions = SubscriptionSerializer(many=True, read_only=True)
     subscription_count = serializers.SerializerMethodField()
     
+    class Meta(PricingPlanSerializer.Meta):
+        fields = PricingPlanSerializer.Meta.fields + ['subscription_count']
+        default_expand = ['subscriptions']
+        field_dependencies = {**PricingPlanSerializer.Meta.field_dependencies, 'subscription_count': ['subscriptions']}
+    
     def get_subscription_count(self, obj):
-        return obj.subscriptions.count()
+        # len() on the prefetched set avoids a COUNT query per plan
+        return len(obj.subscriptions.all())
 
 
 class DetailedCustomerSerializer(CustomerSerializer):
     """Detailed serializer for Customer with related data"""
-    subscriptions = SubscriptionSerializer(many=True, read_only=True)
-    active_subscriptions = serializers.SerializerMethodField()
-    total_spent = serializers.SerializerMethodField()
-    
-    def get_active_subscriptions(self, obj):
-        return obj.subscriptions.filter(status='active').count()
     
-    def get_total_spent(self, obj):
-        total = Decimal('0.00')
-        for subscription in obj.subscriptions.all():
-            for invoice in subscription.invoices.filter(status='paid'):
-                total += invoice.total_amount
-        return total
+    class Meta(CustomerSerializer.Meta):
+        default_expand = ['subscriptions']
 
 
 class DetailedSubscriptionSerializer(SubscriptionSerializer):
     """Detailed serializer for Subscription with related data"""
-    customer = CustomerSerializer(read_only=True)
-    plan = PricingPlanSerializer(read_only=True)
-    invoices = InvoiceSerializer(many=True, read_only=True)
     usage_percentage = serializers.SerializerMethodField()
     
+    class Meta(SubscriptionSerializer.Meta):
+        fields = SubscriptionSerializer.Meta.fields + ['usage_percentage']
+        default_expand = ['customer', 'plan', 'invoices']
+        field_dependencies = {
+            **SubscriptionSerializer.Meta.field_dependencies,
+            'usage_percentage': ['current_loan_applications', 'plan__max_loan_applications'],
+        }
+    
     def get_usage_percentage(self, obj):
         if obj.plan.max_loan_applications > 0:
             return (obj.current_loan_applications / obj.plan.max_loan_applications) * 100
@@ -0,0 +1,67 @@
+"""
+Signal handlers for the pricing app.
+
+Deletes go through ``post_delete`` rather than ``Model.delete()`` overrides so
+that cascaded deletes (e.g. a customer taking its subscriptions and invoices
+with it) are counted too. The collector sends these inside its transaction.
+"""
+
+import weakref
+
+from django.db.models.signals import post_delete, post_migrate, pre_delete
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import rollups
+from .partitions import ensure_partitions
+from .config import invalidate_pricing_config
+from .models import Customer, Subscription, Invoice, PricingSettings, DashboardRollup
+
+
+# Plans of the subscriptions a delete is removing, keyed by the delete's origin.
+# The collector sends every pre_delete before the first post_delete, so invoices
+# cascading with their subscription find its plan here instead of loading it.
+_deleted_subscription_plans = weakref.WeakKeyDictionary()
+
+
+@receiver(post_delete, sender=Customer)
+def remove_customer_from_rollups(sender, instance, **kwargs):
+    DashboardRollup.objects.apply(rollups.negate(rollups.customer_contributions()))
+
+
+@receiver(pre_delete, sender=Subscription)
+def remember_subscription_plan(sender, instance, origin=None, **kwargs):
+    if origin is not None:
+        _deleted_subscription_plans.setdefault(origin, {})[instance.pk] = instance.plan_id
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_subscription_from_rollups(sender, instance, **kwargs):
+    DashboardRollup.objects.apply(rollups.negate(
+        rollups.subscription_contributions(instance.status, instance.plan_id)
+    ))
+
+
+@receiver(post_delete, sender=Invoice)
+def remove_invoice_from_rollups(sender, instance, origin=None, **kwargs):
+    plan_id = None
+    if instance.status == 'paid':
+        plans = _deleted_subscription_plans.get(origin, {}) if origin is not None else {}
+        plan_id = plans.get(instance.subscription_id)
+        if plan_id is None:  # the invoice alone is being deleted
+            plan_id = instance.subscription.plan_id
+    DashboardRollup.objects.apply(rollups.negate(rollups.invoice_contributions(
+        instance.status, instance.total_amount, plan_id, instance.paid_date, instance.issue_date
+    )))
+
+
+@receiver(post_delete, sender=PricingSettings)
+def invalidate_cached_settings(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_pricing_config)
+
+
+@receiver(post_migrate)
+def create_upcoming_partitions(sender, using, **kwargs):
+    # Every deploy runs migrate, which keeps months ahead partitioned
+    if sender.name == 'pricing':
+        ensure_partitions(using=using)
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from integration_client import PricingServiceClient
+
+from .billing import run_billing
+from .config import invalidate_pricing_config
+from .models import Customer, Invoice, PricingPlan, PricingSettings, Subscription
+
+
+class PricingSettingsCacheTests(TransactionTestCase):
+    """Runs without a wrapping transaction, so on_commit callbacks fire at once as in a request"""
+
+    def setUp(self):
+        invalidate_pricing_config()
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create(username='settings-test'))
+
+    def test_settings_endpoint_creates_missing_row(self):
+        self.assertFalse(PricingSettings.objects.exists())
+        responses = []
+
+        def get_settings():
+            try:
+                responses.append(self.client.get('/api/settings/'))
+            finally:
+                connection.close()
+
+        # A deadlock would hang the request, so run it where it can be given up on
+        thread = threading.Thread(target=get_settings, daemon=True)
+        thread.start()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive(), 'GET /api/settings/ did not return')
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertEqual(PricingSettings.objects.count(), 1)
+
+
+class BillingSetupFeeTests(TestCase):
+    def setUp(self):
+        invalidate_pricing_config()
+        PricingSettings.objects.create(tax_rate=Decimal('0.00'))
+        self.now = timezone.now()
+        plan = PricingPlan.objects.create(
+            name='Setup fee', plan_type='basic', billing_cycle='monthly',
+            base_price=Decimal('10.00'), setup_fee=Decimal('25.00'),
+        )
+        self.subscription = Subscription.objects.create(
+            customer=Customer.objects.create(name='Setup fee', email='setup-fee@example.com'),
+            plan=plan, status='active', start_date=self.now - timedelta(days=40),
+        )
+
+    def tearDown(self):
+        invalidate_pricing_config()
+
+    def billed_subtotal(self):
+        run_billing(self.now)
+        return Invoice.objects.get(subscription=self.subscription, period_start__isnull=False).subtotal
+
+    def test_first_run_invoice_charges_setup_fee_after_manual_invoices(self):
+        Invoice.objects.create(
+            subscription=self.subscription, status='paid', issue_date=self.now, due_date=self.now,
+            subtotal=Decimal('5.00'), total_amount=Decimal('5.00'),
+        )
+        self.assertEqual(self.billed_subtotal(), Decimal('35.00'))
+
+    def test_later_periods_do_not_charge_setup_fee(self):
+        Invoice.objects.create(
+            subscription=self.subscription, status='paid', issue_date=self.now, due_date=self.now,
+            period_start=self.subscription.start_date, subtotal=Decimal('35.00'), total_amount=Decimal('35.00'),
+        )
+        run_billing(self.now)
+        latest = Invoice.objects.filter(subscription=self.subscription).latest('period_start')
+        self.assertGreater(latest.period_start, self.subscription.start_date)
+        self.assertEqual(latest.subtotal, Decimal('10.00'))
+
+
+class ExportFormatTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create(username='export-test'))
+        customer = Customer.objects.create(name='Export', email='export@example.com', city='Berlin')
+        Customer.objects.filter(pk=customer.pk).update(created_at=timezone.now().replace(microsecond=123456))
+
+    def export(self, output):
+        response = self.client.get(f'/api/customers/export/?output={output}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_and_ndjson_agree(self):
+        csv_rows = list(csv.DictReader(io.StringIO(self.export('csv'))))
+        ndjson_rows = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(csv_rows), 1)
+        self.assertIn('.123456', csv_rows[0]['created_at'])
+        self.assertEqual(
+            csv_rows,
+            [{column: '' if value is None else str(value) for column, value in row.items()} for row in ndjson_rows],
+        )
+
+
+class ClientCacheInvalidationTests(SimpleTestCase):
+    """Writes drop cached responses of the resources that embed what they changed"""
+
+    def setUp(self):
+        self.client = PricingServiceClient(base_url='http://pricing.invalid')
+        self.client._cached('plans/', lambda: ['plan'])
+        self.client._cached('settings/', lambda: {'trial_plan_name': 'Basic'})
+
+    def test_subscription_write_drops_cached_plans(self):
+        self.client._invalidate('subscriptions/')
+        self.assertIsNone(self.client.cache.get('plans/'))
+        self.assertIsNotNone(self.client.cache.get('settings/'))
+
+    def test_plan_write_drops_cached_settings(self):
+        self.client._invalidate('plans/123/')
+        self.assertIsNone(self.client.cache.get('plans/'))
+        self.assertIsNone(self.client.cache.get('settings/'))
+
+    def test_usage_events_drop_cached_plans(self):
+        self.client._invalidate('usage-events/?durability=sync')
+        self.assertIsNone(self.client.cache.get('plans/'))
+
+
+class ExpandedCollectionETagTests(TestCase):
+    """A collection's ETag follows the relations ``?expand=`` embeds in it"""
+
+    url = '/api/plans/?expand=subscriptions'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create(username='etag-test'))
+        plan = PricingPlan.objects.create(
+            name='Expanded', plan_type='basic', billing_cycle='monthly', base_price=Decimal('10.00'),
+        )
+        self.customer = Customer.objects.create(name='Expanded', email='expanded@example.com')
+        Subscription.objects.create(customer=self.customer, plan=plan, status='active', start_date=timezone.now())
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        Customer.objects.filter(pk=self.customer.pk).update(
+            name='Renamed', updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_expanded_list_changes_with_nested_rows(self):
+        self.assertEqual(self.revalidate(self.url), 200)
+
+    def test_plain_list_ignores_nested_rows(self):
+        self.assertEqual(self.revalidate('/api/plans/'), 304)
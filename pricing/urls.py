@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     PricingPlanViewSet, CustomerViewSet, SubscriptionViewSet,
     InvoiceViewSet, PricingSettingsViewSet, AuditLogViewSet,
-    PricingDashboardViewSet, health_check
+    PricingDashboardViewSet, BillingRunViewSet, QuoteViewSet,
+    UsageEventViewSet, health_check
 )
 
 router = DefaultRouter()
@@ -14,9 +16,19 @@ router.register(r'invoices', InvoiceViewSet)
 router.register(r'settings', PricingSettingsViewSet)
 router.register(r'audit-logs', AuditLogViewSet)
 router.register(r'dashboard', PricingDashboardViewSet, basename='dashboard')
+router.register(r'billing-runs', BillingRunViewSet, basename='billing-run')
+router.register(r'quotes', QuoteViewSet, basename='quote')
+router.register(r'usage-events', UsageEventViewSet, basename='usage-event')
+
+router_urls = router.urls
+health = health_check
+if settings.SERVER_MODE == 'asgi':
+    # Coroutine handlers for the hottest reads (see pricing.async_views)
+    from .async_views import health_check as health, with_async_reads
+    router_urls = with_async_reads(router_urls)
 
 urlpatterns = [
-    path('', include(router.urls)),
-    path('health/', health_check, name='health_check'),
-    path('health', health_check, name='health_check_alt'),  # Alternative endpoint
+    path('', include(router_urls)),
+    path('health/', health, name='health_check'),
+    path('health', health, name='health_check_alt'),  # Alternative endpoint
 ]
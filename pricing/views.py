@@ -1,121 +1,356 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from django.db.models import Count, Sum, Q, F
+from django.db.models import Count, Q, F, Prefetch
 from django.utils import timezone
 from django.db import connection
+from django.conf import settings
 from datetime import datetime, timedelta
 from decimal import Decimal
 
+from pricing_service.database import pool_stats
+
+from . import rollups
 from .models import (
     PricingPlan, Customer, Subscription, Invoice, 
-    PricingSettings, AuditLog
+    PricingSettings, AuditLog, DashboardRollup
 )
+from .audit import AuditMixin
+from .billing import run_billing
+from .bulk import BulkUpsertMixin
+from .conditional import ConditionalGetMixin
+from .config import get_pricing_config
+from .exports import StreamingExportMixin
+from .fastpath import FastListMixin
+from .fieldsets import SparseFieldsetMixin
+from .filters import RangeFilter
+from .metering import DURABILITY_MODES, parse_usage_events, record_usage
+from .quotes import MAX_QUOTES, quote_batch
 from .serializers import (
     PricingPlanSerializer, CustomerSerializer, SubscriptionSerializer,
     InvoiceSerializer, PricingSettingsSerializer, AuditLogSerializer,
     PricingDashboardSerializer, PlanComparisonSerializer,
     CustomerAnalyticsSerializer, DetailedPricingPlanSerializer,
-    DetailedCustomerSerializer, DetailedSubscriptionSerializer
+    DetailedCustomerSerializer, DetailedSubscriptionSerializer,
+    BulkPricingPlanSerializer, BulkCustomerSerializer, BulkSubscriptionSerializer,
+    BillingRunSerializer
 )
 
 
-class PricingPlanViewSet(viewsets.ModelViewSet):
+class PricingPlanViewSet(SparseFieldsetMixin, FastListMixin, ConditionalGetMixin, AuditMixin, BulkUpsertMixin, viewsets.ModelViewSet):
     """ViewSet for managing pricing plans"""
     queryset = PricingPlan.objects.all()
     serializer_class = PricingPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
+    bulk_serializer_class = BulkPricingPlanSerializer
+    bulk_unique_field = 'name'
+    # The catalog is polled constantly and rarely changes
+    conditional_collections = True
+    fast_list_actions = {'list', 'active', 'featured'}
+    etag_dependencies = ['subscriptions', 'subscriptions__customer']
+    audit_actions = {'create': 'plan_created', 'update': 'plan_updated', 'destroy': 'plan_deleted'}
+    audit_links = {'plan_id': 'id'}
+    
+    filter_backends = [RangeFilter, filters.OrderingFilter]
+    range_filter_fields = ['base_price', 'monthly_price']
+    ordering_fields = ['name', 'base_price', 'monthly_price', 'created_at']
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return DetailedPricingPlanSerializer
         return PricingPlanSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset().with_monthly_price()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('subscriptions', queryset=Subscription.objects.select_related('customer', 'plan'))
+            )
+        return queryset
+    
+    def active_queryset(self):
+        return self.filter_queryset(self.get_queryset()).filter(is_active=True)
+    
+    def featured_queryset(self):
+        return self.filter_queryset(self.get_queryset()).filter(is_featured=True, is_active=True)
+    
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active pricing plans"""
-        plans = self.queryset.filter(is_active=True)
-        serializer = self.get_serializer(plans, many=True)
-        return Response(serializer.data)
+        plans = self.active_queryset()
+        return self.conditional_response(
+            request, self.collection_validators(request, plans), lambda: self._paginated(plans)
+        )
     
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured pricing plans"""
-        plans = self.queryset.filter(is_featured=True, is_active=True)
-        serializer = self.get_serializer(plans, many=True)
-        return Response(serializer.data)
+        plans = self.featured_queryset()
+        return self.conditional_response(
+            request, self.collection_validators(request, plans), lambda: self._paginated(plans)
+        )
+    
+    def _paginated(self, plans):
+        page = self.paginate_queryset(plans)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(SparseFieldsetMixin, FastListMixin, ConditionalGetMixin, AuditMixin, StreamingExportMixin, BulkUpsertMixin, viewsets.ModelViewSet):
     """ViewSet for managing customers"""
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    bulk_serializer_class = BulkCustomerSerializer
+    bulk_unique_field = 'email'
+    fast_list_actions = {'list', 'active'}
+    etag_dependencies = ['subscriptions', 'subscriptions__plan', 'subscriptions__invoices']
+    audit_actions = {'create': 'customer_created', 'update': 'customer_updated', 'destroy': 'customer_deleted'}
+    audit_links = {'customer_id': 'id'}
+    export_columns = [
+        ('id', 'id'), ('name', 'name'), ('email', 'email'), ('phone', 'phone'),
+        ('company_name', 'company_name'), ('customer_type', 'customer_type'),
+        ('status', 'status'), ('address_line1', 'address_line1'),
+        ('address_line2', 'address_line2'), ('city', 'city'), ('state', 'state'),
+        ('postal_code', 'postal_code'), ('country', 'country'),
+        ('billing_email', 'billing_email'), ('tax_id', 'tax_id'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    
+    filter_backends = [RangeFilter, filters.OrderingFilter]
+    range_filter_fields = ['total_spent', 'active_subscriptions']
+    ordering_fields = ['name', 'email', 'created_at', 'total_spent', 'active_subscriptions']
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return DetailedCustomerSerializer
         return CustomerSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # The spend subqueries are skipped when a sparse request neither shows nor filters on them
+        if self.action in ('list', 'active', 'retrieve') and (
+            self.needs_field('total_spent') or self.needs_field('active_subscriptions')
+        ):
+            queryset = queryset.with_spend()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                Prefetch('subscriptions', queryset=Subscription.objects.select_related('customer', 'plan')),
+            )
+        return queryset
+    
+    def after_bulk_write(self, created):
+        DashboardRollup.objects.apply(rollups.merge(*(rollups.customer_contributions() for _ in created)))
+    
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active customers"""
-        customers = self.queryset.filter(status='active')
-        serializer = self.get_serializer(customers, many=True)
-        return Response(serializer.data)
+        customers = self.filter_queryset(self.get_queryset()).filter(status='active')
+        page = self.paginate_queryset(customers)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class SubscriptionViewSet(viewsets.ModelViewSet):
+class SubscriptionViewSet(SparseFieldsetMixin, FastListMixin, ConditionalGetMixin, AuditMixin, StreamingExportMixin, BulkUpsertMixin, viewsets.ModelViewSet):
     """ViewSet for managing subscriptions"""
-    queryset = Subscription.objects.all()
+    queryset = Subscription.objects.select_related('customer', 'plan')
     serializer_class = SubscriptionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    bulk_serializer_class = BulkSubscriptionSerializer
+    bulk_related = {'customer': Customer, 'plan': PricingPlan}
+    fast_list_actions = {'list', 'active'}
+    etag_dependencies = ['customer', 'plan', 'invoices']
+    audit_actions = {'create': 'subscription_created', 'update': 'subscription_updated', 'destroy': 'subscription_deleted'}
+    audit_links = {'subscription_id': 'id', 'plan_id': 'plan_id', 'customer_id': 'customer_id'}
+    audit_label_field = 'id'
+    export_date_field = 'start_date'
+    export_columns = [
+        ('id', 'id'), ('customer', 'customer_id'), ('customer_name', 'customer__name'),
+        ('plan', 'plan_id'), ('plan_name', 'plan__name'), ('status', 'status'),
+        ('start_date', 'start_date'), ('end_date', 'end_date'),
+        ('trial_end_date', 'trial_end_date'), ('custom_price', 'custom_price'),
+        ('discount_percentage', 'discount_percentage'),
+        ('current_loan_applications', 'current_loan_applications'),
+        ('current_users', 'current_users'), ('current_storage_gb', 'current_storage_gb'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    
+    filter_backends = [RangeFilter, filters.OrderingFilter]
+    range_filter_fields = ['effective_price', 'discount_percentage', 'start_date']
+    ordering_fields = ['start_date', 'created_at', 'effective_price', 'discount_percentage']
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return DetailedSubscriptionSerializer
         return SubscriptionSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset().with_effective_price()
+        if self.action == 'retrieve':
+            # Invoices get their subscription back-reference from the prefetch,
+            # so customer/plan names resolve from the select_related above.
+            queryset = queryset.prefetch_related('invoices')
+        return queryset
+    
+    def get_audit_action(self, operation, before, after):
+        if operation == 'update' and before and before['status'] != 'cancelled' and after['status'] == 'cancelled':
+            return 'subscription_cancelled'
+        return super().get_audit_action(operation, before, after)
+    
+    def after_bulk_write(self, created):
+        DashboardRollup.objects.apply(rollups.merge(*(
+            rollups.subscription_contributions(subscription.status, subscription.plan_id)
+            for subscription in created
+        )))
+    
     @action(detail=False, methods=['get'])
     def active(self, request):
         """Get all active subscriptions"""
-        subscriptions = self.queryset.filter(status='active')
-        serializer = self.get_serializer(subscriptions, many=True)
-        return Response(serializer.data)
+        subscriptions = self.filter_queryset(self.get_queryset()).filter(status='active')
+        page = self.paginate_queryset(subscriptions)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(SparseFieldsetMixin, FastListMixin, ConditionalGetMixin, AuditMixin, StreamingExportMixin, viewsets.ModelViewSet):
     """ViewSet for managing invoices"""
-    queryset = Invoice.objects.all()
+    queryset = Invoice.objects.select_related('subscription__customer', 'subscription__plan')
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['subscription__customer', 'subscription__plan']
+    fast_list_actions = {'list', 'pending', 'overdue'}
+    audit_actions = {'create': 'invoice_created', 'update': 'invoice_updated', 'destroy': 'invoice_deleted'}
+    audit_links = {'invoice_id': 'id', 'subscription_id': 'subscription_id'}
+    audit_label_field = 'invoice_number'
+    export_date_field = 'issue_date'
+    export_columns = [
+        ('id', 'id'), ('subscription', 'subscription_id'), ('invoice_number', 'invoice_number'),
+        ('status', 'status'), ('issue_date', 'issue_date'), ('due_date', 'due_date'),
+        ('paid_date', 'paid_date'), ('subtotal', 'subtotal'), ('tax_amount', 'tax_amount'),
+        ('discount_amount', 'discount_amount'), ('total_amount', 'total_amount'),
+        ('notes', 'notes'), ('customer_name', 'subscription__customer__name'),
+        ('plan_name', 'subscription__plan__name'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    ]
+    
+    def get_audit_action(self, operation, before, after):
+        if operation == 'update' and before and before['status'] != 'paid' and after['status'] == 'paid':
+            return 'invoice_paid'
+        return super().get_audit_action(operation, before, after)
     
     @action(detail=False, methods=['get'])
     def pending(self, request):
         """Get all pending invoices"""
-        invoices = self.queryset.filter(status__in=['draft', 'sent'])
-        serializer = self.get_serializer(invoices, many=True)
-        return Response(serializer.data)
+        invoices = self.filter_queryset(self.get_queryset().filter(status__in=['draft', 'sent']))
+        page = self.paginate_queryset(invoices)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def overdue(self, request):
+        """Get overdue invoices, longest overdue first"""
+        invoices = self.filter_queryset(self.get_queryset().filter(status='overdue').order_by('due_date'))
+        page = self.paginate_queryset(invoices)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class PricingSettingsViewSet(viewsets.ModelViewSet):
+class PricingSettingsViewSet(SparseFieldsetMixin, FastListMixin, ConditionalGetMixin, AuditMixin, viewsets.ModelViewSet):
     """ViewSet for managing pricing settings"""
-    queryset = PricingSettings.objects.all()
+    queryset = PricingSettings.objects.select_related('trial_plan')
     serializer_class = PricingSettingsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etag_dependencies = ['trial_plan']
+    pagination_class = None  # singleton, nothing to page through
+    audit_actions = {'create': 'settings_updated', 'update': 'settings_updated'}
     
     def get_queryset(self):
-        # Ensure only one settings instance exists
-        if not PricingSettings.objects.exists():
-            PricingSettings.objects.create()
-        return PricingSettings.objects.all()
+        # Creates the singleton on first use; served from the process cache after that
+        get_pricing_config()
+        return super().get_queryset()
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(SparseFieldsetMixin, FastListMixin, ConditionalGetMixin, StreamingExportMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing audit logs"""
-    queryset = AuditLog.objects.all()
+    queryset = AuditLog.objects.select_related('plan', 'customer')
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [RangeFilter]
+    range_filter_fields = ['timestamp']  # bounds skip whole partitions on PostgreSQL
+    etag_updated_field = 'timestamp'
+    etag_dependencies = ['plan', 'customer']
+    export_date_field = 'timestamp'
+    export_columns = [
+        ('id', 'id'), ('action_type', 'action_type'), ('description', 'description'),
+        ('plan', 'plan_id'), ('plan_name', 'plan__name'), ('customer', 'customer_id'),
+        ('customer_name', 'customer__name'), ('subscription', 'subscription_id'),
+        ('invoice', 'invoice_id'), ('changes', 'changes'), ('timestamp', 'timestamp'),
+        ('ip_address', 'ip_address'), ('user_agent', 'user_agent'),
+    ]
+
+
+class UsageEventViewSet(viewsets.ViewSet):
+    """ViewSet for ingesting subscription usage events"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def create(self, request):
+        """Accept a batch of usage events; ``?durability=`` picks how they are stored"""
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'non_field_errors': ['Expected a list of objects.']}, status=status.HTTP_400_BAD_REQUEST)
+        durability = request.query_params.get('durability', settings.USAGE_DURABILITY)
+        if durability not in DURABILITY_MODES:
+            return Response({'durability': [f"Choose one of: {', '.join(DURABILITY_MODES)}."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        events, errors = parse_usage_events(rows)
+        if events:
+            record_usage(events, durability)
+        return Response({
+            'accepted': len(events),
+            'durability': durability,
+            'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+        }, status=status.HTTP_200_OK if durability == 'sync' else status.HTTP_202_ACCEPTED)
+
+
+class QuoteViewSet(viewsets.ViewSet):
+    """ViewSet for what-if price quotes"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Price many plan/cycle/discount/custom price/seat combinations at once"""
+        rows = request.data
+        if not isinstance(rows, list):
+            return Response({'non_field_errors': ['Expected a list of objects.']}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_QUOTES:
+            return Response({'non_field_errors': [f'At most {MAX_QUOTES} quotes per request.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        results = quote_batch(rows)
+        errors = sum(1 for result in results if result['status'] == 'error')
+        return Response({'quoted': len(results) - errors, 'errors': errors, 'results': results})
+
+
+class BillingRunViewSet(viewsets.ViewSet):
+    """ViewSet for triggering billing runs"""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def create(self, request):
+        """Bill up to ``max_chunks`` chunks of due subscriptions; repeat while ``remaining``"""
+        serializer = BillingRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        run_at = serializer.validated_data.get('run_at') or timezone.now()
+        result = run_billing(
+            run_at,
+            chunk_size=serializer.validated_data['chunk_size'],
+            max_chunks=serializer.validated_data['max_chunks'],
+        )
+        return Response({
+            'run_at': run_at,
+            'subscriptions': result.subscriptions,
+            'invoices': result.invoices,
+            'total_amount': str(result.total_amount),
+            'remaining': result.remaining,
+        })
 
 
 class PricingDashboardViewSet(viewsets.ViewSet):
@@ -123,27 +358,51 @@ class PricingDashboardViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def list(self, request):
-        """Get dashboard data"""
-        # Calculate basic metrics
-        total_customers = Customer.objects.count()
-        active_subscriptions = Subscription.objects.filter(status='active').count()
+        """Get dashboard data from the incrementally maintained rollups"""
+        totals = DashboardRollup.objects.snapshot()
+        subscriptions = totals[rollups.SUBSCRIPTIONS_BY_STATUS]
+        invoices = totals[rollups.INVOICES_BY_STATUS]
+        revenue_by_month = totals[rollups.REVENUE_BY_MONTH]
+        active_by_plan = totals[rollups.ACTIVE_SUBSCRIPTIONS_BY_PLAN]
+        revenue_by_plan = totals[rollups.REVENUE_BY_PLAN]
         
-        # Calculate revenue
-        total_revenue = Invoice.objects.filter(status='paid').aggregate(
-            total=Sum('total_amount')
-        )['total'] or Decimal('0.00')
+        plan_ids = {key for key, (count, _) in active_by_plan.items() if count} | set(revenue_by_plan)
+        plan_names = dict(PricingPlan.objects.filter(pk__in=plan_ids).values_list('id', 'name'))
+        plan_names = {str(plan_id): name for plan_id, name in plan_names.items()}
+        popular = max(active_by_plan.items(), key=lambda item: item[1][0], default=None)
+        
+        # Last 12 calendar months, oldest first
+        today = timezone.now().date()
+        months = []
+        year, month = today.year, today.month
+        for _ in range(12):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        months.reverse()
+        
+        def count(bucket, key):
+            return bucket.get(key, (0, Decimal('0.00')))[0]
+        
+        def amount(bucket, key):
+            return bucket.get(key, (0, Decimal('0.00')))[1]
         
         dashboard_data = {
-            'total_customers': total_customers,
-            'active_subscriptions': active_subscriptions,
-            'total_revenue': total_revenue,
-            'monthly_revenue': Decimal('0.00'),
-            'pending_invoices': 0,
-            'overdue_invoices': 0,
-            'trial_subscriptions': 0,
-            'popular_plan': 'None',
-            'revenue_by_plan': {},
-            'monthly_revenue_trend': [],
+            'total_customers': count(totals[rollups.CUSTOMERS], ''),
+            'active_subscriptions': count(subscriptions, 'active'),
+            'total_revenue': amount(invoices, 'paid'),
+            'monthly_revenue': amount(revenue_by_month, months[-1]),
+            'pending_invoices': count(invoices, 'draft') + count(invoices, 'sent'),
+            'overdue_invoices': count(invoices, 'overdue'),
+            'trial_subscriptions': count(subscriptions, 'trial'),
+            'popular_plan': plan_names.get(popular[0], 'None') if popular and popular[1][0] else 'None',
+            'revenue_by_plan': {
+                plan_names.get(plan_id, plan_id): total
+                for plan_id, (_, total) in revenue_by_plan.items() if total
+            },
+            'monthly_revenue_trend': [
+                {'month': key, 'revenue': str(amount(revenue_by_month, key).quantize(Decimal('0.01')))}
+                for key in months
+            ],
         }
         
         serializer = PricingDashboardSerializer(dashboard_data)
@@ -160,11 +419,15 @@ def health_check(request):
             cursor.execute("SELECT 1")
             cursor.fetchone()
         
-        return Response({
+        payload = {
             'status': 'healthy',
             'database': 'connected',
             'timestamp': timezone.now().isoformat()
-        }, status=status.HTTP_200_OK)
+        }
+        pool = pool_stats(connection)
+        if pool is not None:
+            payload['database_pool'] = pool
+        return Response(payload, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
             'status': 'unhealthy',
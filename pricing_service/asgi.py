@@ -0,0 +1,16 @@
+"""
+ASGI config for pricing service.
+
+Serve with an async-capable worker, e.g.
+``gunicorn -k uvicorn_worker.UvicornWorker pricing_service.asgi:application``.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pricing_service.settings_railway')
+# Lets pricing.urls route the hot reads to coroutine views
+os.environ.setdefault('SERVER_MODE', 'asgi')
+
+application = get_asgi_application()
@@ -0,0 +1,214 @@
+"""
+Response compression negotiated with ``Accept-Encoding``.
+
+``RESPONSE_COMPRESSION`` lists codecs in the server's order of preference, each
+with its level, such as ``zstd:1,br:1,gzip:1``. A response is compressed with
+the codec the client accepts with the highest q-value. Ties go to the earlier
+codec in the list. Codecs whose library is not installed are skipped. gzip
+always works:
+
+- ``zstd`` needs ``zstandard``
+- ``br`` needs ``brotli``
+- ``gzip`` uses the standard library
+
+Only JSON, NDJSON and CSV are compressed. HTML, such as the admin pages, is
+left alone because it carries CSRF tokens (BREACH). Bodies smaller than
+``RESPONSE_COMPRESSION_MIN_SIZE`` are sent as they are. Streamed responses
+(the ``export/`` actions) are compressed chunk by chunk, under WSGI and
+ASGI. The compressor is flushed after every chunk, so rows still reach the
+client as they are read.
+"""
+
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional codec
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/csv')
+
+
+class GzipCodec:
+    name = 'gzip'
+    levels = range(1, 10)
+    default_level = 1
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self):
+        """Return ``(compress chunk and flush, finish)``"""
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)), compressor.flush
+
+    @staticmethod
+    def decompress(data):
+        return zlib.decompress(data, 31)
+
+
+class BrotliCodec:
+    name = 'br'
+    levels = range(0, 12)
+    default_level = 1
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=self.level)
+
+    def stream(self):
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=self.level)
+        return (lambda chunk: compressor.process(chunk) + compressor.flush()), compressor.finish
+
+    @staticmethod
+    def decompress(data):
+        return brotli.decompress(data)
+
+
+class ZstdCodec:
+    name = 'zstd'
+    levels = range(1, 23)
+    default_level = 1
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        # A ZstdCompressor must not be shared between threads
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        return (lambda chunk: compressor.compress(chunk) + compressor.flush(flush_block)), compressor.flush
+
+    @staticmethod
+    def decompress(data):
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+CODECS = {'zstd': ZstdCodec, 'br': BrotliCodec, 'gzip': GzipCodec}
+INSTALLED = {'zstd': zstandard is not None, 'br': brotli is not None, 'gzip': True}
+
+
+def parse_codecs(spec):
+    """Turn ``'zstd:1,br:1,gzip:1'`` into codecs, skipping those not installed"""
+    codecs = []
+    for item in spec.split(','):
+        name, _, level = item.strip().partition(':')
+        if name not in CODECS:
+            raise ValueError(f'RESPONSE_COMPRESSION: unknown codec {name!r}; choose from {", ".join(CODECS)}')
+        codec_class = CODECS[name]
+        level = int(level) if level else codec_class.default_level
+        if level not in codec_class.levels:
+            raise ValueError(f'RESPONSE_COMPRESSION: {name} level must be {codec_class.levels.start}-{codec_class.levels.stop - 1}')
+        if INSTALLED[name]:
+            codecs.append(codec_class(level))
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """Return ``{coding: q}`` from an ``Accept-Encoding`` header"""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_codec(header, codecs):
+    """Return the codec to use for a request's ``Accept-Encoding``, or None"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for codec in codecs:
+        q = accepted.get(codec.name, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+def compress_chunks(codec, chunks):
+    compress, finish = codec.stream()
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_chunks(codec, chunks):
+    compress, finish = codec.stream()
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the codec negotiated from ``Accept-Encoding``"""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.codecs = parse_codecs(settings.RESPONSE_COMPRESSION)
+        self.min_size = settings.RESPONSE_COMPRESSION_MIN_SIZE
+
+    def process_response(self, request, response):
+        if not self.codecs or response.has_header('Content-Encoding') or response.status_code in (204, 206, 304):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = choose_codec(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_chunks(codec, response.streaming_content)
+            else:
+                response.streaming_content = compress_chunks(codec, response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The encoded bytes differ from the identity ones, so a strong validator no longer fits
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codec.name
+        return response
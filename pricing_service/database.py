@@ -0,0 +1,99 @@
+"""
+How the default database reuses connections, chosen with ``DB_CONNECTION_MODE``:
+
+- ``pool`` (default): every worker process keeps a psycopg 3 connection pool,
+  using Django's ``pool`` option. Connections are checked on checkout.
+- ``pgbouncer``: connect through pgbouncer in transaction pooling mode. Django
+  keeps one connection per thread open for ``CONN_MAX_AGE`` seconds. Server-side
+  cursors are turned off, because the next transaction may run on a different
+  server connection. (Django already turns off psycopg's prepared statements.)
+- ``direct``: a new connection per request (the old behaviour).
+
+The pool's size comes from how many requests a worker runs at once. A sync
+worker runs ``WEB_THREADS`` at once (gunicorn ``--threads``, default 1). An
+ASGI worker runs a thread per request, so its pool is capped at 10. Both get
+``BACKGROUND_CONNECTIONS`` more for the worker's own background threads, the
+audit writer and the usage flusher, so requests do not queue behind them.
+``DB_POOL_MAX_SIZE`` overrides the whole size. Requests beyond it wait up to
+``DB_POOL_TIMEOUT`` seconds for a connection. Postgres needs room for
+``WEB_CONCURRENCY`` times the max size, plus the scheduler and migrations.
+"""
+
+import os
+
+
+CONNECTION_MODES = ('pool', 'pgbouncer', 'direct')
+# pricing.audit's writer and pricing.metering's flusher each hold one while they write
+BACKGROUND_CONNECTIONS = 2
+
+
+def pool_max_size():
+    """Connections a worker process can use at once"""
+    if os.getenv('DB_POOL_MAX_SIZE'):
+        return int(os.getenv('DB_POOL_MAX_SIZE'))
+    if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+        return 10 + BACKGROUND_CONNECTIONS
+    return int(os.getenv('WEB_THREADS', '1')) + BACKGROUND_CONNECTIONS
+
+
+def connection_settings(options):
+    """Settings to merge into ``DATABASES['default']``; ``options`` are its base OPTIONS"""
+    mode = os.getenv('DB_CONNECTION_MODE', 'pool')
+    if mode not in CONNECTION_MODES:
+        raise ValueError(f'DB_CONNECTION_MODE must be one of {", ".join(CONNECTION_MODES)}, not {mode!r}')
+
+    if mode == 'pool':
+        max_size = pool_max_size()
+        return {
+            'CONN_MAX_AGE': 0,  # the pool owns connection lifetime
+            'CONN_HEALTH_CHECKS': True,  # makes Django pass ConnectionPool.check_connection
+            'OPTIONS': {
+                **options,
+                'pool': {
+                    'min_size': min(int(os.getenv('DB_POOL_MIN_SIZE', '1')), max_size),
+                    'max_size': max_size,
+                    'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                    'max_idle': 300,
+                    'max_lifetime': 1800,
+                },
+            },
+        }
+    if mode == 'pgbouncer':
+        return {
+            'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': True,
+            'OPTIONS': options,
+        }
+    return {'CONN_MAX_AGE': 0, 'OPTIONS': options}
+
+
+def close_pools():
+    """Close this process's connection pools; call before forking processes that use the database
+
+    Django keeps pools on the ``DatabaseWrapper`` class, and ``close_all()``
+    only hands connections back to them, so a forked child would otherwise
+    inherit the pool with its open sockets and dead worker threads.
+    """
+    from django.db import connections
+
+    connections.close_all()
+    for connection in connections.all(initialized_only=True):
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+
+
+def pool_stats(connection):
+    """Counters for the connection's pool, or None when it is not pooled
+
+    psycopg_pool's counters accumulate from when the worker started. They include
+    ``requests_wait_ms``, the total time requests waited for a connection, and
+    ``requests_waiting``, how many are waiting now. ``avg_wait_ms`` is the
+    total wait divided by the number of checkouts.
+    """
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    stats['avg_wait_ms'] = round(stats.get('requests_wait_ms', 0) / max(stats.get('requests_num', 0), 1), 3)
+    return stats
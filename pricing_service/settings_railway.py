@@ -6,6 +6,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .database import connection_settings
+
 load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +40,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'pricing_service.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +69,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'pricing_service.wsgi.application'
+ASGI_APPLICATION = 'pricing_service.asgi.application'
+
+# wsgi (gunicorn sync workers) or asgi (gunicorn with uvicorn workers). The ASGI
+# entry point sets it, and in asgi mode pricing.urls serves the hottest reads
+# with coroutine views (see pricing.async_views)
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
 
 # Database - Railway PostgreSQL
 # Railway provides these environment variables automatically
@@ -77,9 +86,10 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'postgres.railway.internal'),
         'PORT': os.getenv('DB_PORT', '5432'),
-        'OPTIONS': {
+        # Pooled by default; DB_CONNECTION_MODE picks pgbouncer or direct (see pricing_service.database)
+        **connection_settings({
             'connect_timeout': 10,
-        },
+        }),
     }
 }
 
@@ -131,10 +141,40 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'pricing.renderers.FastJSONRenderer',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'pricing.pagination.KeysetPagination',
 }
 
+# Serve list endpoints from values() rows instead of serializing model instances
+# (see pricing.fastpath)
+FAST_LIST_RESPONSES = os.getenv('FAST_LIST_RESPONSES', 'True') == 'True'
+
+# Response codecs in order of preference with their levels, and the smallest body
+# worth compressing (see pricing_service.compression)
+RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'zstd:1,br:1,gzip:1')
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv('RESPONSE_COMPRESSION_MIN_SIZE', '1024'))
+
+# Seconds a worker serves PricingSettings from memory before checking the stored
+# version again (see pricing.config)
+PRICING_SETTINGS_CACHE_TTL = float(os.getenv('PRICING_SETTINGS_CACHE_TTL', '5'))
+
+# Usage metering (see pricing.metering): default durability for
+# POST /api/usage-events/ (buffered, journal or sync), seconds between flushes,
+# and how many buffered subscriptions trigger an early flush
+USAGE_DURABILITY = os.getenv('USAGE_DURABILITY', 'buffered')
+USAGE_FLUSH_INTERVAL = float(os.getenv('USAGE_FLUSH_INTERVAL', '1'))
+USAGE_MAX_PENDING = int(os.getenv('USAGE_MAX_PENDING', '10000'))
+
+# Audit trail (see pricing.audit): entries are queued in memory and written in
+# batches by a background thread; a full queue drops new entries
+AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'True') == 'True'
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.5'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '50000'))
+# Whole months of audit log kept by manage_partitions (PostgreSQL only)
+AUDIT_LOG_RETENTION_MONTHS = int(os.getenv('AUDIT_LOG_RETENTION_MONTHS', '24'))
+
 # CORS settings - Allow main docAnalysis service and frontend
 CORS_ALLOWED_ORIGINS = [
     "https://docanalysis-staging.up.railway.app",
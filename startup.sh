@@ -61,6 +61,9 @@ response = client.get('/health/')
 print(f'Health endpoint: {response.status_code}')
 "
 
-# Start gunicorn
+# Start gunicorn (SERVER_MODE=asgi runs uvicorn workers)
 echo "Starting gunicorn server..."
-exec gunicorn --bind 0.0.0.0:$PORT --workers 3 --timeout 120 --access-logfile - --error-logfile - --log-level info pricing_service.wsgi:application
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec gunicorn --bind 0.0.0.0:$PORT --workers ${WEB_CONCURRENCY:-3} --worker-class uvicorn_worker.UvicornWorker --timeout 120 --access-logfile - --error-logfile - --log-level info pricing_service.asgi:application
+fi
+exec gunicorn --bind 0.0.0.0:$PORT --workers ${WEB_CONCURRENCY:-3} --threads ${WEB_THREADS:-1} --timeout 120 --access-logfile - --error-logfile - --log-level info pricing_service.wsgi:application